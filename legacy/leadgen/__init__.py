@@ -0,0 +1,11 @@
+"""
+Lead generation for vending machine placement: Google Places and Yelp
+collectors, a shared SQLite lead store, exports and Supabase sync.
+
+Importing the package (or any module in it) has no side effects: nothing
+reads .env or the environment, opens files or imports requests until a
+run asks for it. Build a config.Settings and hand it to the module you
+want, or use the command line:
+
+    python -m leadgen --help
+"""
@@ -0,0 +1,450 @@
+"""
+Offline end-to-end benchmark of the lead generators.
+
+Starts a local stand-in for Places Text Search / Place Details, Yelp
+business search and the Supabase REST endpoint, serving a synthetic
+metro of businesses, then runs lead_generator.main and/or
+yelp_lead_generator.main against it. Nothing leaves the machine.
+
+Usage:
+    python -m leadgen.benchmark [--source google|yelp|both] [--businesses 20000]
+                                [--target 500] [--budget 15] [--latency-ms 40]
+                                [--throttle-rate 0.02] [--error-rate 0.01] [--seed 1]
+
+Each generator runs in a fresh process and a scratch directory, so runs
+don't share caches or databases and peak RSS is the generator's own.
+Environment switches (TWO_TIER_FETCH, ASYNC_COLLECTION, TILING_MODE, ...)
+pass through, so the same command compares modes:
+
+    ASYNC_COLLECTION=1 python -m leadgen.benchmark --source google
+
+The synthetic dataset behaves like the real one where it matters: a
+query returns the businesses of its industry nearest to the place it
+names, so the core city search and the suburb searches overlap the way
+real ones do; Text Search stops after 60 results and Yelp after 1000.
+"""
+
+import argparse
+import json
+import math
+import multiprocessing
+import os
+import random
+import shutil
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from . import geo
+from . import metros
+
+INDUSTRIES = [
+    "warehouses", "distribution centers", "manufacturing", "apartments",
+    "hotels", "hospitals", "car dealerships", "gyms", "office buildings",
+    "auto repair", "car wash",
+]
+STREETS = ["Main St", "Colfax Ave", "Broadway", "Federal Blvd", "Alameda Ave",
+           "Wadsworth Blvd", "Santa Fe Dr", "Evans Ave", "Hampden Ave", "Quebec St"]
+NAME_WORDS = ["Summit", "Front Range", "Mile High", "Peak", "Cherry Creek", "Pioneer",
+              "Rocky", "Platte", "Union", "Centennial", "Alpine", "Metro"]
+
+GOOGLE_PAGE_SIZE = 20
+GOOGLE_MAX_RESULTS = 60
+YELP_MAX_RESULTS = 1000
+
+
+# ─── SYNTHETIC DATASET ───────────────────────────────────────────────
+def _industry_key(industry):
+    """"car dealerships" -> "car dealership", so Yelp's singular terms match too."""
+    return industry[:-1] if industry.endswith("s") else industry
+
+
+class Dataset:
+    """Businesses scattered over a metro, denser toward its center."""
+
+    def __init__(self, metro, count, seed):
+        rng = random.Random(seed)
+        radius_m = metro["radius_miles"] * 1609.34
+        self.metro = metro
+        self.centers = {metro["name"].lower(): (metro["lat"], metro["lng"])}
+        for area in metro["areas"]:
+            self.centers[area.lower()] = self._offset(metro["lat"], metro["lng"], rng, radius_m * 0.8)
+
+        self.by_industry = {industry: [] for industry in INDUSTRIES}
+        self.by_id = {}
+        areas = list(self.centers.items())
+        for i in range(count):
+            industry = rng.choice(INDUSTRIES)
+            city, (lat, lng) = rng.choice(areas)
+            lat, lng = self._offset(lat, lng, rng, radius_m * 0.25)
+            biz = {
+                "id": f"b{i:07d}",
+                "name": f"{rng.choice(NAME_WORDS)} {industry.title()} {i}",
+                "industry": industry,
+                "street": f"{rng.randint(100, 19999)} {rng.choice(STREETS)}",
+                "city": city.title(),
+                "zip": f"80{rng.randint(0, 299):03d}",
+                "phone": f"(303) {rng.randint(200, 999)}-{rng.randint(0, 9999):04d}" if rng.random() < 0.8 else None,
+                "website": f"https://example.com/{i}" if rng.random() < 0.6 else None,
+                "rating": round(rng.uniform(2.5, 5.0), 1),
+                "reviews": rng.randint(0, 900),
+                "lat": lat,
+                "lng": lng,
+            }
+            self.by_industry[industry].append(biz)
+            self.by_id[biz["id"]] = biz
+
+    @staticmethod
+    def _offset(lat, lng, rng, max_m):
+        # Square root keeps points uniform over the disc instead of bunched in the middle
+        distance = max_m * math.sqrt(rng.random())
+        bearing = rng.uniform(0, 2 * math.pi)
+        dlat = math.degrees(distance * math.cos(bearing) / geo.EARTH_RADIUS_METERS)
+        dlng = math.degrees(distance * math.sin(bearing) / (geo.EARTH_RADIUS_METERS * math.cos(math.radians(lat))))
+        return lat + dlat, lng + dlng
+
+    def industry_of(self, text):
+        text = text.lower()
+        return next((ind for ind in INDUSTRIES if _industry_key(ind) in text), None)
+
+    def center_of(self, text):
+        text = text.lower()
+        # Longest name first, so "highlands ranch" beats "ranch"-like substrings
+        for name in sorted(self.centers, key=len, reverse=True):
+            if name in text:
+                return self.centers[name]
+        return self.centers[self.metro["name"].lower()]
+
+    def search(self, text, limit, cell=None):
+        """Businesses of text's industry, nearest the place it names first."""
+        pool = self.by_industry.get(self.industry_of(text), [])
+        if cell:
+            south, west, north, east = cell
+            pool = [b for b in pool if south <= b["lat"] <= north and west <= b["lng"] <= east]
+            lat, lng = (south + north) / 2, (west + east) / 2
+        else:
+            lat, lng = self.center_of(text)
+        return sorted(pool, key=lambda b: geo.haversine_m(lat, lng, b["lat"], b["lng"]))[:limit]
+
+
+def google_place(biz, field_mask):
+    state = "CO"
+    place = {
+        "id": biz["id"],
+        "displayName": {"text": biz["name"]},
+        "formattedAddress": f"{biz['street']}, {biz['city']}, {state} {biz['zip']}, USA",
+        "rating": biz["rating"],
+        "userRatingCount": biz["reviews"],
+        "location": {"latitude": biz["lat"], "longitude": biz["lng"]},
+        "addressComponents": [
+            {"longText": biz["city"], "shortText": biz["city"], "types": ["locality"]},
+            {"longText": "Colorado", "shortText": state, "types": ["administrative_area_level_1"]},
+            {"longText": biz["zip"], "shortText": biz["zip"], "types": ["postal_code"]},
+        ],
+    }
+    if biz["phone"]:
+        place["nationalPhoneNumber"] = biz["phone"]
+    if biz["website"]:
+        place["websiteUri"] = biz["website"]
+    # Only the masked fields, as the API does ("places.id" in a search mask)
+    fields = {field.rsplit(".", 1)[-1] for field in field_mask.split(",")}
+    return {key: value for key, value in place.items() if key in fields}
+
+
+def yelp_business(biz, medium="api_v3_business_search"):
+    """Yelp tags listing URLs with where the response came from."""
+    return {
+        "id": biz["id"],
+        "name": biz["name"],
+        "location": {"address1": biz["street"], "city": biz["city"], "state": "CO", "zip_code": biz["zip"]},
+        "display_phone": biz["phone"] or "",
+        "url": f"https://www.yelp.com/biz/{biz['id']}?adjust_creative=benchmark"
+               f"&utm_campaign=yelp_api_v3&utm_medium={medium}&utm_source=benchmark",
+        "rating": biz["rating"],
+        "review_count": biz["reviews"],
+        "coordinates": {"latitude": biz["lat"], "longitude": biz["lng"]},
+    }
+
+
+# ─── MOCK SERVER ──────────────────────────────────────────────────────
+class MockHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server_version = "MockAPIs/1.0"
+
+    def log_message(self, *args):
+        pass
+
+    def _send(self, status, payload=None, headers=None):
+        body = json.dumps(payload).encode("utf-8") if payload is not None else b""
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _fault(self):
+        """Injected latency, then maybe a 429 or 503. True if one was sent."""
+        server = self.server
+        server.count("requests")
+        if server.latency:
+            time.sleep(server.latency * random.uniform(0.5, 1.5))
+        roll = random.random()
+        if roll < server.throttle_rate:
+            server.count("throttled")
+            self._send(429, {"error": "rate limited"}, {"Retry-After": "1"} if roll < server.throttle_rate / 2 else None)
+            return True
+        if roll < server.throttle_rate + server.error_rate:
+            server.count("errors")
+            self._send(503, {"error": "unavailable"})
+            return True
+        return False
+
+    def _body(self):
+        raw = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        return json.loads(raw) if raw else None
+
+    def do_POST(self):
+        body = self._body()
+        if self._fault():
+            return
+        url = urlparse(self.path)
+        if url.path == "/v1/places:searchText":
+            self._text_search(body)
+        elif url.path == "/rest/v1/leads":
+            self._upsert_leads(parse_qs(url.query), body or [])
+        else:
+            self._send(404, {"error": url.path})
+
+    def do_GET(self):
+        if self._fault():
+            return
+        url = urlparse(self.path)
+        if url.path.startswith("/v1/places/"):
+            biz = self.server.dataset.by_id.get(url.path.rsplit("/", 1)[1])
+            if biz is None:
+                self._send(404, {"error": "not found"})
+            else:
+                self.server.count("place_details")
+                self._send(200, google_place(biz, self.headers.get("X-Goog-FieldMask", "")))
+        elif url.path == "/v3/businesses/search":
+            self._yelp_search(parse_qs(url.query))
+        elif url.path.startswith("/v3/businesses/"):
+            biz = self.server.dataset.by_id.get(url.path.rsplit("/", 1)[1])
+            if biz is None:
+                self._send(404, {"error": {"code": "BUSINESS_NOT_FOUND"}})
+            else:
+                self.server.count("yelp_business")
+                self._send(200, yelp_business(biz, "api_v3_business_lookup"))
+        else:
+            self._send(404, {"error": url.path})
+
+    def _text_search(self, body):
+        self.server.count("text_search")
+        cell = None
+        rect = body.get("locationRestriction", {}).get("rectangle")
+        if rect:
+            low, high = rect["low"], rect["high"]
+            cell = (low["latitude"], low["longitude"], high["latitude"], high["longitude"])
+        results = self.server.dataset.search(body["textQuery"], GOOGLE_MAX_RESULTS, cell)
+        offset = int(body.get("pageToken") or 0)
+        page = results[offset:offset + GOOGLE_PAGE_SIZE]
+        mask = self.headers.get("X-Goog-FieldMask", "")
+        payload = {"places": [google_place(b, mask) for b in page]} if page else {}
+        if offset + GOOGLE_PAGE_SIZE < len(results):
+            payload["nextPageToken"] = str(offset + GOOGLE_PAGE_SIZE)
+        self._send(200, payload)
+
+    def _upsert_leads(self, params, rows):
+        """PostgREST's bulk insert. With merge-duplicates, rows are merged
+        on the on_conflict columns, else on the primary key, which lead
+        records don't carry; a place_id already stored then violates its
+        unique constraint and the whole request fails."""
+        merge = "resolution=merge-duplicates" in self.headers.get("Prefer", "")
+        on_place_id = merge and params.get("on_conflict") == ["place_id"]
+        leads = self.server.leads
+        with self.server.leads_lock:
+            if not on_place_id and any(row.get("place_id") in leads for row in rows):
+                self._send(409, {
+                    "code": "23505",
+                    "message": 'duplicate key value violates unique constraint "leads_place_id_key"',
+                })
+                return
+            for row in rows:
+                leads[row["place_id"]] = {**leads.get(row["place_id"], {}), **row}
+        self.server.count("supabase_rows", len(rows))
+        self._send(201)
+
+    def _yelp_search(self, params):
+        self.server.count("yelp_search")
+        offset = int(params.get("offset", ["0"])[0])
+        limit = int(params.get("limit", ["20"])[0])
+        if offset >= YELP_MAX_RESULTS:
+            self._send(400, {"error": {"code": "VALIDATION_ERROR"}})
+            return
+        text = f"{params.get('term', [''])[0]} {params.get('location', [''])[0]}"
+        results = self.server.dataset.search(text, YELP_MAX_RESULTS)
+        page = results[offset:offset + limit]
+        self._send(200, {"businesses": [yelp_business(b) for b in page], "total": len(results)})
+
+
+class MockServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, dataset, latency_ms=0, throttle_rate=0.0, error_rate=0.0):
+        super().__init__(("127.0.0.1", 0), MockHandler)
+        self.dataset = dataset
+        self.latency = latency_ms / 1000.0
+        self.throttle_rate = throttle_rate
+        self.error_rate = error_rate
+        self.counts = {}
+        self._lock = threading.Lock()
+        self.leads = {}  # the Supabase table, by place_id
+        self.leads_lock = threading.Lock()
+
+    def count(self, name, n=1):
+        with self._lock:
+            self.counts[name] = self.counts.get(name, 0) + n
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self.server_port}"
+
+
+# ─── BENCHMARK RUN ────────────────────────────────────────────────────
+def _peak_rss_mb():
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0
+
+
+def _run_generator(source, base_url, workdir, results):
+    """Child process: point one generator at the mock server and run it."""
+    os.chdir(workdir)
+    from . import metrics
+    if source == "google":
+        from . import lead_generator as generator
+        generator.TEXT_SEARCH_URL = f"{base_url}/v1/places:searchText"
+        generator.PLACE_DETAILS_URL = f"{base_url}/v1/places/{{place_id}}"
+    else:
+        from . import yelp_lead_generator as generator
+        generator.YELP_SEARCH_URL = f"{base_url}/v3/businesses/search"
+        generator.YELP_BUSINESS_URL = f"{base_url}/v3/businesses/{{id}}"
+    generator.PAGE_TOKEN_DELAY = 0
+
+    started = time.monotonic()
+    generator.main()
+    elapsed = time.monotonic() - started
+
+    def total(name, **labels):
+        return sum(
+            value for key, value in metrics.METRICS.counters.get(metrics.PREFIX + name, {}).items()
+            if all(dict(key).get(k) == v for k, v in labels.items())
+        )
+
+    results.put({
+        "source": source,
+        "seconds": elapsed,
+        "new_leads": total("new_leads_total", source=source),
+        "billable_calls": total("billable_calls_total", source=source),
+        "spend_usd": total("spend_usd_total", source=source),
+        "http_requests": total("http_requests_total"),
+        "throttled": total("http_throttled_total"),
+        "uploaded": total("upload_rows_total", result="sent"),
+        "peak_rss_mb": _peak_rss_mb(),
+    })
+
+
+def run(source, server):
+    """Run one generator in a fresh process and scratch directory."""
+    workdir = tempfile.mkdtemp(prefix=f"bench-{source}-")
+    ctx = multiprocessing.get_context("spawn")
+    results = ctx.Queue()
+    proc = ctx.Process(target=_run_generator, args=(source, server.base_url, workdir, results))
+    try:
+        proc.start()
+        proc.join()
+        if proc.exitcode != 0:
+            raise RuntimeError(f"{source} run exited with code {proc.exitcode}")
+        return results.get(timeout=5)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def report(result):
+    leads = result["new_leads"]
+
+    def per_lead(value):
+        return value / leads if leads else float("nan")
+
+    rss = result["peak_rss_mb"]
+    print(f"\n  {result['source'].upper()}")
+    print(f"    New leads:            {leads} in {result['seconds']:.1f}s ({leads / result['seconds']:.1f} leads/s)")
+    print(f"    Simulated cost:       ${result['spend_usd']:.2f} (${per_lead(result['spend_usd']):.4f} per lead)")
+    print(f"    Billable calls:       {result['billable_calls']} ({per_lead(result['billable_calls']):.3f} per new lead)")
+    print(f"    HTTP requests:        {result['http_requests']} ({result['throttled']} throttled)")
+    print(f"    Uploaded to Supabase: {result['uploaded']}")
+    print(f"    Peak RSS:             {rss:.0f} MB" if rss is not None else "    Peak RSS:             n/a")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the lead generators against local mock APIs.")
+    parser.add_argument("--source", choices=["google", "yelp", "both"], default="both")
+    parser.add_argument("--businesses", type=int, default=20000, help="synthetic businesses in the metro")
+    parser.add_argument("--target", type=int, default=500, help="target leads per run")
+    parser.add_argument("--budget", type=float, default=15.0, help="Google budget in USD")
+    parser.add_argument("--latency-ms", type=float, default=40.0, help="mean response latency")
+    parser.add_argument("--throttle-rate", type=float, default=0.02, help="fraction of requests answered 429")
+    parser.add_argument("--error-rate", type=float, default=0.01, help="fraction of requests answered 503")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    metro = dict(metros.default_metro(), target_leads=args.target, max_spend_usd=args.budget)
+    started = time.monotonic()
+    dataset = Dataset(metro, args.businesses, args.seed)
+    print(f"Synthetic {metro['name']}: {args.businesses} businesses ({time.monotonic() - started:.1f}s)")
+
+    server = MockServer(dataset, args.latency_ms, args.throttle_rate, args.error_rate)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    print(f"Mock APIs at {server.base_url}: {args.latency_ms:.0f}ms latency, "
+          f"{args.throttle_rate:.0%} 429s, {args.error_rate:.0%} 503s")
+
+    fd, metros_path = tempfile.mkstemp(prefix="bench-metros-", suffix=".json")
+    with os.fdopen(fd, "w") as f:
+        json.dump([metro], f)
+    # Set in the parent so each child's Settings.from_env() picks them up
+    os.environ.update({
+        "GOOGLE_PLACES_API_KEY": "benchmark",
+        "YELP_API_KEY": "benchmark",
+        "SUPABASE_URL": server.base_url,
+        "SUPABASE_KEY": "benchmark",
+        "METROS_PATH": metros_path,
+        "NO_PROXY": "127.0.0.1",
+    })
+
+    sources = ["google", "yelp"] if args.source == "both" else [args.source]
+    results = []
+    try:
+        for source in sources:
+            print(f"\n── Running {source} generator ──")
+            results.append(run(source, server))
+    finally:
+        server.shutdown()
+        os.remove(metros_path)
+
+    print("\n" + "=" * 60)
+    print("  BENCHMARK RESULTS")
+    print("=" * 60)
+    for result in results:
+        report(result)
+    print(f"\n  Mock server saw: {json.dumps(server.counts, sort_keys=True)}")
+
+
+if __name__ == "__main__":
+    main()
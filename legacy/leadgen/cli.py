@@ -0,0 +1,153 @@
+"""
+Command line for the lead generators.
+
+    python -m leadgen collect google|yelp      search, store, export, upload
+    python -m leadgen refresh google|yelp      re-check stale leads, store changes, export, upload
+    python -m leadgen export google|yelp [--parquet]
+    python -m leadgen upload google|yelp       sync new or changed leads to Supabase
+    python -m leadgen upload-csv [CSV_PATH] [--start-row N] [--retry-dead-letter] [--copy [--create-table]]
+    python -m leadgen stats google|yelp [--db PATH]
+    python -m leadgen normalize google|yelp [--db PATH]
+
+Settings come from .env and the environment (config.Settings.from_env).
+Each subcommand imports only what it needs, so `stats` and `--help`
+start without loading requests, pyarrow or the collectors.
+"""
+
+import argparse
+import importlib
+import sys
+
+GENERATORS = {"google": "lead_generator", "yelp": "yelp_lead_generator"}
+# Kept here rather than read off the generators so `stats` needn't import them
+DB_PATHS = {"google": "leads.db", "yelp": "yelp_leads.db"}
+
+
+def _generator(source):
+    return importlib.import_module(f".{GENERATORS[source]}", __package__)
+
+
+def _settings(**overrides):
+    from . import config
+
+    return config.Settings.from_env(**overrides)
+
+
+def collect(args):
+    return _generator(args.source).main(_settings())
+
+
+def refresh(args):
+    return _generator(args.source).refresh(_settings())
+
+
+def export(args):
+    generator = _generator(args.source)
+    settings = _settings()
+    if args.parquet:
+        settings.export_parquet = True
+    generator.configure(settings)
+    conn = generator.init_db()
+    try:
+        generator.export_csv(conn)
+        if generator.EXPORT_PARQUET:
+            generator.export_parquet(conn)
+    finally:
+        conn.close()
+
+
+def upload(args):
+    from . import http_client
+
+    generator = _generator(args.source)
+    generator.configure(_settings())
+    conn = generator.init_db()
+    try:
+        if not generator.upload_to_supabase(conn):
+            return 1
+    finally:
+        conn.close()
+        http_client.close_session()
+
+
+def stats(args):
+    import sqlite3
+
+    from . import lead_store
+
+    path = args.db or DB_PATHS[args.source]
+    try:
+        conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+        total = lead_store.count_leads(conn)
+    except sqlite3.OperationalError as e:
+        print(f"Can't read {path}: {e}")
+        return 1
+    try:
+        with_phone = lead_store.count_with_phone(conn)
+        print(f"  {path}")
+        print(f"  Total leads:               {total}")
+        print(f"  With phone numbers:        {with_phone}")
+        if total > 0:
+            print(f"  Phone coverage:            {with_phone/total*100:.1f}%")
+        lead_store.print_industry_breakdown(conn)
+    finally:
+        conn.close()
+
+
+def normalize(args):
+    from . import lead_store
+
+    path = args.db or DB_PATHS[args.source]
+    conn = lead_store.init_db(path)  # fills keys that are missing
+    try:
+        updated = lead_store.normalize_stored(conn, only_missing=False)
+        print(f"  Normalized {updated} leads in {path}")
+    finally:
+        conn.close()
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="leadgen", description="Collect and publish vending machine leads.")
+    commands = parser.add_subparsers(dest="command", required=True, metavar="command")
+    sources = sorted(GENERATORS)
+
+    p = commands.add_parser("collect", help="run a collection: search, store, export and upload")
+    p.add_argument("source", choices=sources)
+    p.set_defaults(func=collect)
+
+    p = commands.add_parser("refresh", help="re-check stale leads and store what changed")
+    p.add_argument("source", choices=sources)
+    p.set_defaults(func=refresh)
+
+    p = commands.add_parser("export", help="export the lead database to CSV (and Parquet)")
+    p.add_argument("source", choices=sources)
+    p.add_argument("--parquet", action="store_true", help="also write the Parquet dataset")
+    p.set_defaults(func=export)
+
+    p = commands.add_parser("upload", help="sync new or changed leads to Supabase")
+    p.add_argument("source", choices=sources)
+    p.set_defaults(func=upload)
+
+    # Parsed by upload_to_supabase.main; listed here for --help
+    commands.add_parser("upload-csv", help="upload a leads CSV to Supabase (see upload-csv --help)", add_help=False)
+
+    p = commands.add_parser("stats", help="lead counts and industry breakdown")
+    p.add_argument("source", choices=sources)
+    p.add_argument("--db", help="database to read (default: the source's)")
+    p.set_defaults(func=stats)
+
+    p = commands.add_parser("normalize", help="recompute every lead's normalized match keys")
+    p.add_argument("source", choices=sources)
+    p.add_argument("--db", help="database to update (default: the source's)")
+    p.set_defaults(func=normalize)
+    return parser
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else list(argv)
+    if argv and argv[0] == "upload-csv":
+        from . import upload_to_supabase
+
+        return upload_to_supabase.main(argv[1:], prog="leadgen upload-csv")
+    args = build_parser().parse_args(argv)
+    return args.func(args)
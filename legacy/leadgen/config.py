@@ -0,0 +1,119 @@
+"""
+Run configuration.
+
+Settings() holds the defaults and reads nothing; Settings.from_env()
+loads .env (once) and reads the same environment variables the scripts
+always have. Keyword arguments override either:
+
+    from leadgen import config, lead_generator
+    lead_generator.configure(config.Settings.from_env(two_tier_fetch=True))
+
+Nothing here runs at import time, so importing the package never touches
+the environment or the working directory's .env file.
+"""
+
+import os
+
+_env_loaded = False
+
+
+def load_env():
+    """Load .env into os.environ (existing variables win). Idempotent;
+    skipped quietly when python-dotenv isn't installed."""
+    global _env_loaded
+    if _env_loaded:
+        return
+    _env_loaded = True
+    try:
+        from dotenv import load_dotenv
+    except ImportError:
+        return
+    load_dotenv()
+
+
+def _flag(env, name):
+    return env.get(name, "0") == "1"
+
+
+def _number(env, name, default, kind=float):
+    value = env.get(name)
+    return kind(value) if value not in (None, "") else default
+
+
+class Settings:
+    """Everything a collection, export or upload run can be configured
+    with. Attribute names are the environment variable names, lower-cased."""
+
+    def __init__(self, env=None, **overrides):
+        env = {} if env is None else env
+
+        # Credentials
+        self.google_places_api_key = env.get("GOOGLE_PLACES_API_KEY")
+        self.yelp_api_key = env.get("YELP_API_KEY")
+        self.supabase_url = env.get("SUPABASE_URL")
+        self.supabase_key = env.get("SUPABASE_KEY")
+        self.supabase_db_url = env.get("SUPABASE_DB_URL")
+
+        # Collection modes (Google)
+        self.async_collection = _flag(env, "ASYNC_COLLECTION")
+        self.max_concurrent_streams = _number(env, "MAX_CONCURRENT_STREAMS", 8, int)
+        self.tiling_mode = _flag(env, "TILING_MODE")
+        self.min_tile_meters = _number(env, "MIN_TILE_METERS", 1500.0)
+        self.two_tier_fetch = _flag(env, "TWO_TIER_FETCH")
+        self.detail_concurrency = _number(env, "DETAIL_CONCURRENCY", 8, int)
+
+        # Request pacing; None means the source's own ceiling
+        self.max_requests_per_second = _number(env, "MAX_REQUESTS_PER_SECOND", None)
+        self.max_retries = _number(env, "MAX_RETRIES", 5, int)
+        self.http_pool_size = _number(env, "HTTP_POOL_SIZE", 16, int)
+        self.http2 = _flag(env, "HTTP2")
+
+        # Response cache
+        self.http_cache_path = env.get("HTTP_CACHE_PATH", "http_cache.db")
+        self.http_cache_ttl_hours = _number(env, "HTTP_CACHE_TTL_HOURS", 24.0)
+        self.http_cache_max_mb = _number(env, "HTTP_CACHE_MAX_MB", 256.0)
+
+        # Query scheduling and budgets
+        self.reset_frontier = _flag(env, "RESET_FRONTIER")
+        self.min_leads_per_dollar = _number(env, "MIN_LEADS_PER_DOLLAR", 30.0)
+        self.min_leads_per_call = _number(env, "MIN_LEADS_PER_CALL", 2.0)
+        self.global_max_spend_usd = _number(env, "GLOBAL_MAX_SPEND_USD", 50.0)
+
+        # Refresh runs (leadgen refresh): leads not checked in this many
+        # days are re-fetched, at most refresh_limit per run
+        self.refresh_after_days = _number(env, "REFRESH_AFTER_DAYS", 30.0)
+        self.refresh_limit = _number(env, "REFRESH_LIMIT", 1000, int)
+
+        # Metros
+        self.metros_path = env.get("METROS_PATH")
+        self.metro_workers = _number(env, "METRO_WORKERS", 4, int)
+        self.shard_dir = env.get("SHARD_DIR", "shards")
+
+        # Export and upload
+        self.export_gzip = _flag(env, "EXPORT_GZIP")
+        self.export_incremental = _flag(env, "EXPORT_INCREMENTAL")
+        self.export_parquet = _flag(env, "EXPORT_PARQUET")
+        self.sync_workers = _number(env, "SYNC_WORKERS", 4, int)
+
+        # Metrics
+        self.metrics_path = env.get("METRICS_PATH")
+        self.metrics_interval = _number(env, "METRICS_INTERVAL", 5.0)
+
+        for name, value in overrides.items():
+            if not hasattr(self, name):
+                raise TypeError(f"Unknown setting {name!r}")
+            setattr(self, name, value)
+
+    @classmethod
+    def from_env(cls, **overrides):
+        """Settings from the environment, after loading .env."""
+        load_env()
+        return cls(os.environ, **overrides)
+
+    def __repr__(self):
+        # Keep keys out of logs
+        shown = {
+            name: ("***" if value and name.endswith(("_key", "_db_url")) else value)
+            for name, value in vars(self).items()
+        }
+        return f"Settings({shown})"
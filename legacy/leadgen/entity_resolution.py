@@ -0,0 +1,287 @@
+"""
+Merge Google and Yelp leads for the same business into golden records.
+
+Usage:
+    python -m leadgen.entity_resolution [DB_PATH ...]
+
+Defaults to leads.db and yelp_leads.db; results are written to the first
+database. Leads are told apart by source_id prefix ("yelp_" for Yelp),
+so a database holding both feeds works too.
+
+Names and phones are normalized the way the sales CRM does (migration
+135: lower-cased, whitespace-collapsed names; digits-only phones, here
+without a leading US country code). Candidate pairs come only from
+blocks — leads sharing a phone number, or sitting in the same or an
+adjacent ~150m geohash cell — so the work grows with the data instead
+of with its square. Pairs scoring at least MATCH_THRESHOLD are linked,
+and each connected group becomes one row in golden_leads, with every
+source id listed in golden_links.
+"""
+
+import re
+import sqlite3
+import sys
+from collections import defaultdict
+from difflib import SequenceMatcher
+
+from . import geo
+from .lead_store import _now
+from .normalize import name_key
+
+GEOHASH_PRECISION = 7
+# Blocks bigger than this (a shared call-center number, a mall) are
+# skipped rather than compared all-pairs
+MAX_BLOCK_SIZE = 200
+MATCH_THRESHOLD = 0.7
+
+DB_PATHS = ["leads.db", "yelp_leads.db"]
+
+
+def normalize_phone(phone):
+    """Digits only, without the US +1 prefix. None if there are no digits."""
+    digits = re.sub(r"\D", "", phone or "")
+    if len(digits) == 11 and digits.startswith("1"):
+        digits = digits[1:]
+    return digits or None
+
+
+def normalize_name(name):
+    """Migration 135's normalized_business_name: lower, trimmed, single spaces."""
+    return re.sub(r"\s+", " ", (name or "").strip()).lower()
+
+
+def source_of(source_id):
+    return "yelp" if source_id.startswith("yelp_") else "google"
+
+
+class Lead:
+    __slots__ = ("source", "source_id", "row", "phone", "name_key", "lat", "lng", "cell")
+
+    def __init__(self, row):
+        self.row = row
+        self.source_id = row["place_id"]
+        self.source = source_of(self.source_id)
+        self.phone = normalize_phone(row["phone_number"])
+        self.name_key = name_key(row["business_name"])
+        self.lat = row["latitude"]
+        self.lng = row["longitude"]
+        self.cell = None
+        if self.lat is not None and self.lng is not None:
+            self.cell = geo.geohash(self.lat, self.lng, GEOHASH_PRECISION)
+
+
+def load_leads(paths):
+    leads = []
+    seen = set()
+    for path in paths:
+        conn = sqlite3.connect(path)
+        conn.row_factory = sqlite3.Row
+        try:
+            for row in conn.execute("SELECT * FROM leads ORDER BY id"):
+                if row["place_id"] not in seen:
+                    seen.add(row["place_id"])
+                    leads.append(Lead(row))
+        except sqlite3.OperationalError as e:
+            print(f"  Skipping {path}: {e}")
+        finally:
+            conn.close()
+    return leads
+
+
+def candidate_pairs(leads):
+    """Index pairs (i, j), i < j, from different sources that share a block."""
+    by_phone = defaultdict(list)
+    by_cell = defaultdict(list)
+    for i, lead in enumerate(leads):
+        if lead.phone:
+            by_phone[lead.phone].append(i)
+        if lead.cell:
+            by_cell[lead.cell].append(i)
+
+    pairs = set()
+    for block in by_phone.values():
+        if 1 < len(block) <= MAX_BLOCK_SIZE:
+            pairs.update(_cross_source(leads, block, block))
+    for cell, block in by_cell.items():
+        nearby = [j for code in geo.geohash_neighbors(cell) for j in by_cell.get(code, ())]
+        if len(nearby) <= MAX_BLOCK_SIZE:
+            pairs.update(_cross_source(leads, block, nearby))
+    return pairs
+
+
+def _cross_source(leads, left, right):
+    for i in left:
+        for j in right:
+            if i < j and leads[i].source != leads[j].source:
+                yield i, j
+
+
+def score(a, b, floor=0.0):
+    """Match confidence in [0, 1] from name similarity, phone and distance.
+
+    Pairs that can't reach floor return 0.0 early: the cheap phone and
+    distance terms are scored first and bound how much the name must add.
+    """
+    result = 0.0
+    if a.phone and b.phone:
+        result += 0.35 if a.phone == b.phone else -0.2
+    if a.cell and b.cell:
+        meters = geo.haversine_m(a.lat, a.lng, b.lat, b.lng)
+        if meters <= 75:
+            result += 0.25
+        elif meters <= 250:
+            result += 0.1
+        elif meters > 1000:
+            result -= 0.3
+
+    if not (a.name_key and b.name_key):
+        return max(0.0, min(1.0, result))
+    needed = (floor - result) / 0.6
+    if needed > 1.0:
+        return 0.0
+    matcher = SequenceMatcher(None, a.name_key, b.name_key, autojunk=False)
+    if matcher.real_quick_ratio() < needed or matcher.quick_ratio() < needed:
+        return 0.0
+    return max(0.0, min(1.0, result + 0.6 * matcher.ratio()))
+
+
+def cluster(n, matches):
+    """Union-find over matched pairs. Returns a list of index groups."""
+    parent = list(range(n))
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    for i, j, _ in matches:
+        parent[find(i)] = find(j)
+
+    groups = defaultdict(list)
+    for i in range(n):
+        groups[find(i)].append(i)
+    return list(groups.values())
+
+
+def golden_record(members):
+    """Merge a group, Google fields first, Yelp filling the gaps."""
+    members = sorted(members, key=lambda lead: lead.source != "google")
+    merged = {}
+    for col in ("business_name", "industry", "address", "city", "state", "zip",
+                "phone_number", "website", "latitude", "longitude"):
+        merged[col] = next((m.row[col] for m in members if m.row[col] not in (None, "")), None)
+    # Yelp's "website" is its own listing page; prefer a real site
+    google_site = next((m.row["website"] for m in members if m.source == "google" and m.row["website"]), None)
+    merged["website"] = google_site or merged["website"]
+    merged["normalized_name"] = normalize_name(merged["business_name"])
+    merged["normalized_phone"] = normalize_phone(merged["phone_number"])
+    for source in ("google", "yelp"):
+        member = next((m for m in members if m.source == source), None)
+        merged[f"{source}_id"] = member.source_id if member else None
+        merged[f"{source}_rating"] = member.row["google_rating"] if member else None
+    return merged
+
+
+GOLDEN_COLUMNS = [
+    "business_name", "industry", "address", "city", "state", "zip",
+    "phone_number", "website", "latitude", "longitude",
+    "normalized_name", "normalized_phone",
+    "google_id", "google_rating", "yelp_id", "yelp_rating",
+]
+
+
+def write_golden(conn, leads, groups, scores):
+    conn.executescript("""
+        DROP TABLE IF EXISTS golden_links;
+        DROP TABLE IF EXISTS golden_leads;
+        CREATE TABLE golden_leads (
+            golden_id INTEGER PRIMARY KEY,
+            business_name TEXT,
+            industry TEXT,
+            address TEXT,
+            city TEXT,
+            state TEXT,
+            zip TEXT,
+            phone_number TEXT,
+            website TEXT,
+            latitude REAL,
+            longitude REAL,
+            normalized_name TEXT,
+            normalized_phone TEXT,
+            google_id TEXT,
+            google_rating REAL,
+            yelp_id TEXT,
+            yelp_rating REAL,
+            source_count INTEGER,
+            resolved_at TEXT
+        );
+        CREATE TABLE golden_links (
+            golden_id INTEGER NOT NULL REFERENCES golden_leads(golden_id),
+            source TEXT NOT NULL,
+            source_id TEXT PRIMARY KEY,
+            match_score REAL
+        );
+        CREATE INDEX idx_golden_links_golden ON golden_links(golden_id);
+        CREATE INDEX idx_golden_leads_name_phone ON golden_leads(normalized_name, normalized_phone);
+    """)
+    now = _now()
+    golden_rows = []
+    link_rows = []
+    for golden_id, group in enumerate(groups, start=1):
+        members = [leads[i] for i in group]
+        record = golden_record(members)
+        golden_rows.append((golden_id, *(record[col] for col in GOLDEN_COLUMNS), len(members), now))
+        for i in group:
+            link_rows.append((golden_id, leads[i].source, leads[i].source_id, scores.get(i)))
+    with conn:
+        conn.executemany(
+            f"INSERT INTO golden_leads VALUES ({', '.join('?' for _ in range(len(GOLDEN_COLUMNS) + 3))})",
+            golden_rows,
+        )
+        conn.executemany("INSERT INTO golden_links VALUES (?, ?, ?, ?)", link_rows)
+
+
+def resolve(paths):
+    """Resolve the leads in paths into golden tables in paths[0]. Returns
+    (leads, golden records, merged groups)."""
+    leads = load_leads(paths)
+    pairs = candidate_pairs(leads)
+    matches = []
+    for i, j in pairs:
+        s = score(leads[i], leads[j], MATCH_THRESHOLD)
+        if s >= MATCH_THRESHOLD:
+            matches.append((i, j, s))
+
+    # One lead per source per group: keep only each lead's best match so a
+    # Google lead can't absorb two different Yelp businesses
+    matches.sort(key=lambda m: -m[2])
+    taken = set()
+    kept = []
+    scores = {}
+    for i, j, s in matches:
+        if i in taken or j in taken:
+            continue
+        taken.update((i, j))
+        kept.append((i, j, s))
+        scores[i] = scores[j] = s
+
+    groups = cluster(len(leads), kept)
+    conn = sqlite3.connect(paths[0])
+    try:
+        write_golden(conn, leads, groups, scores)
+    finally:
+        conn.close()
+    return len(leads), len(groups), len(kept)
+
+
+def main():
+    paths = sys.argv[1:] or DB_PATHS
+    print(f"Resolving leads from {', '.join(paths)}...")
+    total, golden, merged = resolve(paths)
+    print(f"  {total} source leads -> {golden} golden records ({merged} Google/Yelp pairs merged)")
+    print(f"  Written to golden_leads / golden_links in {paths[0]}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+"""
+Small geometry helpers shared by the lead generators: great-circle
+distance and the lat/lng rectangles used for tiled searches.
+A cell is a (south, west, north, east) tuple in degrees.
+"""
+
+import math
+
+EARTH_RADIUS_METERS = 6371008.8
+
+
+def haversine_m(lat1, lng1, lat2, lng2):
+    """Great-circle distance in meters."""
+    phi1 = math.radians(lat1)
+    phi2 = math.radians(lat2)
+    dphi = phi2 - phi1
+    dlmb = math.radians(lng2 - lng1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlmb / 2) ** 2
+    return 2 * EARTH_RADIUS_METERS * math.asin(min(1.0, math.sqrt(a)))
+
+
+def bounding_box(lat, lng, radius_m):
+    """Smallest cell containing a circle of radius_m around (lat, lng)."""
+    dlat = math.degrees(radius_m / EARTH_RADIUS_METERS)
+    dlng = math.degrees(radius_m / (EARTH_RADIUS_METERS * math.cos(math.radians(lat))))
+    return (lat - dlat, lng - dlng, lat + dlat, lng + dlng)
+
+
+def split_cell(cell):
+    """Quadtree split into four equal children."""
+    south, west, north, east = cell
+    mid_lat = (south + north) / 2
+    mid_lng = (west + east) / 2
+    return [
+        (south, west, mid_lat, mid_lng),
+        (south, mid_lng, mid_lat, east),
+        (mid_lat, west, north, mid_lng),
+        (mid_lat, mid_lng, north, east),
+    ]
+
+
+def cell_size_m(cell):
+    """Length of the cell's longer side in meters."""
+    south, west, north, east = cell
+    mid_lat = (south + north) / 2
+    height = haversine_m(south, west, north, west)
+    width = haversine_m(mid_lat, west, mid_lat, east)
+    return max(height, width)
+
+
+def cell_intersects_circle(cell, lat, lng, radius_m):
+    south, west, north, east = cell
+    nearest_lat = min(max(lat, south), north)
+    nearest_lng = min(max(lng, west), east)
+    return haversine_m(lat, lng, nearest_lat, nearest_lng) <= radius_m
+
+
+def cell_to_rectangle(cell):
+    """Places API (New) locationRestriction rectangle."""
+    south, west, north, east = cell
+    return {
+        "rectangle": {
+            "low": {"latitude": south, "longitude": west},
+            "high": {"latitude": north, "longitude": east},
+        }
+    }
+
+
+# ─── GEOHASH ──────────────────────────────────────────────────────────
+_BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+
+
+def geohash(lat, lng, precision=7):
+    """Standard base32 geohash. Precision 7 cells are ~150m x 150m."""
+    south, north = -90.0, 90.0
+    west, east = -180.0, 180.0
+    chars = []
+    bits = 0
+    value = 0
+    even = True
+    while len(chars) < precision:
+        if even:
+            mid = (west + east) / 2
+            if lng >= mid:
+                value = value * 2 + 1
+                west = mid
+            else:
+                value *= 2
+                east = mid
+        else:
+            mid = (south + north) / 2
+            if lat >= mid:
+                value = value * 2 + 1
+                south = mid
+            else:
+                value *= 2
+                north = mid
+        even = not even
+        bits += 1
+        if bits == 5:
+            chars.append(_BASE32[value])
+            bits = 0
+            value = 0
+    return "".join(chars)
+
+
+def geohash_cell(code):
+    """The (south, west, north, east) cell a geohash covers."""
+    south, north = -90.0, 90.0
+    west, east = -180.0, 180.0
+    even = True
+    for char in code:
+        value = _BASE32.index(char)
+        for shift in range(4, -1, -1):
+            bit = (value >> shift) & 1
+            if even:
+                mid = (west + east) / 2
+                if bit:
+                    west = mid
+                else:
+                    east = mid
+            else:
+                mid = (south + north) / 2
+                if bit:
+                    south = mid
+                else:
+                    north = mid
+            even = not even
+    return (south, west, north, east)
+
+
+def geohash_neighbors(code):
+    """The geohash and its eight neighbors (fewer at the poles)."""
+    south, west, north, east = geohash_cell(code)
+    lat = (south + north) / 2
+    lng = (west + east) / 2
+    dlat = north - south
+    dlng = east - west
+    cells = []
+    for i in (-1, 0, 1):
+        for j in (-1, 0, 1):
+            n_lat = lat + i * dlat
+            if not -90 <= n_lat <= 90:
+                continue
+            n_lng = (lng + j * dlng + 180) % 360 - 180
+            cells.append(geohash(n_lat, n_lng, len(code)))
+    return list(dict.fromkeys(cells))
@@ -0,0 +1,154 @@
+"""
+Persistent on-disk cache for search API responses.
+
+Responses are keyed by a fingerprint of the request (method, URL, query
+params, JSON body and field mask — never the API key), stored
+zlib-compressed in SQLite, expire after a TTL and are evicted least
+recently used once the cache grows past its size limit. Only 200s are
+cached, so errors are always retried live.
+"""
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+import zlib
+
+# Request headers that change what the API returns. Auth headers are
+# deliberately left out so rotating a key doesn't invalidate the cache.
+FINGERPRINT_HEADERS = ("X-Goog-FieldMask",)
+
+
+def fingerprint(method, url, params=None, json_body=None, headers=None):
+    headers = headers or {}
+    parts = {
+        "method": method.upper(),
+        "url": url.rstrip("/"),
+        "params": {k: str(v) for k, v in (params or {}).items()},
+        "body": json_body,
+        "headers": {h: headers[h] for h in FINGERPRINT_HEADERS if h in headers},
+    }
+    raw = json.dumps(parts, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class CachedResponse:
+    """The subset of requests.Response the generators read."""
+
+    from_cache = True
+
+    def __init__(self, status_code, content):
+        self.status_code = status_code
+        self.content = content
+
+    @property
+    def text(self):
+        return self.content.decode("utf-8", errors="replace")
+
+    def json(self):
+        return json.loads(self.content)
+
+
+class ResponseCache:
+    def __init__(self, path, ttl_seconds, max_bytes):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._conn = None
+        self._size = 0
+        # One connection shared by the async collector's worker threads
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        if self._conn is None:
+            # Multi-metro workers share the file; wait out each other's writes
+            conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS responses (
+                    key TEXT PRIMARY KEY,
+                    status INTEGER,
+                    body BLOB,
+                    size INTEGER,
+                    created_at REAL,
+                    last_access REAL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_responses_last_access ON responses(last_access)")
+            conn.commit()
+            self._size = conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+            self._conn = conn
+        return self._conn
+
+    def get(self, key):
+        with self._lock:
+            conn = self._connect()
+            row = conn.execute(
+                "SELECT status, body, size, created_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            now = time.time()
+            if row is None:
+                self.misses += 1
+                return None
+            status, body, size, created_at = row
+            if now - created_at > self.ttl_seconds:
+                with conn:
+                    conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self._size -= size
+                self.misses += 1
+                return None
+            with conn:
+                conn.execute("UPDATE responses SET last_access = ? WHERE key = ?", (now, key))
+            self.hits += 1
+        return CachedResponse(status, zlib.decompress(body))
+
+    def put(self, key, resp):
+        if resp.status_code != 200:
+            return
+        body = zlib.compress(resp.content, 6)
+        size = len(body)
+        if size > self.max_bytes:
+            return
+        now = time.time()
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                old = conn.execute("SELECT size FROM responses WHERE key = ?", (key,)).fetchone()
+                conn.execute(
+                    "INSERT OR REPLACE INTO responses (key, status, body, size, created_at, last_access) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (key, resp.status_code, body, size, now, now),
+                )
+                self._size += size - (old[0] if old else 0)
+                if self._size > self.max_bytes:
+                    self._evict(conn)
+
+    def _evict(self, conn):
+        """Drop expired entries, then least recently used ones until under max_bytes."""
+        cutoff = time.time() - self.ttl_seconds
+        expired = conn.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM responses WHERE created_at < ?", (cutoff,)
+        ).fetchone()[0]
+        conn.execute("DELETE FROM responses WHERE created_at < ?", (cutoff,))
+        self._size -= expired
+        cur = conn.execute("SELECT key, size FROM responses ORDER BY last_access")
+        doomed = []
+        for key, size in cur:
+            if self._size <= self.max_bytes:
+                break
+            doomed.append((key,))
+            self._size -= size
+        conn.executemany("DELETE FROM responses WHERE key = ?", doomed)
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def summary(self):
+        return f"  Response cache: {self.hits} hits, {self.misses} misses ({self.path})"
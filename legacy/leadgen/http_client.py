@@ -0,0 +1,90 @@
+"""
+Shared HTTP session for the lead generators and Supabase uploaders.
+
+One pooled, keep-alive session per run, so repeat calls to
+places.googleapis.com, api.yelp.com and the Supabase REST endpoint reuse
+open TCP/TLS connections instead of handshaking every time. Responses are
+requested gzip-compressed and decoded transparently.
+
+Set HTTP2=1 (requires `pip install httpx[http2]`) to multiplex requests
+over HTTP/2 instead. The generators' configure() sets both knobs below.
+requests (or httpx) is only imported once a session is needed.
+"""
+
+HTTP_POOL_SIZE = 16
+HTTP2 = False
+
+_session = None
+
+
+class Http2Session:
+    """httpx-backed stand-in for requests.Session.
+
+    Only the get/post/close surface the generators use. httpx errors are
+    re-raised as requests exceptions so existing retry handling still works.
+    """
+
+    def __init__(self, pool_size):
+        import httpx
+
+        self._httpx = httpx
+        self._client = httpx.Client(
+            http2=True,
+            limits=httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size),
+            headers={"Accept-Encoding": "gzip, deflate"},
+        )
+
+    def request(self, method, url, params=None, json=None, data=None, headers=None, timeout=None):
+        import requests
+
+        try:
+            return self._client.request(
+                method, url, params=params, json=json, content=data, headers=headers, timeout=timeout
+            )
+        except self._httpx.TimeoutException as e:
+            raise requests.Timeout(str(e)) from e
+        except self._httpx.HTTPError as e:
+            raise requests.ConnectionError(str(e)) from e
+
+    def get(self, url, **kwargs):
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request("POST", url, **kwargs)
+
+    def close(self):
+        self._client.close()
+
+
+def _make_session(pool_size):
+    import requests
+    from requests.adapters import HTTPAdapter
+
+    session = requests.Session()
+    # Retries are handled by api_request_with_retry, not urllib3
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size, max_retries=0)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers["Accept-Encoding"] = "gzip, deflate"
+    return session
+
+
+def get_session():
+    """The run's shared session, created on first use."""
+    global _session
+    if _session is None:
+        if HTTP2:
+            try:
+                _session = Http2Session(HTTP_POOL_SIZE)
+            except ImportError:
+                print("  HTTP2=1 but httpx[http2] is not installed. Falling back to HTTP/1.1.")
+        if _session is None:
+            _session = _make_session(HTTP_POOL_SIZE)
+    return _session
+
+
+def close_session():
+    global _session
+    if _session is not None:
+        _session.close()
+        _session = None
@@ -0,0 +1,246 @@
+"""
+Streaming exports of the leads table, shared by both generators.
+
+Rows are read in id order with fetchmany, so memory stays flat and
+SQLite walks the primary key instead of sorting. CSV output can be
+gzipped, and an incremental export appends only rows inserted since the
+last export of the same file, tracked by an id watermark stored in the
+database next to the leads. Leads changed in place since then (see
+lead_refresh) make it rewrite the file instead.
+
+The Parquet export (requires `pip install pyarrow`) writes a typed,
+zstd-compressed dataset partitioned by industry and state, with one
+schema for Google and Yelp leads.
+"""
+
+import csv
+import gzip
+import os
+import shutil
+from urllib.parse import quote
+
+from .lead_store import LEAD_COLUMNS, _now
+
+EXPORT_BATCH_SIZE = 5000
+
+
+def init_export_state(conn):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS export_state (
+            path TEXT PRIMARY KEY,
+            last_id INTEGER NOT NULL,
+            rows INTEGER NOT NULL,
+            updated_at TEXT
+        )
+    """)
+    conn.commit()
+
+
+def get_watermark(conn, path):
+    """(last_id, rows) of the last export to path, or None if there was
+    none or a lead has been updated since."""
+    init_export_state(conn)
+    row = conn.execute(
+        "SELECT last_id, rows, updated_at FROM export_state WHERE path = ?", (path,)
+    ).fetchone()
+    if row is None:
+        return None
+    last_id, rows, exported_at = row
+    updated = conn.execute(
+        "SELECT 1 FROM leads WHERE updated_at > ? LIMIT 1", (exported_at or "",)
+    ).fetchone()
+    return None if updated else (last_id, rows)
+
+
+def save_watermark(conn, path, last_id, rows):
+    init_export_state(conn)
+    with conn:
+        conn.execute("""
+            INSERT INTO export_state (path, last_id, rows, updated_at)
+            VALUES (?, ?, ?, ?)
+            ON CONFLICT (path) DO UPDATE SET
+                last_id = excluded.last_id,
+                rows = excluded.rows,
+                updated_at = excluded.updated_at
+        """, (path, last_id, rows, _now()))
+
+
+def open_csv(path, mode="r"):
+    """Open a CSV for text I/O, through gzip if the name ends in .gz."""
+    if path.endswith(".gz"):
+        return gzip.open(path, mode + "t", newline="", encoding="utf-8", compresslevel=6)
+    return open(path, mode, newline="", encoding="utf-8")
+
+
+def iter_rows(conn, after_id=0, batch_size=EXPORT_BATCH_SIZE):
+    """Yield (id, *LEAD_COLUMNS) rows with id > after_id, batch_size at a time."""
+    cur = conn.execute(
+        f"SELECT id, {', '.join(LEAD_COLUMNS)} FROM leads WHERE id > ? ORDER BY id",
+        (after_id,),
+    )
+    while True:
+        rows = cur.fetchmany(batch_size)
+        if not rows:
+            return
+        yield rows
+
+
+def export_csv(conn, path, header=LEAD_COLUMNS, incremental=False, batch_size=EXPORT_BATCH_SIZE):
+    """Stream leads to path (gzipped if it ends in .gz). Returns (written, total).
+
+    A full export writes a temp file and swaps it in, so readers never see
+    a half-written CSV. An incremental export appends rows newer than the
+    file's watermark; it falls back to a full export when there is no
+    watermark or the file has gone missing. A gzip file grows by one
+    member per append, which gzip readers concatenate transparently.
+    """
+    mark = get_watermark(conn, path) if incremental else None
+    if mark is not None and not os.path.exists(path):
+        mark = None
+    last_id, total = mark if mark else (0, 0)
+
+    # Temp name keeps the .gz suffix so it is written the same way
+    head, tail = os.path.split(path)
+    target = path if mark else os.path.join(head, ".tmp-" + tail)
+    written = 0
+    with open_csv(target, "a" if mark else "w") as f:
+        writer = csv.writer(f)
+        if not mark:
+            writer.writerow(header)
+        for rows in iter_rows(conn, last_id, batch_size):
+            writer.writerows(row[1:] for row in rows)
+            last_id = rows[-1][0]
+            written += len(rows)
+    if not mark:
+        os.replace(target, path)
+
+    save_watermark(conn, path, last_id, total + written)
+    return written, total + written
+
+
+# ─── PARQUET ──────────────────────────────────────────────────────────
+# Source-neutral names: google_rating/place_id hold Yelp's rating and
+# business id in yelp_leads.db
+PARQUET_RENAMES = {"google_rating": "rating", "place_id": "source_id"}
+PARTITION_COLUMNS = ["industry", "state"]
+HIVE_NULL = "__HIVE_DEFAULT_PARTITION__"
+
+
+def parquet_schema(pa):
+    return pa.schema([
+        ("business_name", pa.string()),
+        ("industry", pa.string()),
+        ("address", pa.string()),
+        ("city", pa.string()),
+        ("state", pa.string()),
+        ("zip", pa.string()),
+        ("phone_number", pa.string()),
+        ("website", pa.string()),
+        ("rating", pa.float32()),
+        ("total_reviews", pa.int32()),
+        ("source_id", pa.string()),
+        ("latitude", pa.float64()),
+        ("longitude", pa.float64()),
+        ("created_at", pa.timestamp("us", tz="UTC")),
+        ("source", pa.string()),
+    ])
+
+
+def _partition_dir(root, key):
+    parts = [
+        f"{col}={quote(value, safe='') if value else HIVE_NULL}"
+        for col, value in zip(PARTITION_COLUMNS, key)
+    ]
+    return os.path.join(root, *parts)
+
+
+def export_parquet(conn, out_dir, source, batch_size=EXPORT_BATCH_SIZE):
+    """Stream leads into a Hive-partitioned Parquet dataset at out_dir
+    (industry=.../state=.../part-0.parquet). Returns rows written, or None
+    if pyarrow is not installed. With no leads nothing is written and an
+    existing dataset is kept.
+
+    Rows are buffered per partition and written as a row group once
+    batch_size accumulate, so memory is bounded by the partition count,
+    not the table. The dataset is built next to out_dir and swapped in,
+    so readers never see a partial one.
+    """
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        print("  pyarrow is not installed. Skipping Parquet export.")
+        return None
+
+    schema = parquet_schema(pa)
+    file_schema = pa.schema([f for f in schema if f.name not in PARTITION_COLUMNS])
+    names = [PARQUET_RENAMES.get(col, col) for col in LEAD_COLUMNS]
+    keep = [i for i, name in enumerate(names) if name not in PARTITION_COLUMNS]
+    key_index = [names.index(col) for col in PARTITION_COLUMNS]
+
+    head, tail = os.path.split(os.path.abspath(out_dir))
+    tmp_dir = os.path.join(head, ".tmp-" + tail)
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    buffers = {}
+    writers = {}
+
+    def write(key):
+        columns = list(zip(*buffers.pop(key)))
+        arrays = [
+            pa.array(values, pa.string()).cast(field.type)
+            if pa.types.is_timestamp(field.type) else pa.array(values, field.type)
+            for field, values in zip(file_schema, columns[:-1])
+        ]
+        arrays.append(pa.array(columns[-1], pa.string()))
+        if key not in writers:
+            directory = _partition_dir(tmp_dir, key)
+            os.makedirs(directory, exist_ok=True)
+            writers[key] = pq.ParquetWriter(
+                os.path.join(directory, "part-0.parquet"), file_schema, compression="zstd"
+            )
+        writers[key].write_table(pa.Table.from_arrays(arrays, schema=file_schema))
+
+    written = 0
+    try:
+        for rows in iter_rows(conn, batch_size=batch_size):
+            for row in rows:
+                values = row[1:]
+                key = tuple(values[i] for i in key_index)
+                buffer = buffers.setdefault(key, [])
+                buffer.append([values[i] for i in keep] + [source])
+                if len(buffer) >= batch_size:
+                    write(key)
+            written += len(rows)
+        for key in list(buffers):
+            write(key)
+    finally:
+        for writer in writers.values():
+            writer.close()
+
+    if not written:
+        # No partition, so no tmp_dir; leave whatever is at out_dir alone
+        return 0
+    shutil.rmtree(out_dir, ignore_errors=True)
+    os.replace(tmp_dir, out_dir)
+    return written
+
+
+def load_parquet(path, columns=None, filter=None):
+    """Load a dataset written by export_parquet as a pyarrow Table.
+
+    Files are memory-mapped, so only the columns and partitions asked for
+    are paged in. filter is a pyarrow expression, e.g.
+    `pyarrow.dataset.field("state") == "CO"`; partition filters skip whole
+    directories. Call .to_pandas() on the result for a DataFrame.
+    """
+    import pyarrow.dataset as ds
+    import pyarrow.fs as pafs
+
+    dataset = ds.dataset(
+        path,
+        format="parquet",
+        partitioning="hive",
+        filesystem=pafs.LocalFileSystem(use_mmap=True),
+    )
+    return dataset.to_table(columns=columns, filter=filter)
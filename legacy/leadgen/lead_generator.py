@@ -0,0 +1,1078 @@
+"""
+Denver Lead Generator - Google Places API (New) → SQLite + CSV + Supabase
+Collects 500+ businesses suitable for vending machine placement.
+
+`python -m leadgen refresh google` re-checks stale leads instead (see
+lead_refresh.py), paying for one Place Details call per lead.
+
+Other metros: set METROS_PATH to a JSON list of metros (see metros.py).
+Several metros are collected in parallel worker processes, each into its
+own shard database, under one GLOBAL_MAX_SPEND_USD ceiling.
+"""
+
+import json
+import time
+import sqlite3
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from . import geo
+from . import http_cache
+from . import http_client
+from . import lead_refresh
+from . import lead_store
+from . import metrics
+from . import metros
+from . import normalize
+from . import pipeline
+from . import rate_control
+from . import seen_index
+from . import supabase_sync
+from .config import Settings
+
+# ─── CONFIG ───────────────────────────────────────────────────────────
+# Defaults only; configure() applies a config.Settings (the CLI passes
+# Settings.from_env(), i.e. .env and the environment).
+SETTINGS = None
+GOOGLE_API_KEY = None
+SUPABASE_URL = None
+SUPABASE_KEY = None
+
+# Metro being collected (Denver unless METROS_PATH says otherwise);
+# configure_metro() switches all of these together
+METRO = metros.default_metro()
+METRO_LAT = METRO["lat"]
+METRO_LNG = METRO["lng"]
+RADIUS_MILES = METRO["radius_miles"]
+RADIUS_METERS = int(RADIUS_MILES * 1609.34)  # ~40,234m
+
+TARGET_LEADS = METRO["target_leads"]
+MAX_SPEND_USD = METRO["max_spend_usd"]
+
+# Ceiling on the combined spend of every metro in a multi-metro run
+GLOBAL_MAX_SPEND_USD = 50.0
+
+# Google Places API (New) pricing (per 1000 requests):
+# Text Search: $32/1000 = $0.032 per request
+# Place Details: $17/1000 = $0.017 per request (basic+contact+atmosphere)
+# Text Search with an IDs-only field mask: no charge
+# We estimate cost as we go
+COST_TEXT_SEARCH = 0.032
+COST_PLACE_DETAILS = 0.017
+COST_TEXT_SEARCH_IDS_ONLY = 0.0
+
+INDUSTRIES = [
+    "warehouses",
+    "distribution centers",
+    "manufacturing",
+    "apartments",
+    "hotels",
+    "hospitals",
+    "car dealerships",
+    "gyms",
+    "office buildings",
+    "auto repair",
+    "car wash",
+]
+
+# Places API (New) endpoints
+TEXT_SEARCH_URL = "https://places.googleapis.com/v1/places:searchText"
+PLACE_DETAILS_URL = "https://places.googleapis.com/v1/places/{place_id}"
+
+# Fields parse_place reads. Text Search nests them under places.*
+PLACE_FIELDS = (
+    "id,displayName,formattedAddress,"
+    "nationalPhoneNumber,internationalPhoneNumber,"
+    "websiteUri,rating,userRatingCount,"
+    "location,addressComponents"
+)
+SEARCH_FIELD_MASK = ",".join("places." + f for f in PLACE_FIELDS.split(",")) + ",nextPageToken"
+ID_FIELD_MASK = "places.id,nextPageToken"
+# Fields a refresh run re-checks (lead_refresh.REFRESH_COLUMNS)
+REFRESH_FIELDS = "id,nationalPhoneNumber,internationalPhoneNumber,websiteUri,rating,userRatingCount"
+
+# Two-tier fetch: discover with free IDs-only searches, then pay for Place
+# Details only on IDs not already stored. A full search page costs about
+# as much as two detail calls, so this wins once most results are repeats
+# (overlapping neighborhood queries, resumed runs); leave it off for a
+# fresh database.
+TWO_TIER_FETCH = False
+DETAIL_CONCURRENCY = 8
+
+# Rate limiting: start at REQUESTS_PER_SECOND and adapt (AIMD) toward
+# MAX_REQUESTS_PER_SECOND while responses succeed; 429/5xx cut the rate.
+REQUESTS_PER_SECOND = 5
+MAX_REQUESTS_PER_SECOND = 20.0
+MAX_RETRIES = 5
+RATE_LIMITER = rate_control.AdaptiveRateLimiter(REQUESTS_PER_SECOND, max_rate=MAX_REQUESTS_PER_SECOND)
+
+# Async collection: many (industry, query) streams share RATE_LIMITER
+# instead of sleeping serially.
+ASYNC_COLLECTION = False
+MAX_CONCURRENT_STREAMS = 8
+PAGE_TOKEN_DELAY = 1.5  # Google requires delay between pagination
+
+# Tiled collection: locationRestriction rectangles over the search radius,
+# quadtree-split wherever a cell fills every page Text Search will return.
+TILING_MODE = False
+PAGE_SIZE = 20
+MAX_PAGES = 3
+TILE_RESULT_CAP = PAGE_SIZE * MAX_PAGES
+MIN_TILE_METERS = 1500.0
+
+# On-disk response cache so reruns don't pay for identical searches again.
+# Set HTTP_CACHE_TTL_HOURS=0 to always hit the API. The file is only
+# opened on first use.
+HTTP_CACHE_PATH = "http_cache.db"
+HTTP_CACHE_TTL_HOURS = 24.0
+HTTP_CACHE_MAX_MB = 256.0
+RESPONSE_CACHE = http_cache.ResponseCache(HTTP_CACHE_PATH, HTTP_CACHE_TTL_HOURS * 3600, int(HTTP_CACHE_MAX_MB * 1024 * 1024))
+
+DB_PATH = "leads.db"
+# EXPORT_GZIP=1 writes leads.csv.gz. EXPORT_INCREMENTAL=1 appends only leads
+# added since the last export instead of rewriting the whole file.
+EXPORT_GZIP = False
+EXPORT_INCREMENTAL = False
+CSV_PATH = "leads.csv"
+
+# EXPORT_PARQUET=1 also writes a typed Parquet dataset partitioned by
+# industry and state (requires `pip install pyarrow`)
+EXPORT_PARQUET = False
+PARQUET_PATH = "leads_parquet"
+
+# Set RESET_FRONTIER=1 to forget saved crawl positions and start over
+RESET_FRONTIER = False
+
+# Expanded queries are run best expected yield first; ones expected to
+# return fewer new leads per dollar than this are skipped (30/$ is about
+# one new lead per Text Search page).
+MIN_LEADS_PER_DOLLAR = 30.0
+
+SYNC_WORKERS = supabase_sync.SYNC_WORKERS
+
+
+def configure(settings=None):
+    """Apply a config.Settings (defaults if None) to this module and the
+    helpers it drives. Call before collecting; main() does."""
+    global SETTINGS, GOOGLE_API_KEY, SUPABASE_URL, SUPABASE_KEY, GLOBAL_MAX_SPEND_USD
+    global TWO_TIER_FETCH, DETAIL_CONCURRENCY, MAX_REQUESTS_PER_SECOND, MAX_RETRIES, RATE_LIMITER
+    global ASYNC_COLLECTION, MAX_CONCURRENT_STREAMS, TILING_MODE, MIN_TILE_METERS
+    global HTTP_CACHE_PATH, HTTP_CACHE_TTL_HOURS, HTTP_CACHE_MAX_MB, RESPONSE_CACHE
+    global EXPORT_GZIP, EXPORT_INCREMENTAL, CSV_PATH, EXPORT_PARQUET
+    global RESET_FRONTIER, MIN_LEADS_PER_DOLLAR, SYNC_WORKERS
+    settings = settings or Settings()
+    SETTINGS = settings
+
+    GOOGLE_API_KEY = settings.google_places_api_key
+    SUPABASE_URL = settings.supabase_url
+    SUPABASE_KEY = settings.supabase_key
+    GLOBAL_MAX_SPEND_USD = settings.global_max_spend_usd
+
+    TWO_TIER_FETCH = settings.two_tier_fetch
+    DETAIL_CONCURRENCY = settings.detail_concurrency
+    MAX_REQUESTS_PER_SECOND = settings.max_requests_per_second or 20.0
+    MAX_RETRIES = settings.max_retries
+    RATE_LIMITER = rate_control.AdaptiveRateLimiter(REQUESTS_PER_SECOND, max_rate=MAX_REQUESTS_PER_SECOND)
+    ASYNC_COLLECTION = settings.async_collection
+    MAX_CONCURRENT_STREAMS = settings.max_concurrent_streams
+    TILING_MODE = settings.tiling_mode
+    MIN_TILE_METERS = settings.min_tile_meters
+
+    if RESPONSE_CACHE is not None:
+        RESPONSE_CACHE.close()
+    HTTP_CACHE_PATH = settings.http_cache_path
+    HTTP_CACHE_TTL_HOURS = settings.http_cache_ttl_hours
+    HTTP_CACHE_MAX_MB = settings.http_cache_max_mb
+    RESPONSE_CACHE = (
+        http_cache.ResponseCache(HTTP_CACHE_PATH, HTTP_CACHE_TTL_HOURS * 3600, int(HTTP_CACHE_MAX_MB * 1024 * 1024))
+        if HTTP_CACHE_TTL_HOURS > 0 else None
+    )
+
+    EXPORT_GZIP = settings.export_gzip
+    EXPORT_INCREMENTAL = settings.export_incremental
+    CSV_PATH = "leads.csv" + (".gz" if EXPORT_GZIP else "")
+    EXPORT_PARQUET = settings.export_parquet
+    RESET_FRONTIER = settings.reset_frontier
+    MIN_LEADS_PER_DOLLAR = settings.min_leads_per_dollar
+    SYNC_WORKERS = settings.sync_workers
+
+    http_client.HTTP_POOL_SIZE = settings.http_pool_size
+    http_client.HTTP2 = settings.http2
+    metros.SHARD_DIR = settings.shard_dir
+
+
+def configure_metro(metro):
+    """Point collection at another metro (a dict from metros.load_metros)."""
+    global METRO, METRO_LAT, METRO_LNG, RADIUS_MILES, RADIUS_METERS, TARGET_LEADS, MAX_SPEND_USD
+    METRO = metro
+    METRO_LAT = metro["lat"]
+    METRO_LNG = metro["lng"]
+    RADIUS_MILES = metro["radius_miles"]
+    RADIUS_METERS = int(RADIUS_MILES * 1609.34)
+    TARGET_LEADS = metro["target_leads"]
+    MAX_SPEND_USD = metro["max_spend_usd"]
+
+
+# ─── SQLITE SETUP ────────────────────────────────────────────────────
+def init_db():
+    return lead_store.init_db(DB_PATH)
+
+
+# ─── GOOGLE PLACES API (NEW) ─────────────────────────────────────────
+class CostTracker:
+    """Estimated spend. Safe to share between concurrent collection streams:
+    every charge is made under a lock before the request is sent, so the
+    budget check can never be raced past.
+
+    With a metros.SharedBudget, every charge is also made against the
+    ceiling shared by all worker processes, and refused once it is spent.
+    """
+
+    def __init__(self, max_usd, shared=None):
+        self.max_usd = max_usd
+        self.shared = shared
+        self.total = 0.0
+        self.text_search_count = 0
+        self.id_search_count = 0
+        self.detail_count = 0
+        self._lock = threading.Lock()
+
+    def add_text_search(self):
+        with self._lock:
+            self._charge_shared(COST_TEXT_SEARCH)
+            self.total += COST_TEXT_SEARCH
+            self.text_search_count += 1
+            self._record(COST_TEXT_SEARCH, "text_search")
+            self._check()
+
+    def add_id_search(self):
+        with self._lock:
+            self._charge_shared(COST_TEXT_SEARCH_IDS_ONLY)
+            self.total += COST_TEXT_SEARCH_IDS_ONLY
+            self.id_search_count += 1
+            self._record(COST_TEXT_SEARCH_IDS_ONLY, "id_search")
+            self._check()
+
+    def add_detail(self):
+        with self._lock:
+            self._charge_shared(COST_PLACE_DETAILS)
+            self.total += COST_PLACE_DETAILS
+            self.detail_count += 1
+            self._record(COST_PLACE_DETAILS, "detail")
+            self._check()
+
+    def _record(self, cost, kind):
+        metrics.inc("billable_calls_total", source="google", kind=kind)
+        metrics.inc("spend_usd_total", cost, source="google")
+
+    def _charge_shared(self, cost):
+        if self.shared is not None and not self.shared.charge(cost):
+            raise BudgetExceededError(
+                f"Global budget ${self.shared.limit:.2f} reached across all metros. "
+                f"Spent ~${self.total:.2f} on {METRO['name']}"
+            )
+
+    def _check(self):
+        if self.total >= self.max_usd:
+            raise BudgetExceededError(
+                f"Budget limit ${self.max_usd:.2f} reached. "
+                f"Spent ~${self.total:.2f} ({self.text_search_count} searches, {self.detail_count} details)"
+            )
+
+    def summary(self):
+        return (
+            f"  Text searches: {self.text_search_count} (~${self.text_search_count * COST_TEXT_SEARCH:.2f})\n"
+            f"  ID-only searches: {self.id_search_count} (~${self.id_search_count * COST_TEXT_SEARCH_IDS_ONLY:.2f})\n"
+            f"  Detail requests: {self.detail_count} (~${self.detail_count * COST_PLACE_DETAILS:.2f})\n"
+            f"  Estimated total: ~${self.total:.2f}"
+        )
+
+
+class BudgetExceededError(Exception):
+    pass
+
+
+def api_request_with_retry(method, url, headers, json_body=None, max_retries=None, before_send=None,
+                           endpoint="places", refresh_cache=False):
+    """Send a request, retrying 429s, 5xxs and connection errors.
+
+    Served from RESPONSE_CACHE when possible; with refresh_cache the
+    request always goes out and its response replaces the cached one.
+    before_send (billing) only runs when the request actually goes out,
+    so cache hits are free. Every attempt waits for a RATE_LIMITER slot
+    and reports back how it went, and is recorded in metrics under
+    endpoint.
+    """
+    import requests
+
+    cache_key = None
+    if RESPONSE_CACHE is not None:
+        cache_key = http_cache.fingerprint(method, url, json_body=json_body, headers=headers)
+        cached = None if refresh_cache else RESPONSE_CACHE.get(cache_key)
+        if cached is not None:
+            metrics.inc("cache_hits_total", endpoint=endpoint)
+            return cached
+
+    if before_send:
+        before_send()
+
+    max_retries = max_retries or MAX_RETRIES
+    for attempt in range(max_retries):
+        if attempt:
+            metrics.inc("http_retries_total", endpoint=endpoint)
+        RATE_LIMITER.wait()
+        started = time.monotonic()
+        try:
+            if method == "POST":
+                resp = http_client.get_session().post(url, headers=headers, json=json_body, timeout=30)
+            else:
+                resp = http_client.get_session().get(url, headers=headers, timeout=30)
+            metrics.record_request(endpoint, started, resp.status_code)
+
+            if resp.status_code == 429:
+                if RATE_LIMITER.on_throttle(resp):
+                    print(f"    Rate limited. Honoring Retry-After, now {RATE_LIMITER.rate:.1f} req/s...")
+                else:
+                    wait = RATE_LIMITER.backoff(attempt)
+                    print(f"    Rate limited. Waiting {wait:.1f}s, now {RATE_LIMITER.rate:.1f} req/s...")
+                    metrics.sleep(wait, "backoff")
+                continue
+
+            if resp.status_code >= 500:
+                RATE_LIMITER.on_server_error()
+                wait = RATE_LIMITER.backoff(attempt)
+                print(f"    Server error {resp.status_code}. Retrying in {wait:.1f}s...")
+                metrics.sleep(wait, "backoff")
+                continue
+
+            RATE_LIMITER.on_success(resp)
+            if cache_key:
+                RESPONSE_CACHE.put(cache_key, resp)
+            return resp
+        except requests.RequestException as e:
+            metrics.record_request(endpoint, started, None)
+            if attempt < max_retries - 1:
+                wait = RATE_LIMITER.backoff(attempt)
+                print(f"    Request failed: {e}. Retrying in {wait:.1f}s...")
+                metrics.sleep(wait, "backoff")
+            else:
+                print(f"    Request failed after {max_retries} retries: {e}")
+                return None
+    return None
+
+
+def search_places(query, cost_tracker, page_token=None, cell=None, refresh_cache=False):
+    """Search for places using Text Search (New).
+
+    With a cell, results are restricted to that rectangle instead of
+    biased toward the metro radius. With TWO_TIER_FETCH the places only
+    carry their id; PlacesSource.enrich fetches details for the unseen ones.
+
+    Returns (places, next_page_token, cost), cost being what this request
+    was charged: nothing when it was served from RESPONSE_CACHE. With
+    refresh_cache the cache is bypassed and updated.
+    """
+    if TWO_TIER_FETCH:
+        charge, cost, field_mask = cost_tracker.add_id_search, COST_TEXT_SEARCH_IDS_ONLY, ID_FIELD_MASK
+    else:
+        charge, cost, field_mask = cost_tracker.add_text_search, COST_TEXT_SEARCH, SEARCH_FIELD_MASK
+    sent = []
+
+    def before_send():
+        charge()
+        sent.append(cost)
+
+    places, next_token = _search_places_request(query, page_token, cell, before_send, field_mask, refresh_cache)
+    return places, next_token, sum(sent)
+
+
+def _search_places_request(query, page_token=None, cell=None, before_send=None, field_mask=SEARCH_FIELD_MASK,
+                           refresh_cache=False):
+    """Send one Text Search request. Returns (places, next_page_token)."""
+    headers = {
+        "Content-Type": "application/json",
+        "X-Goog-Api-Key": GOOGLE_API_KEY,
+        "X-Goog-FieldMask": field_mask,
+    }
+
+    body = {
+        "textQuery": query,
+        "locationBias": {
+            "circle": {
+                "center": {"latitude": METRO_LAT, "longitude": METRO_LNG},
+                "radius": float(RADIUS_METERS),
+            }
+        },
+        "maxResultCount": PAGE_SIZE,
+    }
+
+    if cell:
+        del body["locationBias"]
+        body["locationRestriction"] = geo.cell_to_rectangle(cell)
+
+    if page_token:
+        body["pageToken"] = page_token
+
+    with metrics.timer("search_seconds", source="google"):
+        resp = api_request_with_retry(
+            "POST", TEXT_SEARCH_URL, headers, body, before_send=before_send, endpoint="searchText",
+            refresh_cache=refresh_cache,
+        )
+    if resp is None or resp.status_code != 200:
+        if resp:
+            print(f"    Search API error: {resp.status_code} - {resp.text[:200]}")
+        # None (not []) so callers don't mistake a failure for the end of results
+        return None, None
+
+    data = resp.json()
+    places = data.get("places", [])
+    next_token = data.get("nextPageToken")
+    return places, next_token
+
+
+def fetch_place(place_id, cost_tracker, field_mask=PLACE_FIELDS, before_send=None):
+    """Place Details for one ID, or None if the request failed.
+    before_send replaces cost_tracker.add_detail as the charge."""
+    headers = {
+        "X-Goog-Api-Key": GOOGLE_API_KEY,
+        "X-Goog-FieldMask": field_mask,
+    }
+    url = PLACE_DETAILS_URL.format(place_id=place_id)
+    resp = api_request_with_retry(
+        "GET", url, headers, before_send=before_send or cost_tracker.add_detail, endpoint="placeDetails"
+    )
+    if resp is None or resp.status_code != 200:
+        if resp:
+            print(f"    Details API error: {resp.status_code} - {resp.text[:200]}")
+        return None
+    return resp.json()
+
+
+def fetch_place_details(place_ids, cost_tracker):
+    """Fetch PLACE_FIELDS for each ID, DETAIL_CONCURRENCY at a time.
+    Returns ({place_id: place}, cost); IDs whose request failed are left
+    out, and cache hits cost nothing."""
+    sent = []  # list.append is atomic, so the workers can share it
+
+    def before_send():
+        cost_tracker.add_detail()
+        sent.append(COST_PLACE_DETAILS)
+
+    with ThreadPoolExecutor(max_workers=DETAIL_CONCURRENCY) as pool:
+        places = list(pool.map(
+            lambda place_id: fetch_place(place_id, cost_tracker, before_send=before_send), place_ids
+        ))
+    return {place["id"]: place for place in places if place and place.get("id")}, sum(sent)
+
+
+def is_id_only(place):
+    return place.keys() <= {"id"}
+
+
+def hydrate_places(places, cost_tracker):
+    """Swap IDs-only discovery results for full Place Details. Places whose
+    details failed are dropped; the pipeline forgets them, so a later
+    search that finds them again retries. Returns (places, cost)."""
+    missing = [place["id"] for place in places if is_id_only(place)]
+    details, cost = fetch_place_details(missing, cost_tracker) if missing else ({}, 0)
+    hydrated = []
+    for place in places:
+        if is_id_only(place):
+            if place["id"] not in details:
+                continue
+            place = details[place["id"]]
+        hydrated.append(place)
+    return hydrated, cost
+
+
+# Components a place's city is taken from, best first. Suburbs and
+# unincorporated areas often have no locality.
+CITY_COMPONENT_TYPES = (
+    "locality", "postal_town", "sublocality_level_1", "sublocality",
+    "administrative_area_level_3", "neighborhood",
+)
+
+
+def parse_address_components(components):
+    """Extract city, state, zip from address components."""
+    city_by_type = {}
+    state = ""
+    zipcode = ""
+    for comp in components:
+        types = comp.get("types", [])
+        if "administrative_area_level_1" in types:
+            state = comp.get("shortText", "")
+        elif "postal_code" in types:
+            zipcode = comp.get("longText", "")
+        else:
+            for kind in types:
+                city_by_type.setdefault(kind, comp.get("longText", ""))
+    city = next((city_by_type[kind] for kind in CITY_COMPONENT_TYPES if city_by_type.get(kind)), "")
+    return city, state, zipcode
+
+
+def parse_place(place, industry, created_at=None):
+    """Parse a place from Text Search (New) response into a Lead.
+    Pages pass one created_at for all their places."""
+    place_id = place.get("id", "")
+    name = place.get("displayName", {}).get("text", "")
+    address = place.get("formattedAddress", "")
+    phone = place.get("nationalPhoneNumber") or place.get("internationalPhoneNumber") or None
+    website = place.get("websiteUri") or None
+    rating = place.get("rating")
+    reviews = place.get("userRatingCount")
+    location = place.get("location", {})
+    lat = location.get("latitude")
+    lng = location.get("longitude")
+
+    components = place.get("addressComponents", [])
+    city, state, zipcode = parse_address_components(components)
+
+    # Whatever the components lacked, read off the formatted address
+    # rather than filing a suburb under the metro's core city
+    if not (city and state and zipcode):
+        _, address_city, address_state, address_zip = normalize.split_address(address)
+        city = city or address_city or ""
+        state = state or address_state or ""
+        zipcode = zipcode or address_zip or ""
+
+    return lead_store.Lead(
+        name, industry, address, city, state, zipcode, phone, website,
+        rating, reviews, place_id, lat, lng, created_at or lead_store._now(),
+    )
+
+
+class PlacesSource(pipeline.Source):
+    """Text Search (New) as a pipeline source. A stream's params are the
+    query text and, for tiled streams, the cell it is restricted to.
+    With TWO_TIER_FETCH, pages carry only IDs and enrich() pays for
+    details on the unseen ones."""
+
+    name = "google"
+
+    def __init__(self, cost_tracker):
+        self.cost_tracker = cost_tracker
+        self.page_delay = PAGE_TOKEN_DELAY  # Google requires it before using a page token
+
+    def fetch(self, stream, cursor, refresh_cache=False):
+        query, cell = stream.params
+        places, next_token, cost = search_places(
+            query, self.cost_tracker, page_token=cursor, cell=cell, refresh_cache=refresh_cache
+        )
+        if places is None:
+            return None
+        return pipeline.Page(places, next_token, cost)
+
+    def resume(self, stream, cursor):
+        # Page tokens expire, so a resume that comes back empty restarts
+        # the query. Page 1 is fetched anew: a cached copy would hand back
+        # the same dead token for page 2. The failed attempt isn't a page:
+        # only the page that comes back is counted.
+        if cursor:
+            page = self.fetch(stream, cursor)
+            if page is not None and page.items:
+                return page
+        page = self.fetch(stream, None, refresh_cache=bool(cursor))
+        if page is not None and cursor:
+            page.restarted = True
+        return page
+
+    def item_id(self, place):
+        return place.get("id")
+
+    def parse(self, place, industry, created_at):
+        return parse_place(place, industry, created_at)
+
+    def enrich(self, places):
+        if TWO_TIER_FETCH:
+            return hydrate_places(places, self.cost_tracker)
+        return places, 0
+
+
+def query_stream(industry, query, cell=None):
+    """A search stream, checkpointed under the query text (or cell key)."""
+    return pipeline.Stream(industry, cell_key(cell) if cell else query, (query, cell))
+
+
+def core_query(industry):
+    """The Phase 1 query, e.g. "hotels in Denver Colorado"."""
+    return f"{industry} in {METRO['name']} {METRO['state_name']}"
+
+
+def collect_industry(pipe, industry):
+    """Collect all places for a given industry query."""
+    query = core_query(industry)
+    if pipe.frontier.is_exhausted(industry, query):
+        return 0
+    print(f"\n  Searching: \"{query}\"")
+
+    result = pipe.run_stream(query_stream(industry, query))
+    if result.status == "target":
+        print(f"    Target reached! {pipe.writer.total} leads collected.")
+    else:
+        print(f"    Collected {result.new_leads} new leads from \"{industry}\"")
+    return result.new_leads
+
+
+def expand_queries(industry):
+    """Generate multiple query variations to maximize results."""
+    name = METRO["name"]
+    base_queries = [
+        core_query(industry),
+        f"{industry} near {name} {METRO['state']}",
+        f"{industry} {name} metro area",
+    ]
+    # Add neighborhood-specific queries for broader coverage
+    for n in METRO["areas"]:
+        base_queries.append(f"{industry} in {n} {METRO['state_name']}")
+    return base_queries
+
+
+def query_stats(conn):
+    """The scheduler's stats. An IDs-only page costs nothing, and its
+    details only cost as much as it finds, so in two-tier mode each page
+    is counted at no less than the Text Search price; otherwise a page
+    with nothing new would never lower its query's yield."""
+    min_page_cost = COST_TEXT_SEARCH if TWO_TIER_FETCH else 0.0
+    return lead_store.QueryStats(conn, COST_TEXT_SEARCH, PAGE_SIZE, min_page_cost=min_page_cost)
+
+
+def collect_query(pipe, industry, query):
+    """Walk the remaining pages of one expanded query. A page after the
+    first with nothing new ends it: the rest of the results are repeats."""
+    # query_stats counts two-tier pages, which are free unless they find
+    # something new, at no less than a search page, so dud queries still sink
+    return pipe.run_stream(query_stream(industry, query), dry_after=1).new_leads
+
+
+def collect_expanded_scheduled(pipe, cost_tracker):
+    """Run the expanded queries of every industry, best expected yield first.
+
+    After each query the ranking is recomputed from the stats it just
+    recorded, so an industry that stops paying off sinks for the rest of
+    the run. Queries expected below MIN_LEADS_PER_DOLLAR are never sent.
+    """
+    writer, stats = pipe.writer, pipe.stats
+    candidates = [
+        (industry, query)
+        for industry in INDUSTRIES
+        for query in expand_queries(industry)
+        if not pipe.frontier.is_exhausted(industry, query)
+    ]
+    total_collected = 0
+
+    while candidates and writer.total < TARGET_LEADS:
+        pick = stats.next_query(candidates, MIN_LEADS_PER_DOLLAR)
+        if pick is None:
+            print(f"    {len(candidates)} remaining queries expected below {MIN_LEADS_PER_DOLLAR:.0f} leads/$. Skipping.")
+            break
+        candidates.remove(pick)
+        industry, query = pick
+
+        cost_tracker._check()
+        expected = stats.expected_yield(industry, query)
+        print(f"    Query: \"{query}\" (expected {expected:.0f} leads/$)")
+        collected = collect_query(pipe, industry, query)
+        total_collected += collected
+        if collected:
+            print(f"    ── Progress: {writer.total} leads | {writer.with_phone} with phone | ~${cost_tracker.total:.2f} spent")
+
+    print(f"    Expanded searches: +{total_collected} new leads")
+    return total_collected
+
+
+def cell_key(cell):
+    return "cell:" + ",".join(f"{v:.6f}" for v in cell)
+
+
+def parse_cell_key(key):
+    return tuple(float(v) for v in key[len("cell:"):].split(","))
+
+
+def collect_industry_tiled(pipe, industry):
+    """Cover the search radius with a quadtree of restricted searches.
+
+    Each cell is searched once. A cell that fills all MAX_PAGES pages may
+    hide more results, so it is split into four children and searched
+    again; cells that come back short are fully covered and cost nothing
+    more. Cells outside the radius circle are never queried.
+
+    Unfinished cells live in the frontier, so a restarted run picks up the
+    quadtree where it stopped.
+    """
+    frontier = pipe.frontier
+    spent = 0.0
+    total_collected = 0
+    if not frontier.has_any(industry, "cell:"):
+        frontier.add(industry, cell_key(geo.bounding_box(METRO_LAT, METRO_LNG, RADIUS_METERS)))
+    cells = frontier.pending(industry, "cell:")
+
+    while cells:
+        if pipe.writer.total >= TARGET_LEADS:
+            break
+        key = cells.pop()
+        cell = parse_cell_key(key)
+        if not geo.cell_intersects_circle(cell, METRO_LAT, METRO_LNG, RADIUS_METERS):
+            frontier.exhaust(industry, key)
+            continue
+
+        # Pages fetched by an interrupted run count toward the cap too,
+        # unless its page token had expired and the cell started over
+        earlier = frontier.pages(industry, key)
+        result = pipe.run_stream(query_stream(industry, industry, cell))
+        total_collected += result.new_leads
+        spent += result.cost
+        results = (0 if result.restarted else earlier) * PAGE_SIZE + result.results
+
+        if result.status == "error":
+            continue  # the cell stays pending for the next run
+        if result.status == "target":
+            break  # the next run resumes mid-cell
+
+        if results >= TILE_RESULT_CAP and geo.cell_size_m(cell) > MIN_TILE_METERS * 2:
+            children = [cell_key(child) for child in geo.split_cell(cell)]
+            for child in children:
+                frontier.add(industry, child)
+            cells.extend(children)
+
+    per_dollar = total_collected / spent if spent else 0.0
+    print(f"    {industry}: +{total_collected} new leads | ~${spent:.2f} | {per_dollar:.1f} leads/$")
+    return total_collected
+
+
+# ─── ASYNC COLLECTION ────────────────────────────────────────────────
+async def collect_stream(pipe, stream, done):
+    """Walk every remaining page of one stream. The blocking requests run
+    in worker threads, which wait there for their RATE_LIMITER slot, so
+    pacing never stalls the event loop."""
+    source, frontier = pipe.source, pipe.frontier
+    _, cursor = frontier.get(stream.industry, stream.key)
+    # Only the request runs in the thread; the frontier stays on this one
+    page = pipe.resumed(stream, await asyncio.to_thread(source.resume, stream, cursor))
+    page_count = 0
+    collected = 0
+
+    # A page already paid for is always stored, even if another stream has
+    # since hit the target or budget; done only stops further fetches.
+    while page is not None:
+        if not page.items:
+            frontier.exhaust(stream.industry, stream.key)
+            break
+        page_count += 1
+        fresh = pipe.dedup(page.items)
+        # Detail calls block; keep them off the event loop
+        fresh, enrich_cost = await asyncio.to_thread(pipe.prepare, fresh)
+        new_in_page = pipe.store(stream, fresh, pipeline.page_cost(page, enrich_cost))
+        collected += new_in_page
+
+        # Same early-exit as the serial expanded search
+        if new_in_page == 0 and page_count > 1:
+            frontier.exhaust(stream.industry, stream.key)
+            break
+        pipe.checkpoint(stream, page.cursor)
+
+        if pipe.writer.total >= TARGET_LEADS:
+            done.set()
+        if done.is_set() or page.cursor is None:
+            break
+
+        await asyncio.sleep(PAGE_TOKEN_DELAY)
+        metrics.inc("sleep_seconds_total", PAGE_TOKEN_DELAY, reason="page_token")
+        if done.is_set():
+            break
+        page = await asyncio.to_thread(source.fetch, stream, page.cursor)
+
+    if collected:
+        print(f"    [{stream.industry}] \"{stream.key}\": +{collected} | Total: {pipe.writer.total}")
+    return collected
+
+
+async def collect_all_async(pipe):
+    """Run Phase 1 + Phase 2 queries as concurrent streams.
+
+    The core industry searches go first in list order; after that each
+    free worker takes the expanded query with the best expected yield, as
+    ranked by stats at that moment. MAX_CONCURRENT_STREAMS workers share
+    the adaptive RATE_LIMITER.
+    """
+    done = asyncio.Event()
+    budget_errors = []
+
+    # Drop streams a previous run already finished
+    core = [
+        (industry, core_query(industry))
+        for industry in INDUSTRIES
+        if not pipe.frontier.is_exhausted(industry, core_query(industry))
+    ]
+    expanded = [
+        (industry, query)
+        for industry in INDUSTRIES
+        for query in expand_queries(industry)[1:]  # Skip Phase 1 query
+        if not pipe.frontier.is_exhausted(industry, query)
+    ]
+
+    def next_stream():
+        if core:
+            return core.pop(0)
+        pick = pipe.stats.next_query(expanded, MIN_LEADS_PER_DOLLAR)
+        if pick is not None:
+            expanded.remove(pick)
+        return pick
+
+    async def worker():
+        while not done.is_set():
+            stream = next_stream()
+            if stream is None:
+                return
+            try:
+                await collect_stream(pipe, query_stream(*stream), done)
+            except BudgetExceededError as e:
+                budget_errors.append(e)
+                done.set()
+
+    await asyncio.gather(*(worker() for _ in range(MAX_CONCURRENT_STREAMS)))
+
+    if budget_errors:
+        raise budget_errors[0]
+
+
+def export_csv(conn):
+    """Stream leads to CSV, appending only new ones with EXPORT_INCREMENTAL."""
+    return pipeline.export_csv(conn, CSV_PATH, EXPORT_INCREMENTAL)
+
+
+def export_parquet(conn):
+    """Write the Parquet dataset; load it with lead_export.load_parquet."""
+    return pipeline.export_parquet(conn, PARQUET_PATH, "google")
+
+
+def upload_to_supabase(conn):
+    """Push leads that are new or changed since the last sync to Supabase."""
+    return pipeline.sync(conn, SUPABASE_URL, SUPABASE_KEY, workers=SYNC_WORKERS)
+
+
+# ─── MAIN ─────────────────────────────────────────────────────────────
+def load_seen_ids(conn, db_path, main_conn=None):
+    """place_ids already stored, so they are never paid for again.
+    Mapped from the database's seen_index file. In a metro worker,
+    DB_PATH's leads (via main_conn) count as seen too; the parent keeps
+    that file current."""
+    seen_ids = seen_index.SeenIndex().attach(conn, db_path)
+    if main_conn is not None:
+        seen_ids.attach(main_conn, DB_PATH, persist=False)
+    return seen_ids
+
+
+def collect(writer, frontier, stats, cost_tracker, seen_ids):
+    """Collect the current metro in the configured mode until TARGET_LEADS
+    or the budget is reached."""
+    source = PlacesSource(cost_tracker)
+    # Tile pages aren't query samples; keep them out of the scheduler's stats
+    pipe = pipeline.Pipeline(
+        source, writer, frontier, seen_ids, TARGET_LEADS, stats=None if TILING_MODE else stats
+    )
+    try:
+        if TILING_MODE:
+            print(f"── Tiled collection: quadtree down to {MIN_TILE_METERS:.0f}m cells ──")
+            for industry in INDUSTRIES:
+                if writer.total >= TARGET_LEADS:
+                    break
+                collect_industry_tiled(pipe, industry)
+
+        elif ASYNC_COLLECTION:
+            print(f"── Async collection: {MAX_CONCURRENT_STREAMS} streams, {REQUESTS_PER_SECOND}-{MAX_REQUESTS_PER_SECOND:.0f} req/s ──")
+            asyncio.run(collect_all_async(pipe))
+
+        else:
+            # Phase 1: Basic queries for each industry
+            print("── Phase 1: Industry searches ──")
+            for industry in INDUSTRIES:
+                if writer.total >= TARGET_LEADS:
+                    break
+                collect_industry(pipe, industry)
+
+            total = writer.total
+            print(f"\n── Phase 1 complete: {total} leads ──")
+
+            # Phase 2: Expanded queries if we need more, best yield first
+            if total < TARGET_LEADS:
+                print(f"\n── Phase 2: Expanded neighborhood searches ──")
+                collect_expanded_scheduled(pipe, cost_tracker)
+
+    except BudgetExceededError as e:
+        print(f"\n⚠ {e}")
+        print("Crawl position saved. The next run resumes from here.")
+    finally:
+        writer.flush()
+
+
+def run_metro(metro, db_path):
+    """Collect one metro into its own shard database. Runs in a
+    multi-metro worker process; returns a summary for the parent."""
+    configure_metro(metro)
+    metrics.METRICS.configure(
+        metrics.worker_path(SETTINGS.metrics_path, metros.metro_slug(metro)), SETTINGS.metrics_interval
+    )
+    conn = lead_store.init_db(db_path)
+    writer = lead_store.LeadWriter(conn)
+    cost_tracker = CostTracker(MAX_SPEND_USD, shared=metros.global_budget())
+    try:
+        if writer.total < TARGET_LEADS:
+            # Leads already merged from other metros' shards count as seen
+            # too; the parent created DB_PATH before starting the pool
+            main_conn = sqlite3.connect(f"file:{DB_PATH}?mode=ro", uri=True)
+            seen_ids = load_seen_ids(conn, db_path, main_conn)
+            try:
+                frontier = lead_store.Frontier(conn)
+                if RESET_FRONTIER:
+                    frontier.reset()
+                stats = query_stats(conn)
+                print(f"\n[{metro['name']}, {metro['state']}] Starting collection (budget: ${MAX_SPEND_USD:.2f})...")
+                collect(writer, frontier, stats, cost_tracker, seen_ids)
+            finally:
+                seen_ids.close()
+                main_conn.close()
+        return {"leads": writer.total, "spent": cost_tracker.total}
+    finally:
+        metrics.write()
+        conn.close()
+        http_client.close_session()
+
+
+def run_all_metros(metro_list):
+    """Collect every metro in parallel worker processes, then merge their
+    shards into DB_PATH and export/upload once. Returns 1 if any metro's
+    worker failed."""
+    # Created up front with a current seen index; workers read both and
+    # never race to create them
+    conn = init_db()
+    seen_index.refresh(conn, DB_PATH)
+    conn.close()
+    budget = metros.SharedBudget(GLOBAL_MAX_SPEND_USD)
+    workers = min(SETTINGS.metro_workers, len(metro_list))
+    print(f"\nCollecting {len(metro_list)} metros in {workers} worker processes "
+          f"(global budget: ${GLOBAL_MAX_SPEND_USD:.2f})...")
+    results = metros.run_parallel(__name__, metro_list, budget, SETTINGS, workers=workers)
+
+    print("\n── Metro results ──")
+    for metro in metro_list:
+        result = results.get(metro["name"])
+        if isinstance(result, dict):
+            print(f"  {metro['name']}, {metro['state']}: {result['leads']} leads (~${result['spent']:.2f})")
+        else:
+            print(f"  {metro['name']}, {metro['state']}: failed ({result})")
+    print(f"  Spent across all metros: ~${budget.spent:.2f}")
+
+    conn = init_db()
+    shards = [metros.shard_path(__name__, metro) for metro in metro_list]
+    added = metros.merge_shards(conn, shards)
+    print(f"\nMerged {added} new leads from {len(shards)} shards into {DB_PATH}")
+
+    finish(conn)
+    if any(not isinstance(results.get(metro["name"]), dict) for metro in metro_list):
+        return 1
+
+
+def finish(conn, cost_tracker=None):
+    """Last stage of a run: export, sync to Supabase, summarize, close."""
+    export_csv(conn)
+    if EXPORT_PARQUET:
+        export_parquet(conn)
+    upload_to_supabase(conn)
+    print_summary(conn, cost_tracker)
+    metrics.write()
+    conn.close()
+    http_client.close_session()
+
+
+def main(settings=None):
+    """Run a collection. settings defaults to Settings.from_env().
+    Returns 1 if the run couldn't start."""
+    configure(settings or Settings.from_env())
+    metrics.METRICS.configure(SETTINGS.metrics_path, SETTINGS.metrics_interval)
+
+    print("=" * 60)
+    print("  DENVER LEAD GENERATOR")
+    print("  Target: 500+ businesses for vending machine placement")
+    print("=" * 60)
+
+    if not GOOGLE_API_KEY:
+        print("ERROR: GOOGLE_PLACES_API_KEY not set in .env")
+        return 1
+
+    metro_list = metros.load_metros(SETTINGS.metros_path)
+    if len(metro_list) > 1:
+        return run_all_metros(metro_list)
+    configure_metro(metro_list[0])
+
+    conn = init_db()
+    writer = lead_store.LeadWriter(conn)
+    existing = writer.total
+    print(f"\nExisting leads in database: {existing}")
+
+    if existing >= TARGET_LEADS:
+        print(f"Already have {existing} leads. Exporting and uploading...")
+        finish(conn)
+        return
+
+    cost_tracker = CostTracker(MAX_SPEND_USD)
+    # Load existing place_ids to skip
+    seen_ids = load_seen_ids(conn, DB_PATH)
+
+    frontier = lead_store.Frontier(conn)
+    if RESET_FRONTIER:
+        frontier.reset()
+    stats = query_stats(conn)
+
+    print(f"\nStarting collection (budget: ${MAX_SPEND_USD:.2f})...")
+    print(f"Industries: {len(INDUSTRIES)}")
+    print(f"Location: {METRO['name']}, {METRO['state']} ({RADIUS_MILES} mile radius)\n")
+
+    collect(writer, frontier, stats, cost_tracker, seen_ids)
+    seen_ids.close()
+    finish(conn, cost_tracker)
+
+
+def refresh(settings=None):
+    """Re-check stale leads, store what changed, then export and sync.
+    settings defaults to Settings.from_env(). Returns 1 if the run
+    couldn't start."""
+    configure(settings or Settings.from_env())
+    metrics.METRICS.configure(SETTINGS.metrics_path, SETTINGS.metrics_interval)
+
+    if not GOOGLE_API_KEY:
+        print("ERROR: GOOGLE_PLACES_API_KEY not set in .env")
+        return 1
+
+    conn = init_db()
+    cost_tracker = CostTracker(MAX_SPEND_USD)
+    # The charge that reaches the budget is refused, so stop one short of it
+    affordable = max(0, int(MAX_SPEND_USD / COST_PLACE_DETAILS) - 1)
+    limit = min(SETTINGS.refresh_limit, affordable)
+    print(f"\nRefreshing up to {limit} leads not checked in {SETTINGS.refresh_after_days:g} days "
+          f"(budget: ${MAX_SPEND_USD:.2f})...")
+
+    refresher = lead_refresh.Refresher(
+        conn, lambda place_id: fetch_place(place_id, cost_tracker, REFRESH_FIELDS), parse_place,
+        concurrency=DETAIL_CONCURRENCY,
+    )
+    try:
+        refresher.run(limit, SETTINGS.refresh_after_days)
+    except BudgetExceededError as e:
+        print(f"\n⚠ {e}")
+    print(refresher.summary())
+    finish(conn, cost_tracker)
+
+
+def print_summary(conn, cost_tracker=None):
+    usage = []
+    if cost_tracker:
+        usage += ["  API Cost Breakdown:", cost_tracker.summary(), RATE_LIMITER.summary()]
+    if RESPONSE_CACHE is not None and RESPONSE_CACHE.hits:
+        usage.append(RESPONSE_CACHE.summary())
+    pipeline.print_summary(conn, usage)
+
+
+if __name__ == "__main__":
+    main()
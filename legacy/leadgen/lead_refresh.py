@@ -0,0 +1,137 @@
+"""
+Incremental refresh of stored leads.
+
+INSERT OR IGNORE freezes a lead at first sight, so phone numbers,
+websites, ratings and review counts drift as businesses change. A
+refresh run re-fetches the stalest, most valuable leads by ID in
+batches, diffs each against what is stored and writes only the columns
+that changed, stamping updated_at. Every lead it checks gets checked_at,
+so the next run moves on to others.
+
+Unchanged leads keep their LEAD_COLUMNS values, so supabase_sync's
+content hashes leave them out of the next sync; changed ones go up.
+"""
+
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta, timezone
+from operator import itemgetter
+
+from . import metrics
+from .lead_store import LEAD_COLUMNS, _now
+from .normalize import e164
+
+# Fields that change over a business's life. Names and addresses are
+# left alone: they are what the lead was matched and deduplicated on.
+REFRESH_COLUMNS = ("phone_number", "website", "google_rating", "total_reviews")
+REFRESH_AFTER_DAYS = 30.0
+REFRESH_BATCH_SIZE = 50
+
+_refreshed = itemgetter(*(LEAD_COLUMNS.index(col) for col in REFRESH_COLUMNS))
+
+
+def stale_leads(conn, limit, max_age_days=REFRESH_AFTER_DAYS):
+    """Up to limit (place_id, industry, *REFRESH_COLUMNS) rows not checked
+    in max_age_days, most valuable first: leads with a phone number (the
+    call list), then the most reviewed, then the longest unchecked."""
+    cutoff = (datetime.now(timezone.utc) - timedelta(days=max_age_days)).isoformat()
+    return conn.execute(f"""
+        SELECT place_id, industry, {", ".join(REFRESH_COLUMNS)} FROM leads
+        WHERE COALESCE(checked_at, created_at, '') < ?
+        ORDER BY (phone_number IS NOT NULL AND phone_number != '') DESC,
+                 COALESCE(total_reviews, 0) DESC,
+                 COALESCE(checked_at, created_at, '')
+        LIMIT ?
+    """, (cutoff, limit)).fetchall()
+
+
+class Refresher:
+    """Re-checks stale leads with a source's fetch and parse.
+
+    fetch(place_id) returns the raw item or None if it couldn't be had;
+    parse(item, industry, created_at) is the source's parser, so fresh
+    values are normalized exactly like stored ones. When fetch raises
+    (budget, quota), lookups already made are still stored before the
+    error propagates, so none of them is paid for twice; counters are
+    kept as batches are written, so they stay right too.
+    """
+
+    def __init__(self, conn, fetch, parse, concurrency=1):
+        self.conn = conn
+        self.fetch = fetch
+        self.parse = parse
+        self.concurrency = concurrency
+        self.checked = 0
+        self.changed = 0
+        self.failed = 0
+
+    def run(self, limit, max_age_days=REFRESH_AFTER_DAYS, batch_size=REFRESH_BATCH_SIZE):
+        rows = stale_leads(self.conn, limit, max_age_days)
+        with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="refresh") as pool:
+            for start in range(0, len(rows), batch_size):
+                batch = rows[start:start + batch_size]
+                futures = {pool.submit(self.fetch, row[0]): row for row in batch}
+                fetched, items = [], []
+                error = None
+                for future in as_completed(futures):
+                    try:
+                        item = future.result()
+                    except Exception as e:
+                        if error is None:
+                            # Start no more lookups; the ones in flight finish
+                            error = e
+                            for pending in futures:
+                                pending.cancel()
+                        continue
+                    fetched.append(futures[future])
+                    items.append(item)
+                self.store(fetched, items)
+                if error is not None:
+                    raise error
+        return self.changed
+
+    def store(self, rows, items):
+        """Diff one fetched batch against the stored rows and write it in
+        one transaction: changed columns with updated_at, and checked_at
+        for every lead. Leads whose fetch failed are marked checked too,
+        so a dead ID isn't paid for again every run."""
+        if not rows:
+            return
+        now = _now()
+        checked_only = []
+        updates = {}  # changed column names -> parameter rows
+        failed = 0
+        for row, item in zip(rows, items):
+            place_id, industry, stored = row[0], row[1], row[2:]
+            if item is None:
+                failed += 1
+                checked_only.append((now, place_id))
+                continue
+            fresh = _refreshed(self.parse(item, industry, now))
+            changed = {col: value for col, old, value in zip(REFRESH_COLUMNS, stored, fresh) if old != value}
+            if not changed:
+                checked_only.append((now, place_id))
+                continue
+            if "phone_number" in changed:
+                # Keep its match key in step
+                changed["phone_e164"] = e164(changed["phone_number"])
+            updates.setdefault(tuple(changed), []).append((*changed.values(), now, now, place_id))
+
+        with metrics.timer("db_write_seconds"), self.conn:
+            self.conn.executemany("UPDATE leads SET checked_at = ? WHERE place_id = ?", checked_only)
+            for columns, params in updates.items():
+                assignments = ", ".join(f"{col} = ?" for col in columns)
+                self.conn.executemany(
+                    f"UPDATE leads SET {assignments}, updated_at = ?, checked_at = ? WHERE place_id = ?", params
+                )
+
+        changed = sum(len(params) for params in updates.values())
+        self.checked += len(rows)
+        self.changed += changed
+        self.failed += failed
+        metrics.inc("refreshed_leads_total", changed, result="changed")
+        metrics.inc("refreshed_leads_total", len(checked_only) - failed, result="unchanged")
+        metrics.inc("refreshed_leads_total", failed, result="failed")
+
+    def summary(self):
+        return (f"  Refreshed: {self.checked} leads checked, {self.changed} changed"
+                + (f", {self.failed} not found or failed" if self.failed else ""))
@@ -0,0 +1,74 @@
+"""
+Spatial index and location queries over the leads table.
+
+lead_store.init_db maintains an R*Tree (leads_rtree) holding every lead's
+point. Queries narrow candidates through it and refine by great-circle
+distance, instead of scanning the whole table in Python.
+
+    leads_in_box(conn, (south, west, north, east))
+    leads_within(conn, lat, lng, radius_m)      # nearest first
+    nearest_leads(conn, lat, lng, k)
+"""
+
+import math
+
+from . import geo
+from .lead_store import LEAD_COLUMNS
+
+# First search radius for nearest_leads; widened until k are found
+KNN_START_METERS = 500.0
+
+# R*Tree bounds are float32 rounded outward; results are refined on the
+# exact lat/lng stored in leads
+_SELECT = f"SELECT l.{', l.'.join(LEAD_COLUMNS)} FROM leads l JOIN leads_rtree r ON r.id = l.id"
+
+
+def _box_rows(conn, cell):
+    south, west, north, east = cell
+    cur = conn.execute(
+        _SELECT + " WHERE r.max_lat >= ? AND r.min_lat <= ? AND r.max_lng >= ? AND r.min_lng <= ?",
+        (south, north, west, east),
+    )
+    lat_i = LEAD_COLUMNS.index("latitude")
+    lng_i = LEAD_COLUMNS.index("longitude")
+    for row in cur:
+        # Drop float32 fringe hits just outside the box
+        if south <= row[lat_i] <= north and west <= row[lng_i] <= east:
+            yield row
+
+
+def leads_in_box(conn, cell):
+    """Leads inside a (south, west, north, east) cell, as dicts."""
+    return [dict(zip(LEAD_COLUMNS, row)) for row in _box_rows(conn, cell)]
+
+
+def leads_within(conn, lat, lng, radius_m):
+    """Leads within radius_m meters of (lat, lng), nearest first. Each
+    dict carries its distance_m."""
+    lat_i = LEAD_COLUMNS.index("latitude")
+    lng_i = LEAD_COLUMNS.index("longitude")
+    found = []
+    for row in _box_rows(conn, geo.bounding_box(lat, lng, radius_m)):
+        meters = geo.haversine_m(lat, lng, row[lat_i], row[lng_i])
+        if meters <= radius_m:
+            lead = dict(zip(LEAD_COLUMNS, row))
+            lead["distance_m"] = meters
+            found.append(lead)
+    found.sort(key=lambda lead: lead["distance_m"])
+    return found
+
+
+def nearest_leads(conn, lat, lng, k=10, max_radius_m=geo.EARTH_RADIUS_METERS * math.pi):
+    """The k leads closest to (lat, lng), nearest first, each with
+    distance_m. Searches a growing radius so only nearby index pages are
+    read; returns fewer than k only if the table holds fewer."""
+    radius = KNN_START_METERS
+    while True:
+        found = leads_within(conn, lat, lng, radius)
+        if len(found) >= k or radius >= max_radius_m:
+            return found[:k]
+        # Density so far says how far out k leads should be
+        if found:
+            radius *= max(2.0, math.sqrt(k / len(found)))
+        else:
+            radius *= 4
@@ -0,0 +1,429 @@
+"""
+Shared SQLite lead store for the Google Places and Yelp generators.
+Batches inserts into one transaction per page and keeps lead totals in
+memory so collection loops never re-count the table. Each page is
+normalized (normalize.NORMALIZED_COLUMNS) on its way in.
+"""
+
+import sqlite3
+from collections import namedtuple
+from datetime import datetime, timezone
+
+from . import metrics
+from .normalize import NORMALIZED_COLUMNS, normalize_columns, normalize_leads
+
+LEAD_COLUMNS = [
+    "business_name", "industry", "address", "city", "state", "zip",
+    "phone_number", "website", "google_rating", "total_reviews",
+    "place_id", "latitude", "longitude", "created_at",
+]
+
+# One lead, fields in LEAD_COLUMNS order. A plain tuple underneath, so a
+# page of them goes to executemany as-is with no per-field unpacking
+Lead = namedtuple("Lead", LEAD_COLUMNS)
+
+INSERT_SQL = f"""
+    INSERT OR IGNORE INTO leads ({", ".join(LEAD_COLUMNS + NORMALIZED_COLUMNS)})
+    VALUES ({", ".join("?" for _ in LEAD_COLUMNS + NORMALIZED_COLUMNS)})
+"""
+
+# Rows normalized per transaction when backfilling a table
+NORMALIZE_BATCH_SIZE = 5000
+
+# Commit at least this often even if a page is larger
+DEFAULT_BATCH_SIZE = 200
+
+# Point index for lead_spatial's location queries, kept in sync with
+# leads by triggers so every insert, delete and move maintains it
+SPATIAL_DDL = """
+CREATE VIRTUAL TABLE IF NOT EXISTS leads_rtree USING rtree(
+    id, min_lat, max_lat, min_lng, max_lng
+);
+
+CREATE TRIGGER IF NOT EXISTS leads_rtree_insert AFTER INSERT ON leads
+WHEN NEW.latitude IS NOT NULL AND NEW.longitude IS NOT NULL
+BEGIN
+    INSERT INTO leads_rtree VALUES (NEW.id, NEW.latitude, NEW.latitude, NEW.longitude, NEW.longitude);
+END;
+
+CREATE TRIGGER IF NOT EXISTS leads_rtree_delete AFTER DELETE ON leads
+BEGIN
+    DELETE FROM leads_rtree WHERE id = OLD.id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS leads_rtree_update AFTER UPDATE OF latitude, longitude ON leads
+BEGIN
+    DELETE FROM leads_rtree WHERE id = OLD.id;
+    INSERT INTO leads_rtree
+    SELECT NEW.id, NEW.latitude, NEW.latitude, NEW.longitude, NEW.longitude
+    WHERE NEW.latitude IS NOT NULL AND NEW.longitude IS NOT NULL;
+END;
+"""
+
+
+def init_db(db_path):
+    conn = sqlite3.connect(db_path)
+    # WAL lets readers (exports, summaries) run alongside the writer, and
+    # synchronous=NORMAL only fsyncs at checkpoints instead of every commit.
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA temp_store=MEMORY")
+    conn.execute("PRAGMA cache_size=-16000")  # ~16 MB page cache
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS leads (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            business_name TEXT,
+            industry TEXT,
+            address TEXT,
+            city TEXT,
+            state TEXT,
+            zip TEXT,
+            phone_number TEXT,
+            website TEXT,
+            google_rating REAL,
+            total_reviews INTEGER,
+            place_id TEXT UNIQUE NOT NULL,
+            latitude REAL,
+            longitude REAL,
+            created_at TEXT,
+            updated_at TEXT,
+            checked_at TEXT,
+            phone_e164 TEXT,
+            street_key TEXT,
+            city_key TEXT,
+            zip5 TEXT,
+            name_key TEXT
+        )
+    """)
+    _add_missing_columns(conn)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_place_id ON leads(place_id)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_updated_at ON leads(updated_at)")
+    # The keys dedup, do-not-call filtering and CRM matching join on
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_phone_e164 ON leads(phone_e164)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_name_zip ON leads(name_key, zip5)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_street_zip ON leads(street_key, zip5)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_city_key ON leads(city_key)")
+    conn.commit()
+    _init_spatial_index(conn)
+    normalize_stored(conn)
+    return conn
+
+
+def _add_missing_columns(conn):
+    """Bring a leads table from before lead_refresh and normalize up to date."""
+    have = {row[1] for row in conn.execute("PRAGMA table_info(leads)")}
+    for column in ("updated_at", "checked_at", *NORMALIZED_COLUMNS):
+        if column not in have:
+            conn.execute(f"ALTER TABLE leads ADD COLUMN {column} TEXT")
+
+
+def _init_spatial_index(conn):
+    """Create the R*Tree and its triggers, indexing any leads stored before
+    it existed. A no-op once the index is in place."""
+    existed = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE name = 'leads_rtree'"
+    ).fetchone()
+    try:
+        conn.executescript(SPATIAL_DDL)
+    except sqlite3.OperationalError as e:
+        # SQLite built without the rtree module; location queries won't work
+        print(f"  Spatial index unavailable: {e}")
+        return
+    if not existed:
+        with conn:
+            conn.execute("""
+                INSERT INTO leads_rtree
+                SELECT id, latitude, latitude, longitude, longitude FROM leads
+                WHERE latitude IS NOT NULL AND longitude IS NOT NULL
+            """)
+
+
+def normalize_stored(conn, only_missing=True, batch_size=NORMALIZE_BATCH_SIZE):
+    """Compute NORMALIZED_COLUMNS for stored leads, batch_size rows per
+    transaction: only those never normalized (name_key is NULL), or every
+    lead when the rules have changed. Returns rows updated."""
+    where = "AND name_key IS NULL" if only_missing else ""
+    assignments = ", ".join(f"{col} = ?" for col in NORMALIZED_COLUMNS)
+    last_id = 0
+    updated = 0
+    while True:
+        rows = conn.execute(f"""
+            SELECT id, business_name, address, city, zip, phone_number FROM leads
+            WHERE id > ? {where} ORDER BY id LIMIT ?
+        """, (last_id, batch_size)).fetchall()
+        if not rows:
+            return updated
+        ids, names, addresses, cities, zips, phones = zip(*rows)
+        keys = normalize_columns(names, addresses, cities, zips, phones)
+        with conn:
+            conn.executemany(
+                f"UPDATE leads SET {assignments} WHERE id = ?",
+                [(*row_keys, lead_id) for row_keys, lead_id in zip(keys, ids)],
+            )
+        last_id = ids[-1]
+        updated += len(rows)
+
+
+def count_leads(conn):
+    cur = conn.execute("SELECT COUNT(*) FROM leads")
+    return cur.fetchone()[0]
+
+
+def count_with_phone(conn):
+    cur = conn.execute("SELECT COUNT(*) FROM leads WHERE phone_number IS NOT NULL AND phone_number != ''")
+    return cur.fetchone()[0]
+
+
+def print_industry_breakdown(conn):
+    cur = conn.execute("""
+        SELECT industry, COUNT(*) as cnt,
+               SUM(CASE WHEN phone_number IS NOT NULL AND phone_number != '' THEN 1 ELSE 0 END) as phones
+        FROM leads GROUP BY industry ORDER BY cnt DESC
+    """)
+    print("\n  Industry Breakdown:")
+    print(f"  {'Industry':<25} {'Total':>6} {'Phones':>7}")
+    print(f"  {'-'*25} {'-'*6} {'-'*7}")
+    for row in cur:
+        print(f"  {row[0]:<25} {row[1]:>6} {row[2]:>7}")
+
+
+class LeadWriter:
+    """Buffers parsed Leads and writes them, normalized, with executemany.
+
+    Totals are counted once at startup and then maintained from the number
+    of rows each flush actually inserted (INSERT OR IGNORE skips dups).
+    """
+
+    def __init__(self, conn, batch_size=DEFAULT_BATCH_SIZE):
+        self.conn = conn
+        self.batch_size = batch_size
+        self.pending = []
+        self.total = count_leads(conn)
+        self.with_phone = count_with_phone(conn)
+
+    def add(self, lead):
+        self.pending.append(lead)
+        if len(self.pending) >= self.batch_size:
+            self.flush()
+
+    def extend(self, leads):
+        """Queue a page of leads at once."""
+        self.pending.extend(leads)
+        if len(self.pending) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        """Write all pending leads in one transaction. Returns rows inserted."""
+        if not self.pending:
+            return 0
+        rows = [lead + keys for lead, keys in zip(self.pending, normalize_leads(self.pending))]
+        # rowcount, not total_changes: the latter also counts the rows the
+        # spatial index triggers write
+        with metrics.timer("db_write_seconds"), self.conn:
+            inserted = self.conn.executemany(INSERT_SQL, rows).rowcount
+        metrics.inc("db_rows_written_total", inserted)
+
+        if inserted == len(self.pending):
+            self.with_phone += sum(1 for lead in self.pending if lead.phone_number)
+        else:
+            # Some rows were already stored; fall back to an exact recount
+            self.with_phone = count_with_phone(self.conn)
+        self.total += inserted
+        self.pending = []
+        return inserted
+
+
+class Frontier:
+    """Crawl position of every (industry, query) stream, kept in the same
+    SQLite file as the leads so a restarted run resumes where the last
+    one stopped instead of re-paying for pages it already walked.
+
+    cursor is the Yelp offset or Google nextPageToken of the next page to
+    fetch. Call advance/exhaust right after the page's leads are flushed.
+    """
+
+    def __init__(self, conn):
+        self.conn = conn
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS frontier (
+                industry TEXT NOT NULL,
+                query TEXT NOT NULL,
+                status TEXT NOT NULL DEFAULT 'pending',
+                cursor TEXT,
+                pages INTEGER NOT NULL DEFAULT 0,
+                updated_at TEXT,
+                PRIMARY KEY (industry, query)
+            )
+        """)
+        conn.commit()
+
+    def get(self, industry, query):
+        """Returns (status, cursor); unknown streams are pending from the start."""
+        row = self.conn.execute(
+            "SELECT status, cursor FROM frontier WHERE industry = ? AND query = ?",
+            (industry, query),
+        ).fetchone()
+        return row if row else ("pending", None)
+
+    def is_exhausted(self, industry, query):
+        return self.get(industry, query)[0] == "exhausted"
+
+    def add(self, industry, query):
+        """Register a stream without touching an existing position."""
+        with self.conn:
+            self.conn.execute(
+                "INSERT OR IGNORE INTO frontier (industry, query, updated_at) VALUES (?, ?, ?)",
+                (industry, query, _now()),
+            )
+
+    def pending(self, industry, prefix=""):
+        """Queries for an industry that still have pages left, oldest first."""
+        cur = self.conn.execute(
+            "SELECT query FROM frontier WHERE industry = ? AND status != 'exhausted' "
+            "AND query LIKE ? ORDER BY rowid",
+            (industry, prefix + "%"),
+        )
+        return [row[0] for row in cur]
+
+    def has_any(self, industry, prefix=""):
+        cur = self.conn.execute(
+            "SELECT 1 FROM frontier WHERE industry = ? AND query LIKE ? LIMIT 1",
+            (industry, prefix + "%"),
+        )
+        return cur.fetchone() is not None
+
+    def pages(self, industry, query):
+        """Pages fetched so far that had a next page after them."""
+        row = self.conn.execute(
+            "SELECT pages FROM frontier WHERE industry = ? AND query = ?",
+            (industry, query),
+        ).fetchone()
+        return row[0] if row else 0
+
+    def advance(self, industry, query, cursor):
+        self._save(industry, query, "in_progress", str(cursor), 1)
+
+    def exhaust(self, industry, query):
+        self._save(industry, query, "exhausted", None, 0)
+
+    def restart(self, industry, query):
+        """The saved cursor couldn't be used and the stream is being
+        walked again from its first page; forget the pages counted."""
+        with self.conn:
+            self.conn.execute(
+                "UPDATE frontier SET status = 'pending', cursor = NULL, pages = 0, updated_at = ? "
+                "WHERE industry = ? AND query = ?",
+                (_now(), industry, query),
+            )
+
+    def _save(self, industry, query, status, cursor, pages):
+        with self.conn:
+            self.conn.execute("""
+                INSERT INTO frontier (industry, query, status, cursor, pages, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT (industry, query) DO UPDATE SET
+                    status = excluded.status,
+                    cursor = excluded.cursor,
+                    pages = pages + excluded.pages,
+                    updated_at = excluded.updated_at
+            """, (industry, query, status, cursor, pages, _now()))
+
+    def reset(self):
+        with self.conn:
+            self.conn.execute("DELETE FROM frontier")
+
+
+class QueryStats:
+    """Historical yield of every (industry, query) stream, used to spend the
+    budget on the queries most likely to return new leads.
+
+    A query's expected yield is value per unit cost, where value counts
+    each new lead plus phone_weight extra for leads with a phone. Sparse
+    history is shrunk toward the industry's average (or, for an industry
+    never searched, an optimistic full page), so a weak industry-wide
+    showing demotes its untried queries too.
+
+    Every page is counted at no less than min_page_cost, so a source
+    whose pages can be free still sees queries that find nothing sink.
+    """
+
+    def __init__(self, conn, page_cost, page_size, phone_weight=0.5, prior_pages=2, min_page_cost=0.0):
+        self.conn = conn
+        self.page_cost = page_cost
+        self.min_page_cost = min_page_cost
+        self.optimistic_yield = page_size * (1 + phone_weight) / page_cost
+        self.phone_weight = phone_weight
+        self.prior_cost = prior_pages * page_cost
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS query_stats (
+                industry TEXT NOT NULL,
+                query TEXT NOT NULL,
+                pages INTEGER NOT NULL DEFAULT 0,
+                cost REAL NOT NULL DEFAULT 0,
+                new_leads INTEGER NOT NULL DEFAULT 0,
+                new_with_phone INTEGER NOT NULL DEFAULT 0,
+                updated_at TEXT,
+                PRIMARY KEY (industry, query)
+            )
+        """)
+        conn.commit()
+        # (industry, query) -> [pages, cost, new_leads, new_with_phone]
+        self.rows = {
+            (row[0], row[1]): list(row[2:])
+            for row in conn.execute(
+                "SELECT industry, query, pages, cost, new_leads, new_with_phone FROM query_stats"
+            )
+        }
+
+    def record_page(self, industry, query, new_leads, new_with_phone, cost=None):
+        """cost is what the page actually cost (0 when it came from the
+        response cache), raised to min_page_cost; page_cost when the
+        source couldn't say."""
+        cost = self.page_cost if cost is None else max(cost, self.min_page_cost)
+        row = self.rows.setdefault((industry, query), [0, 0.0, 0, 0])
+        row[0] += 1
+        row[1] += cost
+        row[2] += new_leads
+        row[3] += new_with_phone
+        with self.conn:
+            self.conn.execute("""
+                INSERT INTO query_stats (industry, query, pages, cost, new_leads, new_with_phone, updated_at)
+                VALUES (?, ?, 1, ?, ?, ?, ?)
+                ON CONFLICT (industry, query) DO UPDATE SET
+                    pages = pages + 1,
+                    cost = cost + excluded.cost,
+                    new_leads = new_leads + excluded.new_leads,
+                    new_with_phone = new_with_phone + excluded.new_with_phone,
+                    updated_at = excluded.updated_at
+            """, (industry, query, cost, new_leads, new_with_phone, _now()))
+
+    def _value(self, row):
+        return row[2] + self.phone_weight * row[3]
+
+    def industry_yield(self, industry):
+        rows = [row for (ind, _), row in self.rows.items() if ind == industry]
+        cost = sum(row[1] for row in rows)
+        if not cost:
+            return self.optimistic_yield
+        return sum(self._value(row) for row in rows) / cost
+
+    def expected_yield(self, industry, query):
+        prior = self.industry_yield(industry)
+        row = self.rows.get((industry, query))
+        if row is None:
+            return prior
+        return (self._value(row) + prior * self.prior_cost) / (row[1] + self.prior_cost)
+
+    def next_query(self, candidates, min_yield=0.0):
+        """Best (industry, query) among candidates, or None if every one is
+        expected to yield less than min_yield. Ties keep list order."""
+        best, best_yield = None, min_yield
+        for candidate in candidates:
+            expected = self.expected_yield(*candidate)
+            if best is None and expected >= min_yield or expected > best_yield:
+                best, best_yield = candidate, expected
+        return best
+
+
+def _now():
+    return datetime.now(timezone.utc).isoformat()
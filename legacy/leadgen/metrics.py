@@ -0,0 +1,237 @@
+"""
+Run metrics: counters, gauges and latency histograms, written to a
+snapshot file while the collectors run.
+
+Set METRICS_PATH to enable the file. A name ending in .json gets a JSON
+snapshot; anything else gets Prometheus text exposition format, which
+node_exporter's textfile collector can pick up as-is. The file is
+rewritten at most every METRICS_INTERVAL seconds, always by replacing it
+whole, so a reader never sees a partial snapshot.
+
+What is recorded (all names prefixed leadgen_):
+    http_request_seconds{endpoint}          one attempt, histogram
+    http_requests_total{endpoint,status}    status "error" = no response
+    http_retries_total / http_throttled_total{endpoint}
+    cache_hits_total{endpoint}
+    search_seconds{source}                  a whole search call, retries included
+    sleep_seconds_total{reason}             pacing, backoff, page_token
+    page_new_leads{source}                  new leads per results page, histogram
+    new_leads_total / billable_calls_total / spend_usd_total{source}
+    db_write_seconds, db_rows_written_total
+    upload_rows_total{result}
+    refreshed_leads_total{result}           changed, unchanged, failed
+and, derived at snapshot time, cost_per_new_lead_usd{source},
+calls_per_new_lead{source} and run_seconds.
+"""
+
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+METRICS_INTERVAL = 5.0
+
+LATENCY_BUCKETS = (0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+PAGE_BUCKETS = (0, 1, 2, 5, 10, 20, 50)
+
+PREFIX = "leadgen_"
+
+
+def _key(labels):
+    return tuple(sorted(labels.items()))
+
+
+def _format_labels(key, extra=()):
+    pairs = list(key) + list(extra)
+    if not pairs:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, v in pairs)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + "}"
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self):
+        """(upper bound, observations <= bound) pairs, ending with +Inf."""
+        running = 0
+        pairs = []
+        for bound, n in zip(self.buckets, self.counts):
+            running += n
+            pairs.append((bound, running))
+        pairs.append(("+Inf", self.count))
+        return pairs
+
+
+class Registry:
+    """Thread-safe metric store for one process."""
+
+    def __init__(self, path=None, interval=METRICS_INTERVAL):
+        self._lock = threading.Lock()
+        self.configure(path, interval)
+
+    def configure(self, path, interval=METRICS_INTERVAL):
+        """Start over, writing to path (None disables the file)."""
+        with self._lock:
+            self.path = path
+            self.interval = interval
+            self.counters = {}
+            self.gauges = {}
+            self.histograms = {}
+            self.started = time.monotonic()
+            self._last_write = 0.0
+
+    def inc(self, name, value=1, **labels):
+        with self._lock:
+            series = self.counters.setdefault(PREFIX + name, {})
+            key = _key(labels)
+            series[key] = series.get(key, 0) + value
+        self.maybe_write()
+
+    def set(self, name, value, **labels):
+        with self._lock:
+            self.gauges.setdefault(PREFIX + name, {})[_key(labels)] = value
+        self.maybe_write()
+
+    def observe(self, name, value, buckets=LATENCY_BUCKETS, **labels):
+        with self._lock:
+            series = self.histograms.setdefault(PREFIX + name, {})
+            key = _key(labels)
+            if key not in series:
+                series[key] = Histogram(buckets)
+            series[key].observe(value)
+        self.maybe_write()
+
+    @contextmanager
+    def timer(self, name, **labels):
+        """Observe how long the with-block took, in seconds."""
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self.observe(name, time.monotonic() - started, **labels)
+
+    def sleep(self, seconds, reason):
+        """time.sleep, counted as sleep_seconds_total{reason}."""
+        if seconds > 0:
+            time.sleep(seconds)
+            self.inc("sleep_seconds_total", seconds, reason=reason)
+
+    def counter_value(self, name, **labels):
+        with self._lock:
+            return self.counters.get(PREFIX + name, {}).get(_key(labels), 0)
+
+    def _derived(self):
+        """Gauges computed from counters: what each new lead cost."""
+        gauges = {PREFIX + "run_seconds": {(): time.monotonic() - self.started}}
+        new_leads = self.counters.get(PREFIX + "new_leads_total", {})
+        for name, counter in (("cost_per_new_lead_usd", "spend_usd_total"),
+                              ("calls_per_new_lead", "billable_calls_total")):
+            totals = {}
+            for key, value in self.counters.get(PREFIX + counter, {}).items():
+                source = _key({"source": dict(key).get("source")})
+                totals[source] = totals.get(source, 0) + value
+            gauges[PREFIX + name] = {
+                source: total / new_leads[source]
+                for source, total in totals.items() if new_leads.get(source)
+            }
+        return gauges
+
+    def snapshot(self):
+        """Everything recorded so far, as a JSON-ready dict."""
+        def series(store, value):
+            return {
+                name: [dict(labels=dict(key), **value(v)) for key, v in sorted(entries.items())]
+                for name, entries in sorted(store.items())
+            }
+
+        with self._lock:
+            gauges = dict(self.gauges, **self._derived())
+            return {
+                "generated_at": datetime.now(timezone.utc).isoformat(),
+                "counters": series(self.counters, lambda v: {"value": v}),
+                "gauges": series(gauges, lambda v: {"value": v}),
+                "histograms": series(self.histograms, lambda h: {
+                    "buckets": {str(bound): n for bound, n in h.cumulative()},
+                    "sum": h.sum,
+                    "count": h.count,
+                }),
+            }
+
+    def to_prometheus(self):
+        lines = []
+        with self._lock:
+            gauges = dict(self.gauges, **self._derived())
+            for kind, store in (("counter", self.counters), ("gauge", gauges)):
+                for name, entries in sorted(store.items()):
+                    lines.append(f"# TYPE {name} {kind}")
+                    for key, value in sorted(entries.items()):
+                        lines.append(f"{name}{_format_labels(key)} {value:g}")
+            for name, entries in sorted(self.histograms.items()):
+                lines.append(f"# TYPE {name} histogram")
+                for key, hist in sorted(entries.items()):
+                    for bound, n in hist.cumulative():
+                        lines.append(f"{name}_bucket{_format_labels(key, [('le', f'{bound:g}' if bound != '+Inf' else bound)])} {n}")
+                    lines.append(f"{name}_sum{_format_labels(key)} {hist.sum:g}")
+                    lines.append(f"{name}_count{_format_labels(key)} {hist.count}")
+        return "\n".join(lines) + "\n"
+
+    def maybe_write(self):
+        if self.path and time.monotonic() - self._last_write >= self.interval:
+            self.write()
+
+    def write(self, path=None):
+        """Replace the snapshot file now."""
+        path = path or self.path
+        if not path:
+            return
+        self._last_write = time.monotonic()
+        if path.endswith(".json"):
+            text = json.dumps(self.snapshot(), indent=2)
+        else:
+            text = self.to_prometheus()
+        head, tail = os.path.split(path)
+        tmp = os.path.join(head, f".tmp-{os.getpid()}-{threading.get_ident()}-{tail}")
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(text)
+        os.replace(tmp, path)
+
+
+def record_request(endpoint, started, status):
+    """One HTTP attempt that began at monotonic time started. status is
+    the HTTP status, or None when no response came back."""
+    METRICS.observe("http_request_seconds", time.monotonic() - started, endpoint=endpoint)
+    METRICS.inc("http_requests_total", endpoint=endpoint, status=str(status or "error"))
+    if status == 429:
+        METRICS.inc("http_throttled_total", endpoint=endpoint)
+
+
+def worker_path(path, suffix):
+    """path with suffix before the extension, for one worker process."""
+    if not path:
+        return None
+    stem, ext = os.path.splitext(path)
+    return f"{stem}.{suffix}{ext}"
+
+
+METRICS = Registry()
+
+inc = METRICS.inc
+observe = METRICS.observe
+timer = METRICS.timer
+sleep = METRICS.sleep
+write = METRICS.write
@@ -0,0 +1,177 @@
+"""
+Metro definitions and the multi-metro process runner.
+
+A metro is a dict:
+
+    {
+        "name": "Denver", "state": "CO", "state_name": "Colorado",
+        "lat": 39.7392, "lng": -104.9903, "radius_miles": 25,
+        "areas": ["Aurora", "Lakewood", ...],   # suburbs for expanded searches
+        "target_leads": 500, "max_spend_usd": 15.0, "max_calls": 500
+    }
+
+Set METROS_PATH to a JSON file holding a list of these (only name, state,
+lat and lng are required; see config.Settings). With more than one metro, each runs in its
+own worker process against its own shard database under SHARD_DIR; the
+shards are merged into the generator's main database afterwards. A
+SharedBudget keeps the total spend (or API calls) of all workers under
+one ceiling.
+"""
+
+import importlib
+import json
+import multiprocessing
+import os
+import re
+import sqlite3
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from .lead_store import LEAD_COLUMNS
+from .normalize import NORMALIZED_COLUMNS
+
+METRO_WORKERS = 4
+SHARD_DIR = "shards"
+
+DENVER = {
+    "name": "Denver",
+    "state": "CO",
+    "state_name": "Colorado",
+    "lat": 39.7392,
+    "lng": -104.9903,
+    "radius_miles": 25,
+    "areas": [
+        "Aurora", "Lakewood", "Thornton", "Arvada", "Westminster",
+        "Centennial", "Highlands Ranch", "Littleton", "Commerce City",
+        "Englewood", "Broomfield", "Northglenn", "Wheat Ridge",
+        "Federal Heights", "Sheridan", "Parker", "Brighton", "Golden",
+    ],
+}
+
+METRO_DEFAULTS = {
+    "radius_miles": 25,
+    "areas": [],
+    "target_leads": 500,
+    "max_spend_usd": 15.0,
+    "max_calls": 500,
+}
+
+REQUIRED_KEYS = ("name", "state", "lat", "lng")
+
+
+def default_metro():
+    return dict(METRO_DEFAULTS, **DENVER)
+
+
+def load_metros(path=None):
+    """Metros from a JSON list, defaults filled in. [DENVER] without a path."""
+    if not path:
+        return [default_metro()]
+    with open(path, encoding="utf-8") as f:
+        entries = json.load(f)
+    metros = []
+    for entry in entries:
+        missing = [key for key in REQUIRED_KEYS if key not in entry]
+        if missing:
+            raise ValueError(f"Metro {entry.get('name', entry)!r} in {path} is missing {', '.join(missing)}")
+        metro = dict(METRO_DEFAULTS, **entry)
+        metro.setdefault("state_name", metro["state"])
+        metros.append(metro)
+    return metros
+
+
+def metro_slug(metro):
+    return re.sub(r"[^a-z0-9]+", "_", f"{metro['name']} {metro['state']}".lower()).strip("_")
+
+
+# ─── SHARED BUDGET ────────────────────────────────────────────────────
+class SharedBudget:
+    """A spend ceiling every worker process charges against. Pass it to the
+    pool initializer; the counter lives in shared memory."""
+
+    def __init__(self, limit):
+        self.limit = limit
+        self._spent = multiprocessing.Value("d", 0.0)
+
+    @property
+    def spent(self):
+        return self._spent.value
+
+    def charge(self, amount):
+        """Record amount. False (and nothing recorded) if it would cross the limit."""
+        with self._spent.get_lock():
+            if self._spent.value + amount > self.limit + 1e-9:
+                return False
+            self._spent.value += amount
+            return True
+
+
+_worker_budget = None
+
+
+def global_budget():
+    """The SharedBudget of the pool this process is a worker in, else None."""
+    return _worker_budget
+
+
+def _init_worker(budget, module_name, settings):
+    global _worker_budget
+    _worker_budget = budget
+    # Spawned workers start from module defaults; apply the parent's settings
+    importlib.import_module(module_name).configure(settings)
+
+
+def _run_metro(module_name, metro, shard_path):
+    module = importlib.import_module(module_name)
+    return module.run_metro(metro, shard_path)
+
+
+# ─── PARALLEL RUN ─────────────────────────────────────────────────────
+def run_parallel(module_name, metros, budget, settings, workers=METRO_WORKERS):
+    """Call module_name.run_metro(metro, shard_path) for every metro across
+    a process pool, each worker configured with settings. Returns
+    {metro name: result}; a metro whose worker crashed maps to the
+    exception."""
+    os.makedirs(SHARD_DIR, exist_ok=True)
+    results = {}
+    with ProcessPoolExecutor(
+        max_workers=min(workers, len(metros)), initializer=_init_worker,
+        initargs=(budget, module_name, settings),
+    ) as pool:
+        futures = {
+            pool.submit(_run_metro, module_name, metro, shard_path(module_name, metro)): metro
+            for metro in metros
+        }
+        for future in as_completed(futures):
+            metro = futures[future]
+            try:
+                results[metro["name"]] = future.result()
+            except Exception as e:
+                print(f"  [{metro['name']}] worker failed: {e}")
+                results[metro["name"]] = e
+    return results
+
+
+def shard_path(module_name, metro):
+    source = module_name.rsplit(".", 1)[-1]
+    return os.path.join(SHARD_DIR, f"{source}_{metro_slug(metro)}.db")
+
+
+def merge_shards(conn, paths):
+    """Copy every shard's leads, normalized keys included, into conn,
+    skipping place_ids it already has. Returns rows added."""
+    columns = ", ".join(LEAD_COLUMNS + NORMALIZED_COLUMNS)
+    added = 0
+    for path in paths:
+        if not os.path.exists(path):
+            continue
+        conn.execute("ATTACH DATABASE ? AS shard", (path,))
+        try:
+            with conn:
+                added += conn.execute(
+                    f"INSERT OR IGNORE INTO leads ({columns}) SELECT {columns} FROM shard.leads ORDER BY id"
+                ).rowcount
+        except sqlite3.OperationalError as e:
+            print(f"  Skipping shard {path}: {e}")
+        finally:
+            conn.execute("DETACH DATABASE shard")
+    return added
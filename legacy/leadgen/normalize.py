@@ -0,0 +1,152 @@
+"""
+Normalized match keys for leads.
+
+Dedup, do-not-call filtering and CRM matching join on these instead of
+the raw fields, which arrive in whatever form Google or Yelp returned:
+
+    phone_e164   +13035551234; None if it isn't a dialable number
+    street_key   "1234 w colfax ave" (lower-case, USPS abbreviations,
+                 unit/suite dropped)
+    city_key     "st louis"
+    zip5         "80202"
+    name_key     "acme storage" (no punctuation or filler words)
+
+lead_store fills them a page at a time as leads are written, and
+backfills older rows a table at a time. Everything here works column-wise
+on whole batches with precomputed translate tables and word maps; no
+per-row regular expressions.
+"""
+
+from functools import lru_cache
+
+NORMALIZED_COLUMNS = ["phone_e164", "street_key", "city_key", "zip5", "name_key"]
+
+# ─── TABLES ───────────────────────────────────────────────────────────
+_NON_DIGITS = bytes(b for b in range(256) if not 0x30 <= b <= 0x39)
+# ASCII letters and digits kept (lower-cased), everything else a space
+_WORD_BYTES = bytes(
+    b if chr(b).isalnum() and b < 0x80 else 0x20 for b in range(256)
+).lower()
+
+# Dropped from name keys so "Acme Storage, LLC" matches "ACME Storage"
+NAME_STOPWORDS = {"the", "inc", "llc", "ltd", "co", "corp", "company", "of", "and"}
+
+# USPS Publication 28 abbreviations for the words that vary most
+STREET_WORDS = {
+    "north": "n", "south": "s", "east": "e", "west": "w",
+    "northeast": "ne", "northwest": "nw", "southeast": "se", "southwest": "sw",
+    "street": "st", "avenue": "ave", "av": "ave", "boulevard": "blvd", "drive": "dr",
+    "road": "rd", "lane": "ln", "court": "ct", "place": "pl", "parkway": "pkwy",
+    "highway": "hwy", "circle": "cir", "terrace": "ter", "trail": "trl",
+    "square": "sq", "expressway": "expy", "freeway": "fwy", "center": "ctr",
+}
+# Everything from one of these on is a unit inside the building
+UNIT_WORDS = {"suite", "ste", "unit", "apt", "apartment", "room", "rm", "floor", "fl", "bldg", "building"}
+CITY_WORDS = {"saint": "st", "fort": "ft", "mount": "mt"}
+COUNTRY_SUFFIXES = {"usa", "us", "united states"}
+
+
+def _words(text):
+    """Lower-cased ASCII words, punctuation and non-ASCII as separators."""
+    return text.encode("ascii", "replace").translate(_WORD_BYTES).decode("ascii").split()
+
+
+# ─── SINGLE VALUES ────────────────────────────────────────────────────
+def e164(phone):
+    """+<country><number>. Numbers written without a + are taken as
+    North American; extensions are dropped."""
+    if not phone:
+        return None
+    phone = phone.lower().split("x", 1)[0]  # "x12", "ext. 12"
+    digits = phone.encode("ascii", "ignore").translate(None, _NON_DIGITS)
+    if phone.lstrip().startswith("+"):
+        return "+" + digits.decode("ascii") if 8 <= len(digits) <= 15 else None
+    if len(digits) == 11 and digits[:1] == b"1":
+        digits = digits[1:]
+    # NANP area codes never start with 0 or 1
+    if len(digits) != 10 or digits[:1] in (b"0", b"1"):
+        return None
+    return "+1" + digits.decode("ascii")
+
+
+def name_key(name):
+    """Lower-cased words of a business name, filler words dropped."""
+    if not name:
+        return ""
+    return " ".join(w for w in _words(name.replace("&", " and ")) if w not in NAME_STOPWORDS)
+
+
+def street_key(address):
+    """The street line of an address (its first comma-separated part) in
+    canonical form."""
+    if not address:
+        return None
+    words = []
+    for word in _words(address.split(",", 1)[0].replace("#", " unit ")):
+        if word in UNIT_WORDS:
+            break
+        words.append(STREET_WORDS.get(word, word))
+    return " ".join(words) or None
+
+
+@lru_cache(maxsize=4096)
+def city_key(city):
+    if not city:
+        return None
+    return " ".join(CITY_WORDS.get(w, w) for w in _words(city)) or None
+
+
+def zip5(zip_code, address=None):
+    """First five digits of a ZIP (or ZIP+4), else the one in address."""
+    if zip_code:
+        digits = zip_code.encode("ascii", "ignore").translate(None, _NON_DIGITS)
+        if len(digits) >= 5:
+            return digits[:5].decode("ascii")
+    return split_address(address)[3] if address else None
+
+
+def split_address(address):
+    """(street, city, state, zip5) from a one-line US address such as
+    "1234 Main St, Aurora, CO 80012, USA". Parts that aren't there are
+    None."""
+    parts = [part.strip() for part in (address or "").split(",") if part.strip()]
+    if parts and parts[-1].lower() in COUNTRY_SUFFIXES:
+        parts.pop()
+    street = city = state = zip_code = None
+    if parts:
+        # "CO 80012", "CO" or "80012"
+        tokens = parts[-1].split()
+        if tokens and len(tokens[0]) == 2 and tokens[0].isalpha():
+            state = tokens[0].upper()
+        if tokens and tokens[-1][:5].isdigit() and len(tokens[-1]) in (5, 10):
+            zip_code = tokens[-1][:5]
+        if state or zip_code:
+            parts.pop()
+    if len(parts) >= 2:
+        city = parts[-1]
+        street = parts[0]
+    elif parts:
+        street = parts[0]
+    return street, city, state, zip_code
+
+
+# ─── BATCHES ──────────────────────────────────────────────────────────
+def normalize_columns(names, addresses, cities, zips, phones):
+    """NORMALIZED_COLUMNS for whole columns of values, one tuple per row."""
+    return list(zip(
+        [e164(phone) for phone in phones],
+        [street_key(address) for address in addresses],
+        [city_key(city) for city in cities],
+        [zip5(zip_code, address) for zip_code, address in zip(zips, addresses)],
+        [name_key(name) for name in names],
+    ))
+
+
+def normalize_leads(leads):
+    """NORMALIZED_COLUMNS for a page of lead_store.Leads."""
+    if not leads:
+        return []
+    names, addresses, cities, zips, phones = zip(*(
+        (lead.business_name, lead.address, lead.city, lead.zip, lead.phone_number) for lead in leads
+    ))
+    return normalize_columns(names, addresses, cities, zips, phones)
@@ -0,0 +1,315 @@
+"""
+Staged collection pipeline shared by the Google and Yelp generators.
+
+A provider plugs in as a Source adapter; the pipeline walks each of its
+paginated search streams through
+
+    fetch -> dedup -> enrich -> parse -> normalize -> store -> checkpoint
+
+and a run ends with the sync stage (CSV/Parquet export and a delta push
+to Supabase, see finish helpers below).
+
+Fetching runs one page ahead on a background thread: as soon as a page
+has been deduplicated and shows the stream is worth continuing, the next
+page is requested, so enriching, parsing, the DB write and the frontier
+checkpoint of page N overlap the round trip for page N+1. The next page
+is only requested when the serial loop would have requested it too, so
+the overlap never pays for an extra page. Everything touching SQLite
+stays on the calling thread.
+
+A Source implements:
+    name                    metrics label ("google", "yelp")
+    fetch(stream, cursor)   one page -> Page, or None on an API error;
+                            cursor None means the first page. The Page
+                            says what its request was charged, in the
+                            unit the query stats are kept in
+    item_id(item)           the lead's place_id, used for dedup
+    parse(item, industry, created_at)
+                            a lead_store.Lead; created_at is taken once
+                            per page, not per lead
+and may override resume(stream, cursor), the first fetch of a stream
+with a saved position (a Page marked restarted if that position could
+not be used and the stream started over), and enrich(items), which completes a page's new
+items before parsing and returns (items, cost). Items enrich drops are
+forgotten again, so a later page that finds them retries.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+
+from . import lead_export
+from . import metrics
+from . import supabase_sync
+from .lead_store import LEAD_COLUMNS, _now, count_leads, count_with_phone, print_industry_breakdown
+
+
+class Page:
+    """Raw results of one request and the cursor of the page after it
+    (None when this was the last page). cost is what the request was
+    charged (0 for a cache hit); None if the source can't tell."""
+
+    __slots__ = ("items", "cursor", "cost", "restarted")
+
+    def __init__(self, items, cursor=None, cost=None):
+        self.items = items
+        self.cursor = cursor
+        self.cost = cost
+        self.restarted = False
+
+
+class Stream:
+    """One paginated search. Leads are filed under industry, the crawl
+    position is saved in the frontier under key, and params is whatever
+    the source needs to build the request."""
+
+    __slots__ = ("industry", "key", "params")
+
+    def __init__(self, industry, key, params=None):
+        self.industry = industry
+        self.key = key
+        self.params = params
+
+
+class Source:
+    name = None
+    page_delay = 0.0  # seconds to wait before following a cursor
+
+    def fetch(self, stream, cursor):
+        raise NotImplementedError
+
+    def item_id(self, item):
+        raise NotImplementedError
+
+    def parse(self, item, industry, created_at):
+        raise NotImplementedError
+
+    def resume(self, stream, cursor):
+        return self.fetch(stream, cursor)
+
+    def enrich(self, items):
+        return items, 0
+
+
+class StreamResult:
+    """How a stream run ended. status is "exhausted" (no pages left, or
+    the stream went dry), "target" (target reached, position saved) or
+    "error" (API error, position saved). results counts raw items
+    fetched, new_leads the ones stored and cost what their pages were
+    charged. restarted is set when the saved position could not be used
+    and the stream was walked again from its first page."""
+
+    __slots__ = ("status", "pages", "results", "new_leads", "cost", "restarted")
+
+    def __init__(self):
+        self.status = "exhausted"
+        self.pages = 0
+        self.results = 0
+        self.new_leads = 0
+        self.cost = 0.0
+        self.restarted = False
+
+
+class Pipeline:
+    """Runs a Source's streams into a LeadWriter. seen_ids is shared with
+    the caller and updated as pages are deduplicated. With stats, every
+    stored page is recorded for the query scheduler."""
+
+    def __init__(self, source, writer, frontier, seen_ids, target, stats=None):
+        self.source = source
+        self.writer = writer
+        self.frontier = frontier
+        self.seen_ids = seen_ids
+        self.target = target
+        self.stats = stats
+
+    # ─── STAGES ───────────────────────────────────────────────────────
+    def dedup(self, items):
+        """The page's unseen items, each claimed in seen_ids at once so a
+        concurrent stream that finds it too won't pay for it again."""
+        item_id = self.source.item_id
+        seen = self.seen_ids
+        fresh = []
+        for item in items:
+            key = item_id(item)
+            if not key or key in seen:
+                continue
+            seen.add(key)
+            fresh.append(item)
+        return fresh
+
+    def prepare(self, items):
+        """Source.enrich, releasing the claim on any item it drops.
+        Returns (items, cost)."""
+        if not items:
+            return items, 0
+        enriched, cost = self.source.enrich(items)
+        if len(enriched) < len(items):
+            item_id = self.source.item_id
+            kept = {item_id(item) for item in enriched}
+            self.seen_ids.difference_update(item_id(item) for item in items if item_id(item) not in kept)
+        return enriched, cost
+
+    def store(self, stream, items, cost=None):
+        """Parse a page's new items and write them in one transaction;
+        the writer adds their normalized keys. cost is what the page and
+        its enrichment were charged, for the query stats. Returns the
+        number of new leads."""
+        parse = self.source.parse
+        industry = stream.industry
+        created_at = _now()
+        phones_before = self.writer.with_phone
+        self.writer.extend([parse(item, industry, created_at) for item in items])
+        self.writer.flush()
+        new_in_page = len(items)
+        if self.stats is not None:
+            self.stats.record_page(
+                stream.industry, stream.key, new_in_page, self.writer.with_phone - phones_before, cost
+            )
+        metrics.observe("page_new_leads", new_in_page, buckets=metrics.PAGE_BUCKETS, source=self.source.name)
+        metrics.inc("new_leads_total", new_in_page, source=self.source.name)
+        return new_in_page
+
+    def checkpoint(self, stream, cursor):
+        """Save the stream's position once its page is stored."""
+        if cursor is not None:
+            self.frontier.advance(stream.industry, stream.key, cursor)
+        else:
+            self.frontier.exhaust(stream.industry, stream.key)
+
+    def resume(self, stream, cursor):
+        """Source.resume, then resumed()."""
+        return self.resumed(stream, self.source.resume(stream, cursor))
+
+    def resumed(self, stream, page):
+        """Record the outcome of Source.resume; call it on the calling
+        thread when the fetch ran elsewhere. A stream that had to start
+        over loses its saved page count too, so the pages it walks again
+        aren't counted twice."""
+        if page is not None and page.restarted:
+            self.frontier.restart(stream.industry, stream.key)
+        return page
+
+    def _fetch_next(self, stream, cursor):
+        if self.source.page_delay:
+            metrics.sleep(self.source.page_delay, "page_token")
+        return self.source.fetch(stream, cursor)
+
+    # ─── RUN ──────────────────────────────────────────────────────────
+    def run_stream(self, stream, dry_after=None):
+        """Walk the remaining pages of a stream, resuming from its saved
+        position. With dry_after, a page with no new leads after that many
+        pages ends the stream and marks it exhausted. Errors raised while
+        fetching (budget, quota) propagate once the page before is stored."""
+        result = StreamResult()
+        status, cursor = self.frontier.get(stream.industry, stream.key)
+        if status == "exhausted":
+            return result
+
+        with ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"{self.source.name}-fetch") as fetcher:
+            page = self.resume(stream, cursor)
+            result.restarted = page is not None and page.restarted
+            while True:
+                if page is None:
+                    result.status = "error"
+                    break
+                if not page.items:
+                    self.frontier.exhaust(stream.industry, stream.key)
+                    break
+                result.pages += 1
+                result.results += len(page.items)
+
+                fresh = self.dedup(page.items)
+                dry = not fresh and dry_after is not None and result.pages > dry_after
+                reached = self.writer.total + len(fresh) >= self.target
+                upcoming = None
+                if page.cursor is not None and not dry and not reached:
+                    upcoming = fetcher.submit(self._fetch_next, stream, page.cursor)
+
+                fresh, enrich_cost = self.prepare(fresh)
+                cost = page_cost(page, enrich_cost)
+                result.cost += cost or 0
+                result.new_leads += self.store(stream, fresh, cost)
+                if dry:
+                    self.frontier.exhaust(stream.industry, stream.key)
+                    break
+                self.checkpoint(stream, page.cursor)
+                if page.cursor is None:
+                    break
+                if upcoming is None:
+                    result.status = "target"
+                    break
+                page = upcoming.result()
+        return result
+
+
+def page_cost(page, enrich_cost):
+    """A page's whole charge, or None if its source didn't report one."""
+    return None if page.cost is None else page.cost + enrich_cost
+
+
+# ─── FINISH: EXPORT, SYNC, SUMMARY ────────────────────────────────────
+def export_csv(conn, path, incremental=False, header=LEAD_COLUMNS):
+    """Stream leads to CSV, appending only new ones when incremental."""
+    written, total = lead_export.export_csv(conn, path, header=header, incremental=incremental)
+    if incremental:
+        print(f"\nExported {written} new leads to {path} ({total} total)")
+    else:
+        print(f"\nExported {total} leads to {path}")
+    return total
+
+
+def export_parquet(conn, path, source):
+    """Write the Parquet dataset; load it with lead_export.load_parquet."""
+    rows = lead_export.export_parquet(conn, path, source)
+    if rows is not None:
+        print(f"Exported {rows} leads to {path}/")
+    return rows
+
+
+def sync(conn, url, key, workers=supabase_sync.SYNC_WORKERS):
+    """Push leads that are new or changed since the last sync to Supabase.
+    Returns False if credentials are missing or any lead failed to sync."""
+    if not url or not key:
+        print("\nSupabase credentials not set. Skipping upload.")
+        return False
+
+    uploaded, failed, errors = supabase_sync.sync_leads(conn, url, key, workers=workers)
+    if not uploaded and not failed and not errors:
+        print("\nSupabase: already up to date")
+        return True
+
+    print(f"\nSupabase: uploaded {uploaded}, failed {failed}")
+    for error in errors[:3]:
+        print(f"  {error}")
+    if failed or errors:
+        print("  Unsynced leads are retried on the next run.")
+        return False
+    return True
+
+
+def print_summary(conn, usage=(), files=()):
+    """Final totals. usage is extra lines (tracker, rate limiter, cache
+    summaries); files is (label, path) pairs to list at the end."""
+    total = count_leads(conn)
+    with_phone = count_with_phone(conn)
+    without_phone = total - with_phone
+
+    print("\n" + "=" * 60)
+    print("  FINAL RESULTS")
+    print("=" * 60)
+    print(f"  Total leads collected:     {total}")
+    print(f"  With phone numbers:        {with_phone}")
+    print(f"  Missing phone numbers:     {without_phone}")
+    if total > 0:
+        print(f"  Phone coverage:            {with_phone/total*100:.1f}%")
+    if usage:
+        print()
+        for line in usage:
+            print(line)
+    print("=" * 60)
+
+    print_industry_breakdown(conn)
+
+    if files:
+        print("\n  Data files:")
+        for label, path in files:
+            print(f"    {label + ':':<7} {path}")
@@ -0,0 +1,153 @@
+"""
+Adaptive (AIMD) request pacing shared by every caller of an API.
+
+The limiter hands out send slots at `rate` requests per second. Each
+successful response raises the rate additively; a 429 or 5xx cuts it
+multiplicatively. Retry-After and RateLimit-* quota headers pause all
+callers until the provider says to resume, and jitter keeps concurrent
+callers from retrying in lockstep. Safe to share between threads.
+"""
+
+import random
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+
+from . import metrics
+
+# Quota headers sent by Yelp (RateLimit-*) and common X-RateLimit-* APIs
+REMAINING_HEADERS = ("RateLimit-Remaining", "X-RateLimit-Remaining")
+RESET_HEADERS = ("RateLimit-ResetTime", "RateLimit-Reset", "X-RateLimit-Reset")
+
+
+def retry_after_seconds(resp):
+    """Parse a Retry-After header (seconds or HTTP date). None if absent."""
+    value = resp.headers.get("Retry-After") if resp.headers else None
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+
+
+def _reset_seconds(value):
+    """Quota reset as seconds from now: a delta, an epoch timestamp or an ISO time."""
+    try:
+        number = float(value)
+    except ValueError:
+        try:
+            when = datetime.fromisoformat(value.replace("Z", "+00:00"))
+        except ValueError:
+            return None
+        return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+    if number > 1e9:  # epoch seconds
+        return max(0.0, number - time.time())
+    return max(0.0, number)
+
+
+class AdaptiveRateLimiter:
+    def __init__(self, initial_rate, min_rate=0.2, max_rate=None, increase=0.1,
+                 decrease=0.5, jitter=0.1, max_pause=60.0):
+        self.rate = float(initial_rate)
+        self.min_rate = min_rate
+        self.max_rate = max_rate or initial_rate * 4
+        self.increase = increase  # req/s added per successful response
+        self.decrease = decrease  # rate multiplier on 429/5xx
+        self.jitter = jitter
+        self.max_pause = max_pause  # longest quota pause honored in-process
+        self.quota_remaining = None
+
+        self.successes = 0
+        self.throttles = 0
+        self.server_errors = 0
+        self.sleep_seconds = 0.0
+
+        self._next_slot = 0.0
+        self._paused_until = 0.0
+        self._last_decrease = 0.0
+        self._lock = threading.Lock()
+
+    def wait(self):
+        """Block the calling thread until its send slot comes up."""
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot, self._paused_until)
+            interval = 1.0 / self.rate
+            self._next_slot = slot + interval * random.uniform(1 - self.jitter, 1 + self.jitter)
+        delay = slot - now
+        if delay > 0:
+            time.sleep(delay)
+            with self._lock:
+                self.sleep_seconds += delay
+            metrics.inc("sleep_seconds_total", delay, reason="pacing")
+
+    def on_success(self, resp=None):
+        with self._lock:
+            self.successes += 1
+            self.rate = min(self.max_rate, self.rate + self.increase)
+            if resp is not None:
+                self._read_quota(resp)
+
+    def on_throttle(self, resp=None):
+        """Record a 429. Returns True if the response said when to retry
+        (the pause is already applied to every caller), else False and
+        the caller should back off itself."""
+        with self._lock:
+            self.throttles += 1
+            self._cut_rate()
+            retry_after = retry_after_seconds(resp) if resp is not None else None
+            if retry_after is None:
+                return False
+            self._pause(retry_after)
+            return True
+
+    def on_server_error(self):
+        with self._lock:
+            self.server_errors += 1
+            self._cut_rate()
+
+    def backoff(self, attempt, base=1.0, cap=30.0):
+        """Exponential backoff with equal jitter for retrying one request."""
+        wait = min(cap, base * 2 ** (attempt + 1))
+        return wait / 2 + random.uniform(0, wait / 2)
+
+    def _cut_rate(self):
+        # Concurrent callers see the same overload burst; cut once per interval
+        now = time.monotonic()
+        if now - self._last_decrease >= 1.0 / self.rate:
+            self.rate = max(self.min_rate, self.rate * self.decrease)
+            self._last_decrease = now
+
+    def _pause(self, seconds):
+        seconds = min(seconds, self.max_pause) * random.uniform(1, 1 + self.jitter)
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+    def _read_quota(self, resp):
+        headers = resp.headers or {}
+        remaining = next((headers[h] for h in REMAINING_HEADERS if h in headers), None)
+        if remaining is None:
+            return
+        try:
+            self.quota_remaining = int(float(remaining))
+        except ValueError:
+            return
+        if self.quota_remaining > 0:
+            return
+        reset = next((headers[h] for h in RESET_HEADERS if h in headers), None)
+        seconds = _reset_seconds(reset) if reset else None
+        if seconds is not None and seconds <= self.max_pause:
+            self._pause(seconds)
+
+    def summary(self):
+        return (
+            f"  Request rate: {self.rate:.1f} req/s at finish | "
+            f"{self.throttles} throttled, {self.server_errors} server errors | "
+            f"{self.sleep_seconds:.1f}s paced"
+        )
@@ -0,0 +1,185 @@
+"""
+Compact index of the place_ids already in a lead database.
+
+Dedup used to load every stored place_id string into a Python set, which
+at a million leads costs hundreds of MB and a full table scan before the
+first API call. Here each stored ID is a 64-bit hash in a sorted array,
+persisted next to the database as "<db>-seen" and memory-mapped at
+startup, so opening it reads only the rows added since it was written
+(leads.id is AUTOINCREMENT, so the file just records the highest id it
+covers).
+
+A hash miss is a definite miss. A hit is only probable, since IDs can
+collide or have been deleted since, so it is confirmed against the
+database's place_id index before a page item is skipped. IDs claimed
+during the run are kept as exact strings; there are at most a run's worth.
+"""
+
+import hashlib
+import mmap
+import os
+import struct
+import sys
+from array import array
+from bisect import bisect_left
+
+# Native byte order: the file is a local cache, rebuilt if it doesn't match
+MAGIC = b"SEEN" + sys.byteorder[0].upper().encode()
+HEADER = struct.Struct("<5s3xQ")  # magic, highest leads.id covered
+
+
+def id_hash(place_id):
+    return int.from_bytes(hashlib.blake2b(place_id.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+def index_path(db_path):
+    return f"{db_path}-seen"
+
+
+class _Part:
+    """The hashes of one database's place_ids."""
+
+    __slots__ = ("conn", "hashes", "map")
+
+    def __init__(self, conn, hashes, map_=None):
+        self.conn = conn
+        self.hashes = hashes
+        self.map = map_
+
+    def stored(self, place_id, h):
+        hashes = self.hashes
+        i = bisect_left(hashes, h)
+        if i == len(hashes) or hashes[i] != h:
+            return False
+        # Probable hit; confirm it
+        return self.conn.execute("SELECT 1 FROM leads WHERE place_id = ?", (place_id,)).fetchone() is not None
+
+    def close(self):
+        if self.map is not None:
+            self.hashes.release()
+            self.map.close()
+            self.map = None
+        self.hashes = array("Q")
+
+
+def _read(path):
+    """(mmap, hashes view, highest id) of an index file, or None when it
+    is missing or unreadable."""
+    try:
+        with open(path, "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            if size < HEADER.size or (size - HEADER.size) % 8:
+                return None
+            map_ = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except OSError:
+        return None
+    magic, high = HEADER.unpack_from(map_)
+    if magic != MAGIC:
+        map_.close()
+        return None
+    return map_, memoryview(map_)[HEADER.size:].cast("Q"), high
+
+
+def _write(path, hashes, high):
+    tmp = f"{path}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(HEADER.pack(MAGIC, high))
+        hashes.tofile(f)
+    os.replace(tmp, path)
+
+
+def _merge(hashes, fresh):
+    """The sorted union of two sorted hash arrays, as a new array. Each
+    fresh hash is bisected into hashes, and the stretch of hashes before
+    it is copied over in one block, so the merge is a single linear pass
+    over the stored hashes."""
+    merged = array("Q")
+    start = 0
+    with memoryview(hashes) as view:
+        for h in fresh:
+            i = bisect_left(hashes, h, start)
+            merged.frombytes(view[start:i].cast("B"))
+            merged.append(h)
+            start = i
+        merged.frombytes(view[start:].cast("B"))
+    return merged
+
+
+def _load(conn, db_path, persist):
+    """Map db_path's index, topped up with rows added since it was
+    written. With persist, the file is (re)written when that found any."""
+    path = index_path(db_path)
+    loaded = _read(path)
+    if loaded is not None:
+        map_, hashes, high = loaded
+        # A smaller max(id) means the database was replaced; start over
+        current = conn.execute("SELECT COALESCE(MAX(id), 0) FROM leads").fetchone()[0]
+        if current < high:
+            hashes.release()
+            map_.close()
+            loaded = None
+    if loaded is None:
+        map_, hashes, high = None, array("Q"), 0
+
+    rows = conn.execute("SELECT id, place_id FROM leads WHERE id > ? ORDER BY id", (high,)).fetchall()
+    if not rows:
+        if map_ is None and persist:
+            _write(path, hashes, high)
+        return _Part(conn, hashes, map_)
+
+    # Only the new hashes become Python ints; the stored ones are copied
+    # across from the map in blocks
+    merged = _merge(hashes, array("Q", sorted(id_hash(place_id) for _, place_id in rows)))
+    if map_ is not None:
+        hashes.release()
+        map_.close()
+    high = rows[-1][0]
+    if persist:
+        _write(path, merged, high)
+    return _Part(conn, merged)
+
+
+def refresh(conn, db_path):
+    """Bring db_path's index file up to date."""
+    _load(conn, db_path, persist=True).close()
+
+
+class SeenIndex:
+    """Set-like stand-in for the seen_ids set the pipeline dedups
+    against: the place_ids stored in each attached database plus the
+    ones claimed this run. Membership is checked on the thread that
+    attached the databases; add/discard only touch the claims."""
+
+    def __init__(self):
+        self.claimed = set()
+        self._parts = []
+
+    def attach(self, conn, db_path, persist=True):
+        """Index conn's leads. Pass persist=False for a database other
+        processes may be indexing at the same time."""
+        self._parts.append(_load(conn, db_path, persist))
+        return self
+
+    def __contains__(self, place_id):
+        if place_id in self.claimed:
+            return True
+        h = id_hash(place_id)
+        return any(part.stored(place_id, h) for part in self._parts)
+
+    def __len__(self):
+        """Approximate: stored and claimed IDs can overlap."""
+        return len(self.claimed) + sum(len(part.hashes) for part in self._parts)
+
+    def add(self, place_id):
+        self.claimed.add(place_id)
+
+    def discard(self, place_id):
+        self.claimed.discard(place_id)
+
+    def difference_update(self, place_ids):
+        self.claimed.difference_update(place_ids)
+
+    def close(self):
+        for part in self._parts:
+            part.close()
+        self._parts = []
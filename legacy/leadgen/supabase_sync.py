@@ -0,0 +1,267 @@
+"""
+Concurrent, delta-only upload of leads to the Supabase REST API.
+
+upload() is the engine: it takes a stream of records, packs them into
+batches sized to the payload and the latency Supabase is showing, posts
+them from a bounded worker pool and retries each failed batch on its
+own. Batches the server rejects are split in half until the bad rows
+are isolated, so one malformed lead can't sink its neighbours.
+
+sync_leads() feeds it from a lead database. A content hash of every row
+pushed is kept in a sync_state table, so a run only sends leads that are
+new or changed since the last successful sync.
+"""
+
+import hashlib
+import json
+import sqlite3
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from . import http_client
+from . import metrics
+from . import rate_control
+from .lead_store import LEAD_COLUMNS, _now
+
+SYNC_WORKERS = 4
+SYNC_BATCH_SIZE = 200           # starting rows per POST
+SYNC_MAX_BATCH_SIZE = 2000
+SYNC_MAX_PAYLOAD_BYTES = 2 * 1024 * 1024
+SYNC_TARGET_SECONDS = 2.0       # grow batches while POSTs finish faster than this
+SYNC_MAX_RETRIES = 4
+# Stop queueing batches after this many fail in a row (Supabase is down)
+SYNC_MAX_CONSECUTIVE_FAILURES = 3
+
+# Statuses where the batch itself is the problem; retrying it as-is won't help
+SPLIT_STATUSES = (400, 409, 413, 422)
+
+
+def rest_headers(key):
+    return {
+        "apikey": key,
+        "Authorization": f"Bearer {key}",
+        "Content-Type": "application/json",
+        "Prefer": "resolution=merge-duplicates,return=minimal",
+    }
+
+
+class BatchSizer:
+    """Rows per batch, adapted to how the server is coping: grows while
+    POSTs come back well under the latency target, halves when they are
+    slow or rejected as too large, and never lets a payload exceed
+    max_bytes at the average row size seen so far."""
+
+    def __init__(self, initial=SYNC_BATCH_SIZE, maximum=SYNC_MAX_BATCH_SIZE,
+                 max_bytes=SYNC_MAX_PAYLOAD_BYTES, target_seconds=SYNC_TARGET_SECONDS):
+        self.size = initial
+        self.maximum = maximum
+        self.max_bytes = max_bytes
+        self.target_seconds = target_seconds
+        self.row_bytes = None
+
+    def next_size(self):
+        if self.row_bytes:
+            return max(1, min(self.size, int(self.max_bytes / self.row_bytes)))
+        return self.size
+
+    def record(self, rows, nbytes, seconds):
+        self.row_bytes = nbytes / rows
+        if seconds < self.target_seconds / 2:
+            self.size = min(self.maximum, int(self.size * 1.5) + 1)
+        elif seconds > self.target_seconds:
+            self.shrink()
+
+    def shrink(self):
+        self.size = max(1, self.size // 2)
+
+
+def _post(url, headers, payload, limiter):
+    """POST one JSON payload, retrying throttling, 5xxs and connection
+    errors. Returns (status, error text); status is None if unreachable."""
+    import requests
+
+    error = None
+    for attempt in range(SYNC_MAX_RETRIES):
+        if attempt:
+            metrics.inc("http_retries_total", endpoint="supabase")
+        limiter.wait()
+        started = time.monotonic()
+        try:
+            resp = http_client.get_session().post(url, headers=headers, data=payload, timeout=60)
+        except requests.RequestException as e:
+            metrics.record_request("supabase", started, None)
+            error = str(e)
+            metrics.sleep(limiter.backoff(attempt), "backoff")
+            continue
+        metrics.record_request("supabase", started, resp.status_code)
+        if resp.status_code == 429:
+            if not limiter.on_throttle(resp):
+                metrics.sleep(limiter.backoff(attempt), "backoff")
+            error = resp.text[:200]
+            continue
+        if resp.status_code >= 500:
+            limiter.on_server_error()
+            error = f"{resp.status_code} - {resp.text[:200]}"
+            metrics.sleep(limiter.backoff(attempt), "backoff")
+            continue
+        limiter.on_success()
+        if resp.status_code in (200, 201, 204):
+            return resp.status_code, None
+        return resp.status_code, f"{resp.status_code} - {resp.text[:200]}"
+    return None, error
+
+
+def _send(url, headers, batch, sizer, limiter):
+    """Upload one batch of (token, record) pairs in a worker thread.
+
+    Returns (sent, failed, errors, unreachable): token lists, error
+    messages and whether the server never answered. Rejected batches are
+    split and their halves sent separately.
+    """
+    payload = json.dumps([record for _, record in batch], default=str).encode("utf-8")
+    started = time.monotonic()
+    status, error = _post(url, headers, payload, limiter)
+    if error is None:
+        sizer.record(len(batch), len(payload), time.monotonic() - started)
+        return [token for token, _ in batch], [], [], False
+
+    if status == 413:
+        sizer.shrink()
+    if status in SPLIT_STATUSES and len(batch) > 1:
+        mid = len(batch) // 2
+        first = _send(url, headers, batch[:mid], sizer, limiter)
+        second = _send(url, headers, batch[mid:], sizer, limiter)
+        return (first[0] + second[0], first[1] + second[1], first[2] + second[2],
+                first[3] and second[3])
+    return [], list(batch), [error], status is None
+
+
+def upload(items, url, key, on_sent=None, on_failed=None, workers=SYNC_WORKERS):
+    """Upload (token, record) pairs to the leads table at url.
+
+    Batches go out concurrently, at most `workers` in flight. on_sent is
+    called with the tokens of every stored batch and on_failed with the
+    (token, record) pairs that could not be stored, always from the
+    calling thread, so callbacks may use a SQLite connection.
+
+    Gives up once Supabase stops answering; items not yet pulled from the
+    iterator are left there. Returns (uploaded, failed, errors).
+    """
+    # Merge on place_id: without on_conflict PostgREST merges on the
+    # primary key, and a changed lead already stored comes back 409
+    endpoint = f"{url}/rest/v1/leads?on_conflict=place_id"
+    headers = rest_headers(key)
+    sizer = BatchSizer()
+    limiter = rate_control.AdaptiveRateLimiter(workers * 5, max_rate=workers * 20)
+    uploaded = failed = 0
+    errors = []
+    consecutive_failures = 0
+    in_flight = set()
+
+    def collect(done):
+        nonlocal uploaded, failed, consecutive_failures
+        for future in done:
+            in_flight.discard(future)
+            sent, rejected, batch_errors, unreachable = future.result()
+            if sent:
+                uploaded += len(sent)
+                metrics.inc("upload_rows_total", len(sent), result="sent")
+                if on_sent:
+                    on_sent(sent)
+            if rejected:
+                failed += len(rejected)
+                metrics.inc("upload_rows_total", len(rejected), result="failed")
+                if on_failed:
+                    on_failed(rejected)
+            errors.extend(batch_errors)
+            consecutive_failures = consecutive_failures + 1 if unreachable else 0
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        batch = []
+        items = iter(items)
+        while consecutive_failures < SYNC_MAX_CONSECUTIVE_FAILURES:
+            item = next(items, None)
+            if item is not None:
+                batch.append(item)
+                if len(batch) < sizer.next_size():
+                    continue
+            if batch:
+                in_flight.add(pool.submit(_send, endpoint, headers, batch, sizer, limiter))
+                batch = []
+            if item is None:
+                break
+            if len(in_flight) >= workers:
+                collect(wait(in_flight, return_when=FIRST_COMPLETED).done)
+        collect(wait(in_flight).done)
+
+    if consecutive_failures >= SYNC_MAX_CONSECUTIVE_FAILURES:
+        print(f"  Supabase unreachable after {consecutive_failures} failed batches. Stopping early.")
+        if batch:
+            # Pulled from items but never sent
+            failed += len(batch)
+            metrics.inc("upload_rows_total", len(batch), result="failed")
+            if on_failed:
+                on_failed(batch)
+    return uploaded, failed, errors
+
+
+# ─── SQLITE DELTA SYNC ───────────────────────────────────────────────
+def init_sync_state(conn):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS sync_state (
+            place_id TEXT PRIMARY KEY,
+            content_hash TEXT NOT NULL,
+            synced_at TEXT
+        )
+    """)
+    conn.commit()
+
+
+def content_hash(row):
+    return hashlib.blake2b(repr(row).encode("utf-8"), digest_size=16).hexdigest()
+
+
+def pending_rows(conn, batch_size=1000):
+    """Yield ((place_id, hash), record) for leads not yet synced in their
+    current form, streamed in id order."""
+    place_id = LEAD_COLUMNS.index("place_id")
+    cur = conn.execute(f"""
+        SELECT {", ".join("l." + col for col in LEAD_COLUMNS)}, s.content_hash
+        FROM leads l LEFT JOIN sync_state s ON s.place_id = l.place_id
+        ORDER BY l.id
+    """)
+    while True:
+        rows = cur.fetchmany(batch_size)
+        if not rows:
+            return
+        for row in rows:
+            values, synced_hash = row[:-1], row[-1]
+            digest = content_hash(values)
+            if digest != synced_hash:
+                yield (values[place_id], digest), dict(zip(LEAD_COLUMNS, values))
+
+
+def mark_synced(conn, tokens):
+    now = _now()
+    with conn:
+        conn.executemany(
+            "INSERT OR REPLACE INTO sync_state (place_id, content_hash, synced_at) VALUES (?, ?, ?)",
+            [(place_id, digest, now) for place_id, digest in tokens],
+        )
+
+
+def sync_leads(conn, url, key, workers=SYNC_WORKERS):
+    """Push new and changed leads. Returns (uploaded, failed, errors)."""
+    init_sync_state(conn)
+    # Stream the delta through a second connection: under WAL it reads a
+    # snapshot while sync_state is written on this one
+    path = conn.execute("PRAGMA database_list").fetchone()[2]
+    reader = sqlite3.connect(path) if path else conn
+    try:
+        return upload(
+            pending_rows(reader), url, key,
+            on_sent=lambda tokens: mark_synced(conn, tokens), workers=workers,
+        )
+    finally:
+        if reader is not conn:
+            reader.close()
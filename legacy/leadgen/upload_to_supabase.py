@@ -0,0 +1,252 @@
+"""
+Upload leads from SQLite/CSV to Supabase.
+Run this from a machine with direct Supabase access.
+
+Usage:
+    python upload_to_supabase.py [CSV_PATH] [--start-row N]
+    python upload_to_supabase.py --retry-dead-letter
+    python upload_to_supabase.py [CSV_PATH] --copy [--create-table]
+
+The CSV is streamed in chunks and uploaded by a few concurrent workers,
+so file size doesn't matter. Batches Supabase rejects are written to
+leads.dead_letter.jsonl; --retry-dead-letter re-sends just those. If
+Supabase goes away mid-file, rerun with the --start-row it prints.
+Yelp exports (rating/source_id columns) are accepted as-is.
+
+--copy bulk-loads over a direct Postgres connection instead (COPY into a
+staging table, then one merge on place_id); much faster for initial
+loads and backfills. It needs SUPABASE_DB_URL, which can also point at a
+local Postgres for testing, and `pip install "psycopg[binary]"`. It
+expects the leads table below to exist; --create-table creates it first.
+
+Requires .env with SUPABASE_URL and SUPABASE_KEY (or a config.Settings
+passed to upload / copy_upload). Also runs as `python -m leadgen upload-csv`.
+
+Before running, create the leads table in Supabase SQL Editor:
+
+CREATE TABLE IF NOT EXISTS leads (
+    id BIGSERIAL PRIMARY KEY,
+    business_name TEXT,
+    industry TEXT,
+    address TEXT,
+    city TEXT,
+    state TEXT,
+    zip TEXT,
+    phone_number TEXT,
+    website TEXT,
+    google_rating NUMERIC,
+    total_reviews INTEGER,
+    place_id TEXT UNIQUE NOT NULL,
+    latitude NUMERIC,
+    longitude NUMERIC,
+    created_at TIMESTAMPTZ DEFAULT NOW()
+);
+CREATE INDEX IF NOT EXISTS idx_leads_place_id ON leads(place_id);
+CREATE INDEX IF NOT EXISTS idx_leads_industry ON leads(industry);
+"""
+
+import os
+import csv
+import json
+import argparse
+import sys
+from itertools import islice
+
+from . import http_client
+from . import lead_export
+from . import pg_copy
+from . import supabase_sync
+from .config import Settings
+from .lead_store import LEAD_COLUMNS
+
+CSV_PATH = "leads.csv"
+DEAD_LETTER_PATH = "leads.dead_letter.jsonl"
+CHUNK_SIZE = 5000
+
+FLOAT_COLUMNS = ("google_rating", "latitude", "longitude")
+INT_COLUMNS = ("total_reviews",)
+# Yelp CSV header -> Supabase column
+COLUMN_RENAMES = {"rating": "google_rating", "source_id": "place_id"}
+
+
+def _to_float(value):
+    try:
+        return float(value)
+    except ValueError:
+        return None
+
+
+def _to_int(value):
+    try:
+        return int(value)
+    except ValueError:
+        try:
+            return int(float(value))
+        except ValueError:
+            return None
+
+
+def coerce_chunk(rows):
+    """Fix up a chunk of csv.DictReader rows in place, column by column:
+    empty strings become None and numeric columns are parsed."""
+    if not rows:
+        return rows
+    for old, new in COLUMN_RENAMES.items():
+        if old in rows[0]:
+            for row in rows:
+                row[new] = row.pop(old)
+    columns = list(rows[0])
+    for col in columns:
+        convert = _to_float if col in FLOAT_COLUMNS else _to_int if col in INT_COLUMNS else None
+        for row in rows:
+            value = row[col]
+            if value == "" or value is None:
+                row[col] = None
+            elif convert:
+                row[col] = convert(value)
+    return rows
+
+
+def iter_csv(path, start_row, position):
+    """Yield (row_number, record) from path, CHUNK_SIZE rows at a time.
+    position[0] tracks the last row handed out."""
+    with lead_export.open_csv(path) as f:
+        reader = csv.DictReader(f)
+        for _ in islice(reader, start_row):
+            pass
+        row_number = start_row
+        while True:
+            chunk = coerce_chunk(list(islice(reader, CHUNK_SIZE)))
+            if not chunk:
+                return
+            for record in chunk:
+                row_number += 1
+                position[0] = row_number
+                yield row_number, record
+
+
+def iter_dead_letter(path):
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                entry = json.loads(line)
+                yield entry["row"], entry["record"]
+
+
+class DeadLetter:
+    """Rejected records as JSON lines. Uploads append to the file; a retry
+    writes a fresh one and swaps it in on close, so the file being
+    retried is never truncated while it is read."""
+
+    def __init__(self, path, replace=False):
+        self.path = path
+        self.replace = replace
+        self.tmp_path = path + ".tmp"
+        self.count = 0
+        self._file = open(self.tmp_path if replace else path, "w" if replace else "a", encoding="utf-8")
+
+    def write(self, failed):
+        for row, record in failed:
+            self._file.write(json.dumps({"row": row, "record": record}, default=str) + "\n")
+            self.count += 1
+
+    def close(self):
+        self._file.close()
+        if self.replace:
+            os.replace(self.tmp_path, self.path)
+        if os.path.getsize(self.path) == 0:
+            os.remove(self.path)
+
+
+def upload(path=CSV_PATH, start_row=0, retry_dead_letter=False, settings=None):
+    """Returns 1 if any lead wasn't uploaded."""
+    settings = settings or Settings.from_env()
+    if not settings.supabase_url or not settings.supabase_key:
+        print("ERROR: Set SUPABASE_URL and SUPABASE_KEY in .env")
+        return 1
+
+    position = [start_row]
+    if retry_dead_letter:
+        if not os.path.exists(DEAD_LETTER_PATH):
+            print(f"No {DEAD_LETTER_PATH} to retry.")
+            return
+        items = iter_dead_letter(DEAD_LETTER_PATH)
+        print(f"Retrying rejected leads from {DEAD_LETTER_PATH}")
+    else:
+        items = iter_csv(path, start_row, position)
+        print(f"Streaming leads from {path}" + (f" from row {start_row}" if start_row else ""))
+
+    dead_letter = DeadLetter(DEAD_LETTER_PATH, replace=retry_dead_letter)
+    try:
+        uploaded, failed, errors = supabase_sync.upload(
+            items, settings.supabase_url, settings.supabase_key,
+            on_failed=dead_letter.write, workers=settings.sync_workers,
+        )
+        # Anything left in the iterator was never tried
+        leftover = next(items, None)
+        stopped = leftover is not None
+        if stopped and retry_dead_letter:
+            dead_letter.write([leftover])
+            dead_letter.write(items)
+    finally:
+        dead_letter.close()
+        http_client.close_session()
+
+    print(f"\nDone: {uploaded} uploaded, {failed} failed")
+    if errors:
+        print("\nErrors:")
+        for e in errors[:3]:
+            print(f"  {e}")
+    if dead_letter.count:
+        print(f"\n{dead_letter.count} leads written to {DEAD_LETTER_PATH}. "
+              f"Retry them with --retry-dead-letter.")
+    if stopped and not retry_dead_letter:
+        print(f"Stopped before the end of {path}. Resume with --start-row {position[0] - 1}.")
+    if failed or stopped:
+        return 1
+
+
+def copy_upload(path=CSV_PATH, settings=None, create_table=False):
+    """Bulk-load the CSV with Postgres COPY instead of the REST API.
+    With create_table, the leads table is created if it is missing.
+    Returns 1 if the load couldn't run."""
+    settings = settings or Settings.from_env()
+    if not settings.supabase_db_url:
+        print("ERROR: Set SUPABASE_DB_URL in .env (Project Settings -> Database -> Connection string)")
+        return 1
+
+    print(f"Copying leads from {path}")
+    rows = (
+        tuple(record.get(col) for col in LEAD_COLUMNS)
+        for _, record in iter_csv(path, 0, [0])
+    )
+    try:
+        copied, merged = pg_copy.bulk_load(settings.supabase_db_url, rows, create_table=create_table)
+    except ImportError:
+        print('ERROR: --copy requires `pip install "psycopg[binary]"`')
+        return 1
+    print(f"\nDone: {copied} rows copied, {merged} inserted or changed")
+
+
+def main(argv=None, prog=None):
+    settings = Settings.from_env()
+    default_path = CSV_PATH + (".gz" if settings.export_gzip else "")
+    parser = argparse.ArgumentParser(prog=prog, description="Upload a leads CSV to Supabase.")
+    parser.add_argument("path", nargs="?", default=default_path)
+    parser.add_argument("--start-row", type=int, default=0, help="skip this many data rows")
+    parser.add_argument("--retry-dead-letter", action="store_true",
+                        help=f"re-send only the leads in {DEAD_LETTER_PATH}")
+    parser.add_argument("--copy", action="store_true",
+                        help="bulk-load over SUPABASE_DB_URL with COPY instead of the REST API")
+    parser.add_argument("--create-table", action="store_true",
+                        help="with --copy, create the leads table first if it doesn't exist")
+    args = parser.parse_args(argv)
+    if args.create_table and not args.copy:
+        parser.error("--create-table only applies to --copy")
+    if args.copy:
+        return copy_upload(args.path, settings, args.create_table)
+    return upload(args.path, args.start_row, args.retry_dead_letter, settings)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
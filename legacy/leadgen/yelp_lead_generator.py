@@ -0,0 +1,678 @@
+"""
+Denver Lead Generator - Yelp Fusion API → SQLite + CSV + Supabase
+Collects 500+ businesses suitable for vending machine placement.
+Alternative to Google Places API — Free tier: 500 API calls/day.
+
+Setup:
+  1. Go to https://www.yelp.com/developers/v3/manage_app
+  2. Create an app (free) and copy your API Key
+  3. Add YELP_API_KEY=your_key_here to your .env file
+  4. Run: python -m leadgen collect yelp
+
+`python -m leadgen refresh yelp` re-checks stale leads instead (see
+lead_refresh.py), one business lookup per lead against the same quota.
+
+Other metros: set METROS_PATH to a JSON list of metros (see metros.py).
+Several metros are collected in parallel worker processes, each into its
+own shard database, sharing the one DAILY_CALL_LIMIT of the API key.
+"""
+
+import sqlite3
+import time
+from urllib.parse import urlsplit
+
+from . import http_cache
+from . import http_client
+from . import lead_refresh
+from . import lead_store
+from . import metrics
+from . import metros
+from . import pipeline
+from . import rate_control
+from . import seen_index
+from . import supabase_sync
+from .config import Settings
+
+# ─── CONFIG ───────────────────────────────────────────────────────────
+# Defaults only; configure() applies a config.Settings (the CLI passes
+# Settings.from_env(), i.e. .env and the environment).
+SETTINGS = None
+YELP_API_KEY = None
+SUPABASE_URL = None
+SUPABASE_KEY = None
+
+# Metro being collected (Denver unless METROS_PATH says otherwise);
+# configure_metro() switches all of these together
+YELP_MAX_RADIUS_METERS = 40000  # ~25 miles
+METRO = metros.default_metro()
+RADIUS_METERS = min(YELP_MAX_RADIUS_METERS, int(METRO["radius_miles"] * 1609.34))
+
+TARGET_LEADS = METRO["target_leads"]
+
+# Yelp Fusion API
+YELP_SEARCH_URL = "https://api.yelp.com/v3/businesses/search"
+YELP_BUSINESS_URL = "https://api.yelp.com/v3/businesses/{id}"
+YELP_MAX_RESULTS_PER_QUERY = 1000  # Yelp caps offset at 1000
+YELP_PAGE_SIZE = 50  # Max per request
+DAILY_CALL_LIMIT = 500  # Free tier limit, shared by every metro in a run
+
+# Rate limiting — start well under Yelp's limits and adapt (AIMD) toward
+# MAX_REQUESTS_PER_SECOND while responses succeed; 429/5xx cut the rate.
+REQUEST_DELAY = 0.3  # starting seconds between requests
+MAX_REQUESTS_PER_SECOND = 10.0
+MAX_RETRIES = 5
+RATE_LIMITER = rate_control.AdaptiveRateLimiter(1.0 / REQUEST_DELAY, max_rate=MAX_REQUESTS_PER_SECOND)
+
+# Industry → Yelp search terms and categories
+INDUSTRY_MAP = [
+    {"industry": "warehouses",           "term": "warehouses",           "categories": ""},
+    {"industry": "distribution centers", "term": "distribution center",  "categories": ""},
+    {"industry": "manufacturing",        "term": "manufacturing",        "categories": ""},
+    {"industry": "apartments",           "term": "apartments",           "categories": "apartments"},
+    {"industry": "hotels",               "term": "hotels",               "categories": "hotels"},
+    {"industry": "hospitals",            "term": "hospitals",            "categories": "hospitals"},
+    {"industry": "car dealerships",      "term": "car dealerships",      "categories": "car_dealers"},
+    {"industry": "gyms",                 "term": "gyms",                 "categories": "gyms"},
+    {"industry": "office buildings",     "term": "office buildings",     "categories": ""},
+    {"industry": "auto repair",          "term": "auto repair",          "categories": "autorepair"},
+    {"industry": "car wash",             "term": "car wash",             "categories": "carwash"},
+]
+
+
+def metro_locations(metro):
+    """Yelp location strings: the metro itself, then its areas."""
+    return [f"{place}, {metro['state']}" for place in [metro["name"]] + metro["areas"]]
+
+
+# Metro neighborhoods for expanded searches; the first is the core city
+NEIGHBORHOODS = metro_locations(METRO)
+
+# On-disk response cache so reruns don't spend the daily quota on
+# identical searches. Set HTTP_CACHE_TTL_HOURS=0 to always hit the API.
+# The file is only opened on first use.
+HTTP_CACHE_PATH = "http_cache.db"
+HTTP_CACHE_TTL_HOURS = 24.0
+HTTP_CACHE_MAX_MB = 256.0
+RESPONSE_CACHE = http_cache.ResponseCache(HTTP_CACHE_PATH, HTTP_CACHE_TTL_HOURS * 3600, int(HTTP_CACHE_MAX_MB * 1024 * 1024))
+
+DB_PATH = "yelp_leads.db"
+# EXPORT_GZIP=1 writes yelp_leads.csv.gz. EXPORT_INCREMENTAL=1 appends only leads
+# added since the last export instead of rewriting the whole file.
+EXPORT_GZIP = False
+EXPORT_INCREMENTAL = False
+CSV_PATH = "yelp_leads.csv"
+
+# EXPORT_PARQUET=1 also writes a typed Parquet dataset partitioned by
+# industry and state (requires `pip install pyarrow`)
+EXPORT_PARQUET = False
+PARQUET_PATH = "yelp_leads_parquet"
+
+# Set RESET_FRONTIER=1 to forget saved crawl positions and start over
+RESET_FRONTIER = False
+
+# Neighborhood searches are run best expected yield first; ones expected
+# to return fewer new leads per API call than this are skipped.
+MIN_LEADS_PER_CALL = 2.0
+
+SYNC_WORKERS = supabase_sync.SYNC_WORKERS
+
+
+def configure(settings=None):
+    """Apply a config.Settings (defaults if None) to this module and the
+    helpers it drives. Call before collecting; main() does."""
+    global SETTINGS, YELP_API_KEY, SUPABASE_URL, SUPABASE_KEY
+    global MAX_REQUESTS_PER_SECOND, MAX_RETRIES, RATE_LIMITER
+    global HTTP_CACHE_PATH, HTTP_CACHE_TTL_HOURS, HTTP_CACHE_MAX_MB, RESPONSE_CACHE
+    global EXPORT_GZIP, EXPORT_INCREMENTAL, CSV_PATH, EXPORT_PARQUET
+    global RESET_FRONTIER, MIN_LEADS_PER_CALL, SYNC_WORKERS
+    settings = settings or Settings()
+    SETTINGS = settings
+
+    YELP_API_KEY = settings.yelp_api_key
+    SUPABASE_URL = settings.supabase_url
+    SUPABASE_KEY = settings.supabase_key
+
+    MAX_REQUESTS_PER_SECOND = settings.max_requests_per_second or 10.0
+    MAX_RETRIES = settings.max_retries
+    RATE_LIMITER = rate_control.AdaptiveRateLimiter(1.0 / REQUEST_DELAY, max_rate=MAX_REQUESTS_PER_SECOND)
+
+    if RESPONSE_CACHE is not None:
+        RESPONSE_CACHE.close()
+    HTTP_CACHE_PATH = settings.http_cache_path
+    HTTP_CACHE_TTL_HOURS = settings.http_cache_ttl_hours
+    HTTP_CACHE_MAX_MB = settings.http_cache_max_mb
+    RESPONSE_CACHE = (
+        http_cache.ResponseCache(HTTP_CACHE_PATH, HTTP_CACHE_TTL_HOURS * 3600, int(HTTP_CACHE_MAX_MB * 1024 * 1024))
+        if HTTP_CACHE_TTL_HOURS > 0 else None
+    )
+
+    EXPORT_GZIP = settings.export_gzip
+    EXPORT_INCREMENTAL = settings.export_incremental
+    CSV_PATH = "yelp_leads.csv" + (".gz" if EXPORT_GZIP else "")
+    EXPORT_PARQUET = settings.export_parquet
+    RESET_FRONTIER = settings.reset_frontier
+    MIN_LEADS_PER_CALL = settings.min_leads_per_call
+    SYNC_WORKERS = settings.sync_workers
+
+    http_client.HTTP_POOL_SIZE = settings.http_pool_size
+    http_client.HTTP2 = settings.http2
+    metros.SHARD_DIR = settings.shard_dir
+
+
+def configure_metro(metro):
+    """Point collection at another metro (a dict from metros.load_metros)."""
+    global METRO, RADIUS_METERS, TARGET_LEADS, NEIGHBORHOODS
+    METRO = metro
+    RADIUS_METERS = min(YELP_MAX_RADIUS_METERS, int(metro["radius_miles"] * 1609.34))
+    TARGET_LEADS = metro["target_leads"]
+    NEIGHBORHOODS = metro_locations(metro)
+
+
+# ─── SQLITE SETUP ────────────────────────────────────────────────────
+def init_db():
+    return lead_store.init_db(DB_PATH)
+
+
+# ─── API CALL TRACKER ────────────────────────────────────────────────
+class CallTracker:
+    """API calls made this run. With a metros.SharedBudget every call is
+    also counted against the quota shared by all worker processes."""
+
+    def __init__(self, daily_limit, shared=None):
+        self.daily_limit = daily_limit
+        self.shared = shared
+        self.calls = 0
+
+    def add_call(self):
+        # Yelp's RateLimit-Remaining header is authoritative when present
+        if RATE_LIMITER.quota_remaining == 0:
+            raise DailyLimitReachedError(
+                f"Yelp reports no API calls left today (used {self.calls} this run). "
+                f"Run again tomorrow for more leads."
+            )
+        if self.shared is not None and not self.shared.charge(1):
+            raise DailyLimitReachedError(
+                f"Daily API call limit ({self.shared.limit:.0f}) reached across all metros "
+                f"({self.calls} calls for {METRO['name']}). Run again tomorrow for more leads."
+            )
+        self.calls += 1
+        metrics.inc("billable_calls_total", source="yelp")
+        if self.calls >= self.daily_limit:
+            raise DailyLimitReachedError(
+                f"Daily API call limit ({self.daily_limit}) reached after {self.calls} calls. "
+                f"Run again tomorrow for more leads."
+            )
+
+    def summary(self):
+        return f"  API calls used: {self.calls} / {self.daily_limit}"
+
+
+class DailyLimitReachedError(Exception):
+    pass
+
+
+# ─── YELP FUSION API ─────────────────────────────────────────────────
+def api_request_with_retry(url, params, max_retries=None, before_send=None, endpoint="businesses/search"):
+    """GET with retries. Served from RESPONSE_CACHE when possible;
+    before_send (quota tracking) only runs on a cache miss. Every attempt
+    waits for a RATE_LIMITER slot and reports back how it went, and is
+    recorded in metrics under endpoint."""
+    import requests
+
+    headers = {"Authorization": f"Bearer {YELP_API_KEY}"}
+
+    cache_key = None
+    if RESPONSE_CACHE is not None:
+        cache_key = http_cache.fingerprint("GET", url, params=params)
+        cached = RESPONSE_CACHE.get(cache_key)
+        if cached is not None:
+            metrics.inc("cache_hits_total", endpoint=endpoint)
+            return cached
+
+    if before_send:
+        before_send()
+
+    max_retries = max_retries or MAX_RETRIES
+    for attempt in range(max_retries):
+        if attempt:
+            metrics.inc("http_retries_total", endpoint=endpoint)
+        RATE_LIMITER.wait()
+        started = time.monotonic()
+        try:
+            resp = http_client.get_session().get(url, headers=headers, params=params, timeout=30)
+            metrics.record_request(endpoint, started, resp.status_code)
+
+            if resp.status_code == 429:
+                if RATE_LIMITER.on_throttle(resp):
+                    print(f"    Rate limited. Honoring Retry-After, now {RATE_LIMITER.rate:.1f} req/s...")
+                else:
+                    wait = RATE_LIMITER.backoff(attempt)
+                    print(f"    Rate limited. Waiting {wait:.1f}s, now {RATE_LIMITER.rate:.1f} req/s...")
+                    metrics.sleep(wait, "backoff")
+                continue
+
+            if resp.status_code == 400:
+                # Yelp returns 400 for invalid offset (>1000)
+                return None
+
+            if resp.status_code >= 500:
+                RATE_LIMITER.on_server_error()
+                wait = RATE_LIMITER.backoff(attempt)
+                print(f"    Server error {resp.status_code}. Retrying in {wait:.1f}s...")
+                metrics.sleep(wait, "backoff")
+                continue
+
+            if resp.status_code == 401:
+                print("    ERROR: Invalid Yelp API key. Check your .env file.")
+                return None
+
+            RATE_LIMITER.on_success(resp)
+            if cache_key:
+                RESPONSE_CACHE.put(cache_key, resp)
+            return resp
+        except requests.RequestException as e:
+            metrics.record_request(endpoint, started, None)
+            if attempt < max_retries - 1:
+                wait = RATE_LIMITER.backoff(attempt)
+                print(f"    Request failed: {e}. Retrying in {wait:.1f}s...")
+                metrics.sleep(wait, "backoff")
+            else:
+                print(f"    Request failed after {max_retries} retries: {e}")
+                return None
+    return None
+
+
+def search_yelp(term, location, call_tracker, categories="", offset=0):
+    """Search Yelp for businesses. Returns (businesses, total, calls),
+    calls being the quota this request used: 0 for a cache hit."""
+    params = {
+        "term": term,
+        "location": location,
+        "radius": RADIUS_METERS,
+        "limit": YELP_PAGE_SIZE,
+        "offset": offset,
+        "sort_by": "best_match",
+    }
+    if categories:
+        params["categories"] = categories
+
+    sent = []
+
+    def before_send():
+        call_tracker.add_call()
+        sent.append(1)
+
+    with metrics.timer("search_seconds", source="yelp"):
+        resp = api_request_with_retry(YELP_SEARCH_URL, params, before_send=before_send)
+    if resp is None or resp.status_code != 200:
+        if resp:
+            print(f"    Yelp API error: {resp.status_code} - {resp.text[:200]}")
+        # None (not []) so callers don't mistake a failure for the end of results
+        return None, 0, len(sent)
+
+    data = resp.json()
+    businesses = data.get("businesses", [])
+    total = data.get("total", 0)
+    return businesses, total, len(sent)
+
+
+def fetch_business(place_id, call_tracker):
+    """Business details for a stored yelp_ place_id, or None."""
+    url = YELP_BUSINESS_URL.format(id=place_id.removeprefix("yelp_"))
+    resp = api_request_with_retry(url, {}, before_send=call_tracker.add_call, endpoint="businesses/details")
+    if resp is None or resp.status_code != 200:
+        if resp:
+            print(f"    Yelp API error: {resp.status_code} - {resp.text[:200]}")
+        return None
+    return resp.json()
+
+
+def parse_business(biz, industry, created_at=None):
+    """Parse a Yelp business into a Lead matching existing schema.
+    Pages pass one created_at for all their businesses."""
+    yelp_id = f"yelp_{biz.get('id', '')}"
+    name = biz.get("name", "")
+    location = biz.get("location", {})
+    address_parts = [location.get("address1", "")]
+    if location.get("address2"):
+        address_parts.append(location["address2"])
+    if location.get("address3"):
+        address_parts.append(location["address3"])
+    city = location.get("city", METRO["name"])
+    state = location.get("state", METRO["state"])
+    zipcode = location.get("zip_code", "")
+    full_address = ", ".join(filter(None, address_parts + [city, f"{state} {zipcode}"]))
+
+    phone = biz.get("display_phone") or biz.get("phone") or None
+    # Clean empty phone strings
+    if phone and phone.strip() in ("", "+"):
+        phone = None
+
+    # Yelp page URL (business website not available via search), without
+    # the utm_* tracking parameters, which differ between search results
+    # and business lookups and would make every refresh look like a change
+    website = biz.get("url") or None
+    if website:
+        website = urlsplit(website)._replace(query="", fragment="").geturl()
+    rating = biz.get("rating")
+    review_count = biz.get("review_count")
+    coords = biz.get("coordinates", {})
+    lat = coords.get("latitude")
+    lng = coords.get("longitude")
+
+    # Yelp rating goes in google_rating; place_id is prefixed with
+    # "yelp_" to avoid collisions with Google IDs
+    return lead_store.Lead(
+        name, industry, full_address, city or METRO["name"], state or METRO["state"], zipcode,
+        phone, website, rating, review_count, yelp_id, lat, lng, created_at or lead_store._now(),
+    )
+
+
+class YelpSource(pipeline.Source):
+    """Yelp business search as a pipeline source. A stream is one
+    INDUSTRY_MAP entry (its params) searched in one location (its key);
+    the cursor is the result offset."""
+
+    name = "yelp"
+
+    def __init__(self, call_tracker):
+        self.call_tracker = call_tracker
+
+    def fetch(self, stream, cursor):
+        offset = int(cursor) if cursor else 0
+        config = stream.params
+        businesses, total, calls = search_yelp(
+            config["term"], stream.key, self.call_tracker, config["categories"], offset
+        )
+        if businesses is None:
+            return None
+        offset += YELP_PAGE_SIZE
+        # Yelp caps at 1000 total results
+        more = offset < min(total, YELP_MAX_RESULTS_PER_QUERY)
+        return pipeline.Page(businesses, offset if more else None, calls)
+
+    def item_id(self, biz):
+        return f"yelp_{biz.get('id', '')}"
+
+    def parse(self, biz, industry, created_at):
+        return parse_business(biz, industry, created_at)
+
+
+def collect_industry(pipe, industry_config, location=None):
+    """Collect leads for one industry in one location (the metro's core
+    city by default), paginating through results.
+
+    Resumes from the offset checkpointed in the frontier; locations a
+    previous run already exhausted cost no API calls. A page with no new
+    leads ends the search: the rest would be repeats too.
+    """
+    stream = pipeline.Stream(industry_config["industry"], location or NEIGHBORHOODS[0], industry_config)
+    return pipe.run_stream(stream, dry_after=0).new_leads
+
+
+def collect_neighborhoods_scheduled(pipe):
+    """Search every (industry, neighborhood) pair, best expected yield first.
+
+    The ranking is recomputed after each pair from the stats it just
+    recorded; pairs expected below MIN_LEADS_PER_CALL are never searched.
+    """
+    configs = {config["industry"]: config for config in INDUSTRY_MAP}
+    candidates = [
+        (config["industry"], neighborhood)
+        for config in INDUSTRY_MAP
+        for neighborhood in NEIGHBORHOODS[1:]  # Skip the core city (already done)
+        if not pipe.frontier.is_exhausted(config["industry"], neighborhood)
+    ]
+
+    while candidates and pipe.writer.total < TARGET_LEADS:
+        pick = pipe.stats.next_query(candidates, MIN_LEADS_PER_CALL)
+        if pick is None:
+            print(f"    {len(candidates)} remaining searches expected below {MIN_LEADS_PER_CALL:.1f} leads/call. Skipping.")
+            break
+        candidates.remove(pick)
+        industry, neighborhood = pick
+
+        n = collect_industry(pipe, configs[industry], neighborhood)
+        if n > 0:
+            print(f'    [{industry}] {neighborhood}: +{n} | Total: {pipe.writer.total}')
+
+
+# ─── EXPORT & UPLOAD ──────────────────────────────────────────────────
+# Yelp leads share the table layout; only two columns are named differently
+CSV_HEADER = [
+    {"google_rating": "rating", "place_id": "source_id"}.get(col, col)
+    for col in lead_store.LEAD_COLUMNS
+]
+
+
+def export_csv(conn):
+    """Stream leads to CSV, appending only new ones with EXPORT_INCREMENTAL."""
+    return pipeline.export_csv(conn, CSV_PATH, EXPORT_INCREMENTAL, header=CSV_HEADER)
+
+
+def export_parquet(conn):
+    """Write the Parquet dataset; load it with lead_export.load_parquet."""
+    return pipeline.export_parquet(conn, PARQUET_PATH, "yelp")
+
+
+def upload_to_supabase(conn):
+    """Push leads that are new or changed since the last sync to Supabase."""
+    return pipeline.sync(conn, SUPABASE_URL, SUPABASE_KEY, workers=SYNC_WORKERS)
+
+
+# ─── MAIN ─────────────────────────────────────────────────────────────
+def load_seen_ids(conn, db_path, main_conn=None):
+    """Yelp ids already stored, so they are skipped.
+    Mapped from the database's seen_index file. In a metro worker,
+    DB_PATH's leads (via main_conn) count as seen too; the parent keeps
+    that file current."""
+    seen_ids = seen_index.SeenIndex().attach(conn, db_path)
+    if main_conn is not None:
+        seen_ids.attach(main_conn, DB_PATH, persist=False)
+    return seen_ids
+
+
+def collect(writer, frontier, stats, call_tracker, seen_ids):
+    """Collect the current metro until TARGET_LEADS or the call limit."""
+    core = NEIGHBORHOODS[0]
+    pipe = pipeline.Pipeline(YelpSource(call_tracker), writer, frontier, seen_ids, TARGET_LEADS, stats=stats)
+    try:
+        # Phase 1: Search each industry in the core city
+        print(f"-- Phase 1: Core {METRO['name']} searches --")
+        for config in INDUSTRY_MAP:
+            if writer.total >= TARGET_LEADS:
+                break
+            print(f'\n  [{config["industry"]}] Searching {METRO["name"]}...')
+            n = collect_industry(pipe, config, core)
+            total = writer.total
+            phones = writer.with_phone
+            print(f'    +{n} leads | Total: {total} | Phones: {phones} | API calls: {call_tracker.calls}')
+
+        total = writer.total
+        print(f"\n-- Phase 1 complete: {total} leads --")
+
+        # Phase 2: Expand to surrounding neighborhoods, best yield first
+        if total < TARGET_LEADS:
+            print(f"\n-- Phase 2: Neighborhood expansion --")
+            collect_neighborhoods_scheduled(pipe)
+
+    except DailyLimitReachedError as e:
+        print(f"\n{e}")
+        print("Your leads and crawl position have been saved. Run again tomorrow to resume.")
+    finally:
+        writer.flush()
+
+
+def run_metro(metro, db_path):
+    """Collect one metro into its own shard database. Runs in a
+    multi-metro worker process; returns a summary for the parent."""
+    configure_metro(metro)
+    metrics.METRICS.configure(
+        metrics.worker_path(SETTINGS.metrics_path, metros.metro_slug(metro)), SETTINGS.metrics_interval
+    )
+    conn = lead_store.init_db(db_path)
+    writer = lead_store.LeadWriter(conn)
+    call_tracker = CallTracker(metro["max_calls"], shared=metros.global_budget())
+    try:
+        if writer.total < TARGET_LEADS:
+            # Leads already merged from other metros' shards count as seen
+            # too; the parent created DB_PATH before starting the pool
+            main_conn = sqlite3.connect(f"file:{DB_PATH}?mode=ro", uri=True)
+            seen_ids = load_seen_ids(conn, db_path, main_conn)
+            try:
+                frontier = lead_store.Frontier(conn)
+                if RESET_FRONTIER:
+                    frontier.reset()
+                stats = lead_store.QueryStats(conn, 1.0, YELP_PAGE_SIZE)
+                print(f"\n[{metro['name']}, {metro['state']}] Starting collection (max {metro['max_calls']} API calls)...")
+                collect(writer, frontier, stats, call_tracker, seen_ids)
+            finally:
+                seen_ids.close()
+                main_conn.close()
+        return {"leads": writer.total, "calls": call_tracker.calls}
+    finally:
+        metrics.write()
+        conn.close()
+        http_client.close_session()
+
+
+def run_all_metros(metro_list):
+    """Collect every metro in parallel worker processes, then merge their
+    shards into DB_PATH and export/upload once. Returns 1 if any metro's
+    worker failed."""
+    # Created up front with a current seen index; workers read both and
+    # never race to create them
+    conn = init_db()
+    seen_index.refresh(conn, DB_PATH)
+    conn.close()
+    budget = metros.SharedBudget(DAILY_CALL_LIMIT)
+    workers = min(SETTINGS.metro_workers, len(metro_list))
+    print(f"\nCollecting {len(metro_list)} metros in {workers} worker processes "
+          f"(max {DAILY_CALL_LIMIT} API calls across all)...")
+    results = metros.run_parallel(__name__, metro_list, budget, SETTINGS, workers=workers)
+
+    print("\n-- Metro results --")
+    for metro in metro_list:
+        result = results.get(metro["name"])
+        if isinstance(result, dict):
+            print(f"  {metro['name']}, {metro['state']}: {result['leads']} leads ({result['calls']} API calls)")
+        else:
+            print(f"  {metro['name']}, {metro['state']}: failed ({result})")
+    print(f"  API calls across all metros: {budget.spent:.0f} / {DAILY_CALL_LIMIT}")
+
+    conn = init_db()
+    shards = [metros.shard_path(__name__, metro) for metro in metro_list]
+    added = metros.merge_shards(conn, shards)
+    print(f"\nMerged {added} new leads from {len(shards)} shards into {DB_PATH}")
+
+    finish(conn)
+    if any(not isinstance(results.get(metro["name"]), dict) for metro in metro_list):
+        return 1
+
+
+def finish(conn, call_tracker=None):
+    """Last stage of a run: export, sync to Supabase, summarize, close."""
+    export_csv(conn)
+    if EXPORT_PARQUET:
+        export_parquet(conn)
+    upload_to_supabase(conn)
+    print_summary(conn, call_tracker)
+    metrics.write()
+    conn.close()
+    http_client.close_session()
+
+
+def main(settings=None):
+    """Run a collection. settings defaults to Settings.from_env().
+    Returns 1 if the run couldn't start."""
+    configure(settings or Settings.from_env())
+    metrics.METRICS.configure(SETTINGS.metrics_path, SETTINGS.metrics_interval)
+
+    print("=" * 60)
+    print("  DENVER LEAD GENERATOR (Yelp Fusion API)")
+    print("  Target: 500+ businesses for vending machine placement")
+    print("  Free tier: 500 API calls/day — no billing required")
+    print("=" * 60)
+
+    if not YELP_API_KEY:
+        print("\nERROR: YELP_API_KEY not set in .env")
+        print("\nTo get a free Yelp API key:")
+        print("  1. Go to https://www.yelp.com/developers/v3/manage_app")
+        print("  2. Sign in / create a Yelp account")
+        print("  3. Create an app (any name, e.g. 'Lead Generator')")
+        print("  4. Copy the API Key")
+        print("  5. Add to .env: YELP_API_KEY=your_key_here")
+        return 1
+
+    metro_list = metros.load_metros(SETTINGS.metros_path)
+    if len(metro_list) > 1:
+        return run_all_metros(metro_list)
+    configure_metro(metro_list[0])
+
+    conn = init_db()
+    writer = lead_store.LeadWriter(conn)
+    existing = writer.total
+    print(f"\nExisting leads in database: {existing}")
+
+    if existing >= TARGET_LEADS:
+        print(f"Already have {existing} leads. Exporting and uploading...")
+        finish(conn)
+        return
+
+    call_tracker = CallTracker(DAILY_CALL_LIMIT)
+    frontier = lead_store.Frontier(conn)
+    if RESET_FRONTIER:
+        frontier.reset()
+    stats = lead_store.QueryStats(conn, 1.0, YELP_PAGE_SIZE)  # cost unit: one API call
+    # Load existing IDs to skip duplicates
+    seen_ids = load_seen_ids(conn, DB_PATH)
+
+    print(f"\nStarting collection (max {DAILY_CALL_LIMIT} API calls/day)...")
+    print(f"Industries: {len(INDUSTRY_MAP)}")
+    print(f"Location: {METRO['name']}, {METRO['state']} metro area ({len(NEIGHBORHOODS)} areas)")
+    print()
+
+    collect(writer, frontier, stats, call_tracker, seen_ids)
+    seen_ids.close()
+    finish(conn, call_tracker)
+
+
+def refresh(settings=None):
+    """Re-check stale leads, store what changed, then export and sync.
+    settings defaults to Settings.from_env(). Returns 1 if the run
+    couldn't start."""
+    configure(settings or Settings.from_env())
+    metrics.METRICS.configure(SETTINGS.metrics_path, SETTINGS.metrics_interval)
+
+    if not YELP_API_KEY:
+        print("\nERROR: YELP_API_KEY not set in .env")
+        return 1
+
+    conn = init_db()
+    call_tracker = CallTracker(DAILY_CALL_LIMIT)
+    # add_call refuses the call that reaches the limit, so stop one short
+    limit = min(SETTINGS.refresh_limit, DAILY_CALL_LIMIT - 1)
+    print(f"\nRefreshing up to {limit} leads not checked in {SETTINGS.refresh_after_days:g} days "
+          f"(max {DAILY_CALL_LIMIT} API calls/day)...")
+
+    # One lookup at a time, like searches; CallTracker isn't shared between threads
+    refresher = lead_refresh.Refresher(conn, lambda place_id: fetch_business(place_id, call_tracker), parse_business)
+    try:
+        refresher.run(limit, SETTINGS.refresh_after_days)
+    except DailyLimitReachedError as e:
+        print(f"\n{e}")
+    print(refresher.summary())
+    finish(conn, call_tracker)
+
+
+def print_summary(conn, call_tracker=None):
+    usage = []
+    if call_tracker:
+        usage += [f"  {call_tracker.summary()}", RATE_LIMITER.summary()]
+    if RESPONSE_CACHE is not None and RESPONSE_CACHE.hits:
+        usage.append(RESPONSE_CACHE.summary())
+    pipeline.print_summary(conn, usage, files=[("SQLite", DB_PATH), ("CSV", CSV_PATH)])
+
+
+if __name__ == "__main__":
+    main()
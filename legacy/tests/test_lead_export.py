@@ -0,0 +1,25 @@
+import os
+
+import pytest
+
+from leadgen import lead_export, lead_store
+
+pytest.importorskip("pyarrow")
+
+
+def test_parquet_export_of_an_empty_table_keeps_the_existing_dataset(tmp_path):
+    conn = lead_store.init_db(str(tmp_path / "leads.db"))
+    out_dir = tmp_path / "leads_parquet"
+    out_dir.mkdir()
+    (out_dir / "part-0.parquet").write_bytes(b"earlier export")
+
+    assert lead_export.export_parquet(conn, str(out_dir), "google") == 0
+    assert (out_dir / "part-0.parquet").read_bytes() == b"earlier export"
+    assert not os.path.exists(tmp_path / ".tmp-leads_parquet")
+    conn.close()
+
+
+def test_parquet_export_of_an_empty_table_without_a_dataset(tmp_path):
+    conn = lead_store.init_db(str(tmp_path / "leads.db"))
+    assert lead_export.export_parquet(conn, str(tmp_path / "leads_parquet"), "google") == 0
+    conn.close()
@@ -0,0 +1,111 @@
+import asyncio
+import json
+
+from leadgen import http_cache, http_client, lead_generator, lead_store, pipeline
+
+
+class ExpiringSource(lead_generator.PlacesSource):
+    """Two pages of three places; the token "stale" has expired."""
+
+    def __init__(self):
+        self.page_delay = 0
+
+    def fetch(self, stream, cursor, refresh_cache=False):
+        if cursor == "stale":
+            return None
+        n = int(cursor or 0)
+        places = [{"id": f"p{n}-{i}"} for i in range(3)]
+        return pipeline.Page(places, str(n + 1) if n < 1 else None, lead_generator.COST_TEXT_SEARCH)
+
+    def enrich(self, places):
+        return places, 0
+
+    def parse(self, place, industry, created_at):
+        return lead_store.Lead(
+            "Acme", industry, None, None, None, None, None, None, None, None,
+            place["id"], None, None, created_at,
+        )
+
+
+def test_async_stream_restarts_after_an_expired_token(tmp_path, monkeypatch):
+    monkeypatch.setattr(lead_generator, "PAGE_TOKEN_DELAY", 0)
+    monkeypatch.setattr(lead_generator, "TARGET_LEADS", 1000)
+    conn = lead_store.init_db(str(tmp_path / "leads.db"))
+    frontier = lead_store.Frontier(conn)
+    frontier.advance("gyms", "gyms", "stale")
+    pipe = pipeline.Pipeline(ExpiringSource(), lead_store.LeadWriter(conn), frontier, set(), 1000)
+
+    stream = lead_generator.query_stream("gyms", "gyms")
+    assert asyncio.run(lead_generator.collect_stream(pipe, stream, asyncio.Event())) == 6
+
+    # Walked again from page 1, with the earlier page no longer counted
+    assert frontier.get("gyms", "gyms") == ("exhausted", None)
+    assert frontier.pages("gyms", "gyms") == 1
+    conn.close()
+
+
+class FakeResponse:
+    def __init__(self, status_code, payload):
+        self.status_code = status_code
+        self.content = json.dumps(payload).encode("utf-8")
+        self.text = self.content.decode("utf-8")
+        self.headers = {}
+
+    def json(self):
+        return json.loads(self.content)
+
+
+class ExpiringTextSearch:
+    """Text Search where only the newest page token works: each page 1
+    response issues a new one."""
+
+    def __init__(self):
+        self.issued = 0
+
+    def expire(self):
+        self.issued += 1
+
+    def post(self, url, headers=None, json=None, timeout=None):
+        token = json.get("pageToken")
+        if token is None:
+            self.issued += 1
+            return FakeResponse(200, {"places": [{"id": "p1"}], "nextPageToken": f"T{self.issued}"})
+        if token != f"T{self.issued}":
+            return FakeResponse(400, {"error": {"status": "INVALID_ARGUMENT"}})
+        return FakeResponse(200, {"places": [{"id": "p2"}]})
+
+
+def test_restart_after_an_expired_token_refetches_a_cached_first_page(tmp_path, monkeypatch):
+    server = ExpiringTextSearch()
+    monkeypatch.setattr(http_client, "get_session", lambda: server)
+    cache = http_cache.ResponseCache(str(tmp_path / "http_cache.db"), 3600, 10 * 1024 * 1024)
+    monkeypatch.setattr(lead_generator, "RESPONSE_CACHE", cache)
+    source = lead_generator.PlacesSource(lead_generator.CostTracker(100.0))
+    stream = lead_generator.query_stream("gyms", "gyms")
+
+    assert source.fetch(stream, None).cursor == "T1"  # now cached
+    server.expire()
+
+    page = source.resume(stream, "T1")
+    assert page.restarted
+    assert page.cursor == "T3"
+    assert page.cost == lead_generator.COST_TEXT_SEARCH  # not the cached copy
+    assert [place["id"] for place in source.fetch(stream, page.cursor).items] == ["p2"]
+
+    # The cache now holds the page with the live token
+    cached = source.fetch(stream, None)
+    assert (cached.cursor, cached.cost) == ("T3", 0)
+
+
+def test_free_two_tier_pages_with_nothing_new_lower_a_querys_yield(tmp_path, monkeypatch):
+    monkeypatch.setattr(lead_generator, "TWO_TIER_FETCH", True)
+    conn = lead_store.init_db(str(tmp_path / "leads.db"))
+    stats = lead_generator.query_stats(conn)
+    stats.record_page("gyms", "a", 10, 5, cost=10 * lead_generator.COST_PLACE_DETAILS)
+    before = stats.expected_yield("gyms", "b")
+
+    # IDs-only pages that found nothing: charged $0
+    for _ in range(3):
+        stats.record_page("gyms", "b", 0, 0, cost=lead_generator.COST_TEXT_SEARCH_IDS_ONLY)
+    assert stats.expected_yield("gyms", "b") < before
+    conn.close()
@@ -0,0 +1,44 @@
+import threading
+
+import pytest
+
+from leadgen import lead_refresh, lead_store
+
+
+class BudgetExceeded(Exception):
+    pass
+
+
+def _lead(place_id, reviews):
+    return lead_store.Lead(
+        "Acme", "gyms", None, None, None, None, "(303) 555-0100", None, 4.0, reviews,
+        place_id, None, None, lead_store._now(),
+    )
+
+
+def test_lookups_finished_before_an_error_are_stored(tmp_path):
+    conn = lead_store.init_db(str(tmp_path / "leads.db"))
+    writer = lead_store.LeadWriter(conn)
+    # Most reviewed first, so "p0" is the first lead refreshed
+    writer.extend([_lead(f"p{i}", 100 - i) for i in range(4)])
+    writer.flush()
+
+    others_done = threading.Barrier(4)
+
+    def fetch(place_id):
+        others_done.wait(timeout=5)
+        if place_id == "p0":
+            raise BudgetExceeded(place_id)
+        return place_id
+
+    def parse(place_id, industry, created_at):
+        return _lead(place_id, 500)._replace(created_at=created_at)
+
+    refresher = lead_refresh.Refresher(conn, fetch, parse, concurrency=4)
+    with pytest.raises(BudgetExceeded):
+        refresher.run(limit=10, max_age_days=0)
+
+    assert (refresher.checked, refresher.changed) == (3, 3)
+    stored = dict(conn.execute("SELECT place_id, total_reviews FROM leads"))
+    assert stored == {"p0": 100, "p1": 500, "p2": 500, "p3": 500}
+    conn.close()
@@ -0,0 +1,35 @@
+from leadgen import lead_store, seen_index
+
+
+def _store(conn, place_ids):
+    writer = lead_store.LeadWriter(conn)
+    writer.extend([
+        lead_store.Lead("Acme", "gyms", None, None, None, None, None, None, None, None,
+                        place_id, None, None, lead_store._now())
+        for place_id in place_ids
+    ])
+    writer.flush()
+
+
+def test_index_is_topped_up_with_rows_added_since_it_was_written(tmp_path):
+    db_path = str(tmp_path / "leads.db")
+    conn = lead_store.init_db(db_path)
+    _store(conn, [f"a{i}" for i in range(500)])
+    seen_index.refresh(conn, db_path)
+
+    _store(conn, [f"b{i}" for i in range(300)])
+    seen = seen_index.SeenIndex().attach(conn, db_path)
+    try:
+        expected = sorted(seen_index.id_hash(f"{p}{i}") for p, n in (("a", 500), ("b", 300)) for i in range(n))
+        assert list(seen._parts[0].hashes) == expected
+        assert "a7" in seen and "b299" in seen and "c1" not in seen
+    finally:
+        seen.close()
+
+    # The rewritten file covers both batches
+    mapped = seen_index._read(seen_index.index_path(db_path))
+    assert mapped[2] == 800
+    assert list(mapped[1]) == expected
+    mapped[1].release()
+    mapped[0].close()
+    conn.close()
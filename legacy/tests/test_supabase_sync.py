@@ -0,0 +1,46 @@
+import threading
+
+import pytest
+
+from leadgen import lead_store, supabase_sync
+from leadgen.benchmark import MockServer
+
+
+@pytest.fixture
+def supabase(monkeypatch):
+    monkeypatch.setenv("NO_PROXY", "127.0.0.1")
+    server = MockServer(dataset=None)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def conn(tmp_path):
+    conn = lead_store.init_db(str(tmp_path / "leads.db"))
+    yield conn
+    conn.close()
+
+
+def _lead(place_id, phone):
+    return lead_store.Lead(
+        "Acme Storage", "warehouses", "1 Main St, Denver, CO 80202", "Denver", "CO", "80202",
+        phone, None, 4.5, 10, place_id, 39.74, -104.99, lead_store._now(),
+    )
+
+
+def test_changed_lead_is_merged_into_the_stored_row(conn, supabase):
+    writer = lead_store.LeadWriter(conn)
+    writer.extend([_lead("p1", "(303) 555-0100")])
+    writer.flush()
+
+    assert supabase_sync.sync_leads(conn, supabase.base_url, "key") == (1, 0, [])
+
+    with conn:
+        conn.execute("UPDATE leads SET phone_number = ? WHERE place_id = ?", ("(303) 555-0199", "p1"))
+    assert supabase_sync.sync_leads(conn, supabase.base_url, "key") == (1, 0, [])
+    assert supabase.leads["p1"]["phone_number"] == "(303) 555-0199"
+
+    # Synced in its current form, so nothing is left to send
+    assert supabase_sync.sync_leads(conn, supabase.base_url, "key") == (0, 0, [])
@@ -0,0 +1,36 @@
+from leadgen import lead_refresh, lead_store
+from leadgen.yelp_lead_generator import parse_business
+
+LISTING = "https://www.yelp.com/biz/acme-storage-denver"
+
+
+def _biz(medium):
+    return {
+        "id": "acme-storage-denver",
+        "name": "Acme Storage",
+        "location": {"address1": "1 Main St", "city": "Denver", "state": "CO", "zip_code": "80202"},
+        "display_phone": "(303) 555-0100",
+        "url": f"{LISTING}?adjust_creative=abc&utm_campaign=yelp_api_v3&utm_medium={medium}&utm_source=abc",
+        "rating": 4.5,
+        "review_count": 12,
+        "coordinates": {"latitude": 39.74, "longitude": -104.99},
+    }
+
+
+def test_listing_url_is_stored_without_tracking_parameters():
+    assert parse_business(_biz("api_v3_business_search"), "warehouses").website == LISTING
+
+
+def test_refresh_ignores_tracking_parameters(tmp_path):
+    conn = lead_store.init_db(str(tmp_path / "yelp_leads.db"))
+    writer = lead_store.LeadWriter(conn)
+    writer.extend([parse_business(_biz("api_v3_business_search"), "warehouses")])
+    writer.flush()
+
+    lookup = _biz("api_v3_business_lookup")
+    refresher = lead_refresh.Refresher(conn, lambda place_id: lookup, parse_business)
+    refresher.run(limit=10, max_age_days=0)
+
+    assert (refresher.checked, refresher.changed) == (1, 0)
+    assert conn.execute("SELECT updated_at FROM leads").fetchone()[0] is None
+    conn.close()